@@ -0,0 +1,215 @@
+# backend/alignment.py
+"""
+Aligns the sensor and weather series onto one time grid, so rows whose clocks are a few
+seconds apart still end up side by side (an exact timestamp join leaves half of them NULL).
+
+Methods, for every grid point and every series:
+- 'nearest':  the closest sample, if it is at most 'tolerance' seconds away
+- 'previous': the last sample at or before the point, at most 'tolerance' seconds old
+- 'linear':   linear interpolation between the samples on both sides, each at most
+              'tolerance' seconds away (text columns take the nearest sample)
+
+Everything runs on NumPy arrays of the sorted series (np.searchsorted), no Python loop
+over the rows. Times are "naive" seconds: the local wall-clock time stored in the
+database, counted as if it were UTC, so they compare exactly like the DATETIME values.
+"""
+from datetime import datetime
+import numpy as np
+from utils import fix_time
+
+ALIGN_METHODS = ('nearest', 'previous', 'linear')
+
+# Value columns of each series and how they are stored
+SENSOR_COLUMNS = {'moisture': 'float'}
+WEATHER_COLUMNS = {
+    'in_temperature': 'float', 'out_temperature': 'float',
+    'in_humidity': 'int', 'out_humidity': 'int',
+    'wind_speed': 'float', 'wind_direction': 'text',
+    'daily_rain': 'float', 'rain_rate': 'float',
+}
+
+# ======
+# TIMES
+# ======
+
+def to_seconds(values):
+    """datetime objects (MySQL) or 'YYYY-MM-DD HH:MM:SS' strings (SQLite) -> int64 seconds."""
+    return np.array(values, dtype='datetime64[s]').astype(np.int64)
+
+def to_strings(seconds):
+    """int64 seconds -> 'YYYY-MM-DD HH:MM:SS' strings."""
+    return [s.replace('T', ' ') for s in np.datetime_as_string(np.asarray(seconds).astype('datetime64[s]')).tolist()]
+
+def _parse_seconds(text, fmt):
+    """Seconds of a filter value, or None if it isn't in the expected format."""
+    try:
+        value = datetime.strptime(text, fmt)
+    except (TypeError, ValueError):
+        return None
+    if fmt == '%H:%M:%S':
+        return value.hour * 3600 + value.minute * 60 + value.second
+    return int(np.datetime64(value, 's').astype(np.int64))
+
+def filter_bounds(start_date, end_date, start_time, end_time):
+    """
+    The bounds utils.timestamp_filter would put in SQL, as seconds: (lo, hi, time_lo,
+    time_hi), each None when absent. Returns None when a value can't be parsed (the
+    database decides).
+    """
+    lo = hi = time_lo = time_hi = None
+    if start_date:
+        lo = _parse_seconds(f"{start_date} {fix_time(start_time, '00:00:00')}", '%Y-%m-%d %H:%M:%S')
+        if lo is None:
+            return None
+    elif start_time and start_time.strip():
+        time_lo = _parse_seconds(fix_time(start_time, '00:00:00'), '%H:%M:%S')
+        if time_lo is None:
+            return None
+    if end_date:
+        hi = _parse_seconds(f"{end_date} {fix_time(end_time, '23:59:59')}", '%Y-%m-%d %H:%M:%S')
+        if hi is None:
+            return None
+    elif end_time and end_time.strip():
+        time_hi = _parse_seconds(fix_time(end_time, '23:59:59'), '%H:%M:%S')
+        if time_hi is None:
+            return None
+    return lo, hi, time_lo, time_hi
+
+def time_of_day_mask(seconds, time_lo=None, time_hi=None):
+    time_of_day = seconds % 86400
+    mask = np.ones(len(seconds), bool)
+    if time_lo is not None:
+        mask &= time_of_day >= time_lo
+    if time_hi is not None:
+        mask &= time_of_day <= time_hi
+    return mask
+
+# =====
+# GRID
+# =====
+
+def latest_grid(end, first, step, count, bounds=(None, None, None, None)):
+    """
+    The newest 'count' grid points (multiples of 'step') from 'end' back to 'first' that
+    pass the filter bounds, oldest first.
+    """
+    lo, hi, time_lo, time_hi = bounds
+    if hi is not None:
+        end = min(end, hi)
+    if lo is not None:
+        first = max(first, lo)
+    start = end - end % step
+    points = []
+    needed = count
+    # Time-of-day filters skip most points, so generate in chunks until there are enough
+    while needed > 0 and start >= first:
+        chunk = np.arange(start, max(first, start - 4096 * step) - 1, -step, dtype=np.int64)
+        start = int(chunk[-1]) - step
+        if time_lo is not None or time_hi is not None:
+            chunk = chunk[time_of_day_mask(chunk, time_lo, time_hi)]
+        points.append(chunk[:needed])
+        needed -= len(points[-1])
+    if not points:
+        return np.zeros(0, np.int64)
+    return np.concatenate(points)[::-1]
+
+def span_grid(start, end, points):
+    """About 'points' evenly spaced grid points from 'start' to 'end' (whole seconds)."""
+    step = max(1, -(-(end - start) // max(points - 1, 1)))
+    return np.arange(start, end + 1, step, dtype=np.int64)
+
+# ==========
+# ALIGNMENT
+# ==========
+
+def match_indices(grid, ts, method, tolerance):
+    """Index of the sample used for each grid point, -1 where none is close enough."""
+    n = len(ts)
+    if n == 0:
+        return np.full(len(grid), -1, np.int64)
+    prev = np.searchsorted(ts, grid, 'right') - 1  # last sample <= point
+    prev_age = np.where(prev >= 0, grid - ts[np.clip(prev, 0, n - 1)], np.iinfo(np.int64).max)
+    if method == 'previous':
+        return np.where(prev_age <= tolerance, prev, -1)
+
+    nxt = np.searchsorted(ts, grid, 'left')  # first sample >= point
+    next_gap = np.where(nxt < n, ts[np.clip(nxt, 0, n - 1)] - grid, np.iinfo(np.int64).max)
+    index = np.where(next_gap < prev_age, nxt, prev)
+    return np.where(np.minimum(prev_age, next_gap) <= tolerance, index, -1)
+
+def interpolate(grid, ts, values, tolerance):
+    """Linear interpolation of float 'values' at the grid points, NaN where not possible."""
+    n = len(ts)
+    if n == 0:
+        return np.full(len(grid), np.nan)
+    right = np.clip(np.searchsorted(ts, grid, 'left'), 0, n - 1)  # first sample >= point
+    left = np.clip(right - 1, 0, n - 1)
+    exact = ts[right] == grid
+    ok = (right > 0) & (ts[right] >= grid) & (grid - ts[left] <= tolerance) & (ts[right] - grid <= tolerance)
+
+    span = np.where(ok, ts[right] - ts[left], 1)
+    fraction = (grid - ts[left]) / span
+    result = values[left] + fraction * (values[right] - values[left])
+    result = np.where(exact, values[right], result)
+    return np.where(ok | exact, result, np.nan)
+
+def series_from_rows(rows, columns, ts_key='timestamp'):
+    """Rows (dicts, sorted by time) -> (seconds, {column: array}) for align_series."""
+    if not rows:
+        return np.zeros(0, np.int64), {c: np.zeros(0) for c in columns}
+    ts = to_seconds([row[ts_key] for row in rows])
+    values = {}
+    for column, kind in columns.items():
+        raw = [row.get(column) for row in rows]
+        if kind == 'text':
+            values[column] = np.array(raw, dtype=object)
+        else:
+            values[column] = np.array([np.nan if v is None else v for v in raw], np.float64)
+    return ts, values
+
+def align_series(grid, ts, values, columns, method, tolerance):
+    """
+    Samples one series at the grid points. Returns {column: list of JSON-ready values}
+    (None where there is no value).
+    """
+    aligned = {}
+    index = None
+    if method != 'linear' or any(kind == 'text' for kind in columns.values()):
+        index = match_indices(grid, ts, 'nearest' if method == 'linear' else method, tolerance)
+    found = index >= 0 if index is not None else None
+
+    for column, kind in columns.items():
+        array = values[column]
+        if method == 'linear' and kind != 'text':
+            result = np.round(interpolate(grid, ts, array, tolerance), 2)
+            aligned[column] = [None if v != v else v for v in result.tolist()]
+        elif kind == 'text':
+            picked = array[np.clip(index, 0, max(len(array) - 1, 0))] if len(array) else np.full(len(grid), None)
+            aligned[column] = [v if ok else None for v, ok in zip(picked.tolist(), found.tolist())]
+        else:
+            picked = array[np.clip(index, 0, len(array) - 1)] if len(array) else np.full(len(grid), np.nan)
+            picked = np.where(found, picked, np.nan).tolist()
+            if kind == 'int':
+                aligned[column] = [None if v != v else int(v) for v in picked]
+            else:
+                aligned[column] = [None if v != v else v for v in picked]
+    return aligned
+
+def aligned_rows(grid, series, method, tolerance, newest_first=False):
+    """
+    Rows (date, time and every column of every series) at the grid points. 'series' is a
+    list of (seconds, values, columns). Points where no series has a value are left out.
+    """
+    columns = {}
+    for ts, values, series_columns in series:
+        columns.update(align_series(grid, ts, values, series_columns, method, tolerance))
+
+    stamps = to_strings(grid)
+    rows = []
+    for i, stamp in enumerate(stamps):
+        row = {key: values[i] for key, values in columns.items()}
+        if all(value is None for value in row.values()):
+            continue
+        row['date'], row['time'] = stamp[:10], stamp[11:]
+        rows.append(row)
+    return rows[::-1] if newest_first else rows
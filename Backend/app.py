@@ -3,40 +3,85 @@
 from flask import Flask
 import os
 from config import *
+from purge import start_purge_worker
+from ingest import start_ingest_flusher
+from hot_window import start_hot_windows
+from db import summarize_missing_recordings
+import metrics
+import profiling
+import replicas
 # Import the route handlers (index, get_sensor_api, and get_weather_api)
 from routes import(index, get_sensor_api, get_weather_api, get_combined_api, 
                    upload_csv_file, upload_audio_metadata, insert_page, query_page, 
-                   audio_page, trash_page, get_audio_environmental_api, audio_details_page, batch_delete_api, restore_api)
+                   audio_page, trash_page, get_audio_environmental_api, audio_details_page, batch_delete_api, restore_api,
+                   cache_stats_api, range_delete_api, range_restore_api, trash_api,
+                   audio_list_api, get_bundle_api, ingest_api, events_api, audio_search_api,
+                   audio_features_api, rows_stream_api, statistics_api)
 
-app = Flask(__name__, 
-            template_folder=TEMPLATE_FOLDER_PATH,
-            static_folder=STATIC_FOLDER_PATH)
+def create_app():
+    """
+    App factory. Used by the development server below and by wsgi.py, which the
+    production server (gunicorn, see gunicorn.conf.py) loads once before forking workers.
+    """
+    app = Flask(__name__, 
+                template_folder=TEMPLATE_FOLDER_PATH,
+                static_folder=STATIC_FOLDER_PATH)
+    app.config['DEBUG'] = DEBUG
+    metrics.init_app(app)  # request timing + /metrics
+    profiling.init_app(app)  # per-request query profiles when QUERY_PROFILE is on
+    replicas.init_app(app)  # read-your-writes cookie when read replicas are configured
 
-# --- FIX: Add the route for the root path ('/') ---
-app.add_url_rule('/', 'index', index)
-app.add_url_rule('/insert', 'insert_page', insert_page)
-app.add_url_rule('/query', 'query_page', query_page)
-app.add_url_rule('/audio', 'audio_page', audio_page)
-app.add_url_rule('/audio/details', 'audio_details_page', audio_details_page)
-app.add_url_rule('/trash', 'trash_page', trash_page)
+    # --- FIX: Add the route for the root path ('/') ---
+    app.add_url_rule('/', 'index', index)
+    app.add_url_rule('/insert', 'insert_page', insert_page)
+    app.add_url_rule('/query', 'query_page', query_page)
+    app.add_url_rule('/audio', 'audio_page', audio_page)
+    app.add_url_rule('/audio/details', 'audio_details_page', audio_details_page)
+    app.add_url_rule('/trash', 'trash_page', trash_page)
 
-# Register the distinct API endpoints
-app.add_url_rule('/api/v1/sensors', 'get_sensor_api', get_sensor_api)
-app.add_url_rule('/api/v1/weather', 'get_weather_api', get_weather_api) 
-app.add_url_rule('/api/v1/combined', 'get_combined_api', get_combined_api) #--- new ---
-app.add_url_rule('/api/v1/upload', 'upload_csv_file', upload_csv_file, methods=['POST'])
-app.add_url_rule('/api/v1/audio/upload', 'upload_audio_metadata', 
-                upload_audio_metadata, methods=['POST'])
-app.add_url_rule('/api/v1/audio/environmental', 'get_audio_with_environmental_api', 
-                get_audio_environmental_api)
+    # Register the distinct API endpoints
+    app.add_url_rule('/api/v1/sensors', 'get_sensor_api', get_sensor_api)
+    app.add_url_rule('/api/v1/weather', 'get_weather_api', get_weather_api) 
+    app.add_url_rule('/api/v1/combined', 'get_combined_api', get_combined_api) #--- new ---
+    app.add_url_rule('/api/v1/bundle', 'get_bundle_api', get_bundle_api)
+    app.add_url_rule('/api/v1/rows/<data_type>', 'rows_stream_api', rows_stream_api)
+    app.add_url_rule('/api/v1/statistics', 'statistics_api', statistics_api)
+    app.add_url_rule('/api/v1/cache/stats', 'cache_stats_api', cache_stats_api)
+    app.add_url_rule('/api/v1/upload', 'upload_csv_file', upload_csv_file, methods=['POST'])
+    app.add_url_rule('/api/v1/ingest', 'ingest_api', ingest_api, methods=['POST'])
+    app.add_url_rule('/api/v1/events', 'events_api', events_api)
+    app.add_url_rule('/api/v1/audio', 'audio_list_api', audio_list_api)
+    app.add_url_rule('/api/v1/audio/search', 'audio_search_api', audio_search_api)
+    app.add_url_rule('/api/v1/audio/features', 'audio_features_api', audio_features_api)
+    app.add_url_rule('/api/v1/audio/upload', 'upload_audio_metadata', 
+                    upload_audio_metadata, methods=['POST'])
+    app.add_url_rule('/api/v1/audio/environmental', 'get_audio_with_environmental_api', 
+                    get_audio_environmental_api)
 
-app.add_url_rule('/api/v1/delete', 'batch_delete_api', batch_delete_api, methods=['POST'])
+    app.add_url_rule('/api/v1/delete', 'batch_delete_api', batch_delete_api, methods=['POST'])
 
-app.add_url_rule('/api/v1/restore', 'restore_api', restore_api, methods=['POST'])
+    app.add_url_rule('/api/v1/restore', 'restore_api', restore_api, methods=['POST'])
 
+    app.add_url_rule('/api/v1/trash/<data_type>', 'trash_api', trash_api)
 
+    app.add_url_rule('/api/v1/delete/range', 'range_delete_api', range_delete_api, methods=['POST'])
+    app.add_url_rule('/api/v1/restore/range', 'range_restore_api', range_restore_api, methods=['POST'])
+
+    return app
+
+
+# Kept at module level so 'python app.py' and 'from app import app' keep working
+app = create_app()
 
 if __name__ == '__main__':
-    # Run the Flask application
-    app.run(host="0.0.0.0", port=5000, debug=True)
-    
\ No newline at end of file
+    # Purge expired soft deleted data in the background (replaces the MySQL event)
+    start_purge_worker()
+    # Write-behind flusher for /api/v1/ingest (also finishes spool files of an earlier run)
+    start_ingest_flusher()
+    # Recent sensor/weather rows in memory for the "latest rows" queries
+    start_hot_windows()
+    # Environmental summaries of recordings uploaded before AUDIO_ENV_SUMMARY existed
+    summarize_missing_recordings()
+    # Development server only: single process, debugger and reloader when DEBUG is on.
+    # Production: gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(host="0.0.0.0", port=5000, debug=DEBUG)
@@ -0,0 +1,314 @@
+# backend/audio_features.py
+"""
+Per-second feature tracks of the audio recordings, so the sound can be compared with the
+weather and sensor readings without decoding whole WAV files in the browser.
+
+For every full second of a recording:
+- rms_db:   RMS level in dBFS (0 = full scale)
+- peak_db:  highest sample in dBFS
+- band_<lo>_<hi>: energy between lo and hi Hz (AUDIO_FEATURE_BANDS) in dBFS; the band
+            energies add up to the RMS level. Bands above half the sample rate are null.
+
+The PCM data is memory-mapped and processed in blocks of whole seconds with NumPy (one
+FFT per second, 1 Hz bins), so even long files never have to fit in memory. The tracks
+are stored as float16 arrays in AUDIO_FEATURES, one row per recording; second i belongs
+to start_time + i seconds. Only WAV files (integer or float PCM) can be analysed.
+
+Tracks are extracted on a background thread after an upload (queue_extraction; a long
+file never holds up the request) and on first use. Files shorter than one second have no
+track. Usage (from the Backend folder):
+    python audio_features.py backfill   # recordings without a track or with other bands
+"""
+import argparse
+import os
+import queue
+import struct
+import threading
+import numpy as np
+from config import AUDIO_FEATURE_BANDS
+from alignment import to_seconds, to_strings
+from audio_store import recording_path
+from db import db_session
+
+# Levels below this (silence) are stored as FLOOR_DB
+FLOOR_DB = -120.0
+
+# Seconds analysed per block; bounds the memory of the FFT
+BLOCK_SECONDS = 32
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# ======
+# WAV
+# ======
+
+def open_wav(path):
+    """
+    Memory-maps the samples of a WAV file. Returns (samples, sample rate, decode), where
+    samples has one row per frame and decode(block) turns a block of rows into mono float
+    samples between -1 and 1. Raises ValueError for files that are not WAV/PCM.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            raise ValueError("not a WAV file")
+        fmt = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError("WAV file without data")
+            chunk_id, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+            if chunk_id == b'fmt ':
+                body = f.read(size)
+                if size < 16 or len(body) < 16:
+                    raise ValueError("WAV format chunk too short")
+                audio_format, channels, rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+                if audio_format == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    audio_format = struct.unpack('<H', body[24:26])[0]  # first bytes of the sub format GUID
+                fmt = (audio_format, channels, rate, bits)
+                f.seek(size % 2, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError("WAV data before its format")
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + size % 2, 1)  # chunks are padded to an even size
+        file_size = f.seek(0, 2)
+
+    audio_format, channels, rate, bits = fmt
+    width = bits // 8
+    if not channels or not rate or bits % 8:
+        raise ValueError("unsupported WAV format")
+    # Recorders that were cut off leave a wrong (or 0xFFFFFFFF) data size: use what is there
+    frames = min(size, file_size - offset) // (channels * width)
+
+    if audio_format == WAVE_FORMAT_PCM and width == 3:
+        # 24 bit has no NumPy type: map the bytes and assemble them per block
+        samples = np.memmap(path, np.uint8, 'r', offset, (frames, channels, 3))
+        def decode(block):
+            value = block[..., 0].astype(np.int32) | (block[..., 1].astype(np.int32) << 8) | (block[..., 2].astype(np.int32) << 16)
+            return (((value << 8) >> 8).mean(axis=1) / 2.0 ** 23).astype(np.float32)
+        return samples, rate, decode
+
+    dtypes = {(WAVE_FORMAT_PCM, 1): np.uint8, (WAVE_FORMAT_PCM, 2): np.dtype('<i2'),
+              (WAVE_FORMAT_PCM, 4): np.dtype('<i4'), (WAVE_FORMAT_FLOAT, 4): np.dtype('<f4'),
+              (WAVE_FORMAT_FLOAT, 8): np.dtype('<f8')}
+    dtype = dtypes.get((audio_format, width))
+    if dtype is None:
+        raise ValueError(f"unsupported WAV format {audio_format} with {bits} bits")
+    samples = np.memmap(path, dtype, 'r', offset, (frames, channels))
+
+    if audio_format == WAVE_FORMAT_FLOAT:
+        decode = lambda block: block.mean(axis=1, dtype=np.float64).astype(np.float32)
+    elif width == 1:
+        decode = lambda block: ((block.mean(axis=1) - 128) / 128).astype(np.float32)  # 8 bit is unsigned
+    else:
+        scale = float(2 ** (bits - 1))
+        decode = lambda block: (block.mean(axis=1, dtype=np.float64) / scale).astype(np.float32)
+    return samples, rate, decode
+
+# =========
+# FEATURES
+# =========
+
+def feature_names(bands=AUDIO_FEATURE_BANDS):
+    return ['rms_db', 'peak_db'] + [f"band_{lo}_{hi}" for lo, hi in zip(bands, bands[1:])]
+
+def _decibels(power):
+    return 10 * np.log10(np.maximum(power, 10 ** (FLOOR_DB / 10)))
+
+def compute_features(path, bands=AUDIO_FEATURE_BANDS):
+    """
+    Feature track of one WAV file: float32 array with one row per full second and the
+    columns of feature_names(bands). Returns (track, sample rate).
+    """
+    samples, rate, decode = open_wav(path)
+    seconds = len(samples) // rate
+    track = np.empty((seconds, 2 + len(bands) - 1), np.float32)
+
+    # rfft over one second has 1 Hz bins; with these weights the bins of a row add up to
+    # the mean square of the samples (Parseval), so bands and RMS share one scale
+    bins = rate // 2 + 1
+    weights = np.full(bins, 2.0 / rate ** 2)
+    weights[0] = 1.0 / rate ** 2
+    if rate % 2 == 0:
+        weights[-1] = 1.0 / rate ** 2
+    edges = np.minimum(np.array(bands), bins)
+    above_nyquist = np.array(bands[:-1]) >= rate / 2
+
+    for first in range(0, seconds, BLOCK_SECONDS):
+        count = min(BLOCK_SECONDS, seconds - first)
+        block = decode(samples[first * rate:(first + count) * rate]).reshape(count, rate)
+        track[first:first + count, 0] = _decibels(np.mean(np.square(block, dtype=np.float64), axis=1))
+        track[first:first + count, 1] = 20 * np.log10(np.maximum(np.abs(block).max(axis=1), 10 ** (FLOOR_DB / 20)))
+
+        power = np.square(np.abs(np.fft.rfft(block, axis=1))) * weights
+        cumulative = np.concatenate([np.zeros((count, 1)), np.cumsum(power, axis=1)], axis=1)
+        energy = cumulative[:, edges[1:]] - cumulative[:, edges[:-1]]
+        track[first:first + count, 2:] = np.where(above_nyquist, np.nan, _decibels(energy))
+
+    del samples  # closes the memory map
+    return track, rate
+
+def encode_track(track):
+    return track.astype('<f2').tobytes()
+
+def decode_track(data, seconds, columns):
+    if not seconds or not data:
+        return np.empty((0, columns), np.float32)
+    return np.frombuffer(data, '<f2').reshape(seconds, columns).astype(np.float32)
+
+# =========
+# DATABASE
+# =========
+
+def extract_recording_features(audio_id, bands=AUDIO_FEATURE_BANDS):
+    """
+    Extracts and stores the feature track of one recording. A track of the same content
+    (another recording of the same file) is copied instead. Returns True when stored;
+    recordings shorter than one second get no track.
+    """
+    band_text = ','.join(str(edge) for edge in bands)
+    with db_session() as conn:
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        cursor.execute("SELECT start_time, file_path, content_hash FROM AUDIO_RECORDING WHERE id = %s", (audio_id,))
+        recording = cursor.fetchone()
+        if not recording:
+            return False
+        start_time, file_path, content_hash = recording
+        known = None
+        if content_hash:
+            cursor.execute("""
+                SELECT F.seconds, F.sample_rate, F.data FROM AUDIO_FEATURES F
+                JOIN AUDIO_RECORDING A ON A.id = F.audio_id
+                WHERE A.content_hash = %s AND F.bands = %s LIMIT 1
+            """, (content_hash, band_text))
+            known = cursor.fetchone()
+        conn.rollback()
+
+    # The analysis runs without holding a connection; only the result is written
+    if known:
+        seconds, rate, data = known
+    else:
+        try:
+            track, rate = compute_features(recording_path(file_path, content_hash), bands)
+        except (OSError, ValueError) as e:
+            print(f"Audio Feature Error ({file_path}): {e}")
+            return False
+        seconds, data = len(track), encode_track(track)
+    if not seconds:
+        return False
+
+    start = int(to_seconds([start_time])[0])
+    with db_session() as conn:
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        try:
+            # Written only if the recording is still there (it may have been replaced meanwhile)
+            cursor.execute("""
+                REPLACE INTO AUDIO_FEATURES (audio_id, start_time, end_time, seconds, sample_rate, bands, data)
+                SELECT id, %s, %s, %s, %s, %s, %s FROM AUDIO_RECORDING WHERE id = %s
+            """, (*to_strings([start, start + seconds]), seconds, rate, band_text, data, audio_id))
+            stored = cursor.rowcount > 0
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Audio Feature Error ({file_path}): {e}")
+            return False
+    return stored
+
+def load_feature_tracks(audio_id=None, first=None, last=None, intent='read'):
+    """
+    Feature tracks of one recording, or of the visible recordings overlapping [first, last]
+    (datetimes). Returns a list of (audio_id, start seconds, bands, track), oldest first.
+    """
+    if audio_id is not None:
+        query = "SELECT audio_id, start_time, seconds, bands, data FROM AUDIO_FEATURES WHERE audio_id = %s"
+        params = (audio_id,)
+    else:
+        query = """
+            SELECT F.audio_id, F.start_time, F.seconds, F.bands, F.data FROM AUDIO_FEATURES F
+            JOIN AUDIO_RECORDING A ON A.id = F.audio_id
+            WHERE A.is_deleted = 0 AND F.start_time <= %s AND F.end_time >= %s
+            ORDER BY F.start_time
+        """
+        params = (last, first)
+    with db_session(intent=intent, tables=('AUDIO_RECORDING',)) as conn:
+        if not conn:
+            raise RuntimeError("DB connection failed while loading AUDIO_FEATURES.")
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+    tracks = []
+    for (row_id, _, seconds, band_text, data), start in zip(rows, to_seconds([row[1] for row in rows])):
+        bands = [int(edge) for edge in band_text.split(',')]
+        tracks.append((row_id, int(start), bands, decode_track(data, seconds, len(feature_names(bands)))))
+    return tracks
+
+# ==================
+# BACKGROUND WORKER
+# ==================
+# Uploads queue their recording instead of analysing it in the request. A recording still
+# waiting (or lost with its process) is analysed on first use or by backfill.
+
+_pending = queue.Queue()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def queue_extraction(audio_id):
+    """Extracts the track of a recording on this process's feature thread."""
+    global _worker, _worker_pid
+    with _worker_lock:
+        if _worker is None or _worker_pid != os.getpid() or not _worker.is_alive():
+            _worker = threading.Thread(target=_extract_pending, name='audio-features', daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
+    _pending.put(audio_id)
+
+def _extract_pending():
+    while True:
+        audio_id = _pending.get()
+        try:
+            extract_recording_features(audio_id)
+        except Exception as e:
+            print(f"Audio Feature Error (recording {audio_id}): {e}")
+        finally:
+            _pending.task_done()
+
+def extract_missing_features():
+    """Extracts the tracks of recordings without one, or with other bands. Returns (done, failed)."""
+    band_text = ','.join(str(edge) for edge in AUDIO_FEATURE_BANDS)
+    with db_session() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed at extract_missing_features.")
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT A.id FROM AUDIO_RECORDING A
+            LEFT JOIN AUDIO_FEATURES F ON F.audio_id = A.id
+            WHERE F.audio_id IS NULL OR F.bands <> %s
+            ORDER BY A.id
+        """, (band_text,))
+        ids = [row[0] for row in cursor.fetchall()]
+
+    done = sum(extract_recording_features(audio_id) for audio_id in ids)
+    return done, len(ids) - done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-second audio feature tracks.")
+    parser.add_argument('command', choices=['backfill'])
+    parser.parse_args()
+
+    done, failed = extract_missing_features()
+    print(f"Extracted {done} feature tracks, {failed} recordings could not be analysed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# backend/audio_store.py
+"""
+Content-addressed storage for the audio files.
+
+Every file is stored once, named by the SHA-256 of its bytes, in a sharded tree below
+AUDIO_STORE_DIR: objects/ab/cd/abcd1234...<ext>. No directory ever holds more than a few
+hundred entries, and a byte-identical upload (under any name) reuses the stored file.
+
+AUDIO_RECORDING.file_path is only a logical name (the uploaded filename); the recording
+points at its file through content_hash. AUDIO_BLOB counts the recordings using each file.
+The counts change in the same transaction as the recording rows (see db.py), and a file
+is removed once nothing refers to it any more.
+
+Usage (from the Backend folder):
+    python audio_store.py migrate   # move files of the old flat layout into the store
+    python audio_store.py gc        # remove files and AUDIO_BLOB rows nothing refers to
+    python audio_store.py stats
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from config import AUDIO_DIRECTORY, AUDIO_STORE_DIR
+
+OBJECTS_DIR = os.path.join(AUDIO_STORE_DIR, 'objects')
+TEMP_DIR = os.path.join(AUDIO_STORE_DIR, 'tmp')  # same file system, so rename() is atomic
+
+CHUNK_SIZE = 1024 * 1024
+
+# gc leaves younger files alone: an upload places its file before its row is committed
+GC_MIN_AGE = 3600
+
+# ======
+# FILES
+# ======
+
+def blob_path(content_hash, ext):
+    """Where the file with this hash lives, e.g. objects/ab/cd/abcd...wav."""
+    return os.path.join(OBJECTS_DIR, content_hash[:2], content_hash[2:4], content_hash + ext)
+
+def file_extension(filename):
+    return os.path.splitext(filename)[1].lower()
+
+def recording_path(file_path, content_hash):
+    """The file of a recording: in the store, or where file_path says if not migrated yet."""
+    if content_hash:
+        return blob_path(content_hash, file_extension(file_path))
+    return file_path if os.path.isabs(file_path) else os.path.join(AUDIO_DIRECTORY, file_path)
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def save_upload(stream, filename):
+    """
+    Writes an upload to a temporary file, hashing it on the way. The temporary name ends
+    with the original filename (the recording time is read from it).
+    Returns (temp path, content hash, size).
+    """
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(suffix=f"-{filename}", dir=TEMP_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path, digest.hexdigest(), size
+
+def place_blob(source_path, content_hash, ext):
+    """
+    Moves 'source_path' to its place in the store, or drops it if that file is already
+    there. Call it while holding the AUDIO_BLOB row (see db.retain_blob). Returns True
+    when this call put the file there.
+    """
+    target = blob_path(content_hash, ext)
+    if os.path.exists(target):
+        os.remove(source_path)
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.rename(source_path, target)
+    return True
+
+def remove_blob(content_hash, ext):
+    """Deletes a stored file nothing refers to any more. Returns the bytes freed."""
+    path = blob_path(content_hash, ext)
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except OSError:
+        return 0  # already gone
+    # Leave empty shard directories behind; they are reused and cost nothing
+    return size
+
+# =======
+# TOOLS
+# =======
+
+def migrate_flat_files():
+    """
+    Moves the files of recordings still in the old flat layout (file_path = absolute path,
+    no content_hash) into the store, one recording per transaction. Returns a report.
+    """
+    from db import db_session, retain_blob  # the tools need the database, the upload path doesn't
+
+    report = {'migrated': 0, 'deduplicated': 0, 'missing': []}
+    with db_session() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed at migrate_flat_files.")
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, file_path FROM AUDIO_RECORDING WHERE content_hash IS NULL")
+        for audio_id, file_path in cursor.fetchall():
+            path = recording_path(file_path, None)
+            if not os.path.isfile(path):
+                report['missing'].append(file_path)
+                continue
+            content_hash, ext = hash_file(path), file_extension(path)
+            try:
+                known = retain_blob(cursor, content_hash, ext, os.path.getsize(path))
+                # Move, don't copy: the flat file becomes the stored one (or a duplicate of it)
+                place_blob(path, content_hash, ext)
+                cursor.execute("UPDATE AUDIO_RECORDING SET file_path = %s, content_hash = %s WHERE id = %s",
+                               (os.path.basename(file_path), content_hash, audio_id))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Audio Store Migration Error ({file_path}): {e}")
+                continue
+            report['migrated'] += 1
+            report['deduplicated'] += int(known)
+    return report
+
+def collect_garbage():
+    """
+    Removes AUDIO_BLOB rows no recording uses, stored files without a row (left by a
+    crash between writing a file and committing) and old temporary files. Returns a report.
+    """
+    from db import db_session, release_blobs, remove_unused_blobs
+
+    report = {'rows': 0, 'files': 0, 'bytes': 0}
+    with db_session() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed at collect_garbage.")
+        cursor = conn.cursor()
+        # Counts that drifted (e.g. rows removed by hand) are recomputed first
+        cursor.execute("""
+            UPDATE AUDIO_BLOB SET ref_count = (
+                SELECT COUNT(*) FROM AUDIO_RECORDING A WHERE A.content_hash = AUDIO_BLOB.content_hash)
+        """)
+        cursor.execute("SELECT content_hash FROM AUDIO_BLOB WHERE ref_count = 0")
+        unused = [row[0] for row in cursor.fetchall()]
+        released = release_blobs(cursor, unused, decrement=False)
+        conn.commit()
+        report['rows'], report['bytes'] = len(unused), remove_unused_blobs(released)
+
+        cursor.execute("SELECT content_hash, ext FROM AUDIO_BLOB")
+        known = {blob_path(content_hash, ext) for content_hash, ext in cursor.fetchall()}
+        conn.rollback()
+
+    # Also temporary files of uploads that never finished
+    cutoff = time.time() - GC_MIN_AGE
+    for root, _, files in [*os.walk(OBJECTS_DIR), *os.walk(TEMP_DIR)]:
+        for name in files:
+            path = os.path.join(root, name)
+            if path not in known and os.path.getmtime(path) < cutoff:
+                report['bytes'] += os.path.getsize(path)
+                os.remove(path)
+                report['files'] += 1
+    return report
+
+def store_stats():
+    from db import db_session
+
+    with db_session() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed at store_stats.")
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(ref_count), 0) FROM AUDIO_BLOB")
+        blobs, size, references = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM AUDIO_RECORDING WHERE content_hash IS NULL")
+        flat = cursor.fetchone()[0]
+    return {'files': blobs, 'bytes': int(size), 'recordings': int(references), 'not_migrated': flat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed audio storage.")
+    parser.add_argument('command', choices=['migrate', 'gc', 'stats'])
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        report = migrate_flat_files()
+        print(f"Migrated {report['migrated']} recordings ({report['deduplicated']} were duplicates)")
+        for path in report['missing']:
+            print(f"  missing file: {path}")
+    elif args.command == 'gc':
+        report = collect_garbage()
+        print(f"Removed {report['rows']} unused rows and {report['files']} stray files, {report['bytes']} bytes")
+    else:
+        print(store_stats())
+
+if __name__ == '__main__':
+    main()
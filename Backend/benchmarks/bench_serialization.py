@@ -0,0 +1,84 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Micro-benchmark: old row formatting (format_for_frontend + jsonify-style dumps) against
+the precompiled converters in serializer.py. Needs no database.
+
+Run from the Backend folder:  python benchmarks/bench_serialization.py --rows 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymysql.constants import FIELD_TYPE
+from serializer import dumps, rows_for_frontend
+from utils import format_for_frontend
+
+# Same columns as the combined query (sort_ts is dropped before returning)
+COLUMNS = [
+    ('date', FIELD_TYPE.DATE), ('time', FIELD_TYPE.TIME),
+    ('in_temperature', FIELD_TYPE.DOUBLE), ('out_temperature', FIELD_TYPE.DOUBLE),
+    ('in_humidity', FIELD_TYPE.LONG), ('out_humidity', FIELD_TYPE.LONG),
+    ('wind_speed', FIELD_TYPE.DOUBLE), ('wind_direction', FIELD_TYPE.VAR_STRING),
+    ('daily_rain', FIELD_TYPE.DOUBLE), ('rain_rate', FIELD_TYPE.DOUBLE),
+    ('moisture', FIELD_TYPE.DOUBLE), ('sort_ts', FIELD_TYPE.DATETIME),
+]
+
+class FakeCursor:
+    """Just enough of a PyMySQL cursor: description plus fetchall()."""
+    def __init__(self, rows):
+        self.description = [(name, type_code, None, None, None, None, True) for name, type_code in COLUMNS]
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+def make_rows(count):
+    start = datetime(2025, 11, 14, 10, 0, 0)
+    rows = []
+    for i in range(count):
+        ts = start - timedelta(seconds=60 * i)
+        rows.append((
+            ts.date(), timedelta(hours=ts.hour, minutes=ts.minute, seconds=ts.second),
+            21.5, 4.25, 45, 80, 3.2, 'NE', 0.0, 0.0,
+            None if i % 3 else 31.13, ts,
+        ))
+    return rows
+
+def old_pipeline(rows):
+    names = [name for name, _ in COLUMNS]
+    data = format_for_frontend([dict(zip(names, row)) for row in rows])  # what DictCursor hands over
+    for row in data:
+        row.pop('sort_ts', None)
+    return json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+def new_pipeline(rows):
+    return dumps(rows_for_frontend(FakeCursor(rows), hidden=('sort_ts',)))
+
+def best_of(func, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    if json.loads(old_pipeline(rows)) != json.loads(new_pipeline(rows)):
+        sys.exit("ERROR: the two pipelines produced different JSON")
+
+    old = best_of(old_pipeline, rows, args.repeat)
+    new = best_of(new_pipeline, rows, args.repeat)
+    print(f"rows: {args.rows}")
+    print(f"format_for_frontend + json : {old * 1000:8.2f} ms")
+    print(f"serializer                 : {new * 1000:8.2f} ms  ({old / new:.1f}x faster)")
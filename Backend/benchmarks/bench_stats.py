@@ -0,0 +1,7 @@
+# backend/benchmarks/bench_stats.py
+"""Helpers shared by the benchmark scripts."""
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
@@ -0,0 +1,292 @@
+# backend/benchmarks/bench_suite.py
+"""
+Ingest and query benchmark against a scratch MySQL database (or SQLite file).
+
+1. Recreates the database given by --database (never the app's own) from Database.sql,
+   or with --backend sqlite a fresh file at --sqlite-path.
+2. Generates --rows sensor and weather rows with the generators of mock_sensor_data.py /
+   mock_weather_data.py (fixed seed and start time, so every run gets the same data),
+   loads them through process_csv_file and times the ingest.
+3. Adds --audio recordings spread over the data and measures latency percentiles of
+   get_latest_sensor_data, get_latest_weather_data, get_combined_data and
+   get_audio_environmental_data_logic over a few representative windows, with the
+   query cache switched off.
+4. Writes the results as JSON (with the git commit) so runs can be compared.
+
+Run from the Backend folder (DB_HOST / DB_USER / DB_PASSWORD as for the app):
+    python benchmarks/bench_suite.py --rows 20000 --repeat 50
+    python benchmarks/bench_suite.py --compare benchmarks/results/<older>.json
+    python benchmarks/bench_suite.py --backend sqlite --rows 20000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from bench_stats import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, REPO_DIR)  # mock data generators live in the repository root
+
+import config
+import storage
+from cache import query_cache
+from data_loader import process_csv_file
+from db import connection_pool, insert_audio_data
+from services import (get_audio_environmental_data_logic, get_combined_data,
+                      get_latest_sensor_data, get_latest_weather_data)
+from mock_sensor_data import SENSOR_HEADERS, generate_sensor_row
+from mock_weather_data import WEATHER_HEADERS, generate_weather_row
+
+SCHEMA_FILE = os.path.join(REPO_DIR, 'Database', 'Database.sql')
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+# Monday 2025-03-03 00:00 local time; fixed so windows and partitions match between runs
+DATASET_START = datetime(2025, 3, 3).timestamp()
+
+# ========
+# DATABASE
+# ========
+
+def _schema_statements():
+    """Database.sql without its CREATE/USE DATABASE lines, split into statements."""
+    with open(SCHEMA_FILE, encoding='utf-8') as f:
+        sql = re.sub(r"--[^\n]*", "", f.read())
+    statements = [s.strip() for s in sql.split(';')]
+    return [s for s in statements if s and not re.match(r"(?i)(drop|create)\s+database|use\s", s)]
+
+def create_database(name):
+    """Drops and recreates the scratch database 'name' and points the app at it."""
+    if name == config.DB_CONFIG.get('database'):
+        sys.exit(f"Refusing to benchmark against the app database '{name}', pick another --database.")
+
+    import pymysql
+    server = {k: v for k, v in config.DB_CONFIG.items() if k != 'database'}
+    conn = pymysql.connect(**server)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+        cursor.execute(f"CREATE DATABASE `{name}`")
+        cursor.execute(f"USE `{name}`")
+        for statement in _schema_statements():
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+
+    # db.py imported the same dict, so this redirects every new connection
+    config.DB_CONFIG['database'] = name
+    connection_pool.close_all()
+
+def create_sqlite_database(path):
+    """Starts from an empty SQLite file at 'path' and points the app at it."""
+    if os.path.abspath(path) == os.path.abspath(config.SQLITE_PATH):
+        sys.exit(f"Refusing to benchmark against the app database '{path}', pick another --sqlite-path.")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    connection_pool.close_all()
+    storage.set_backend('sqlite', path=path)
+
+# ========
+# DATASET
+# ========
+
+def _csv_bytes(headers, rows):
+    out = io.StringIO()
+    out.write(';'.join(headers) + '\n')
+    for row in rows:
+        out.write(';'.join(str(v) for v in row) + '\n')
+    return out.getvalue().encode('utf-8')
+
+def generate_dataset(rows, step, seed):
+    """Sensor and weather CSVs (as uploaded by the browser) covering the same period."""
+    random.seed(seed)
+    timestamps = [DATASET_START + i * step for i in range(rows)]
+    sensor = _csv_bytes(SENSOR_HEADERS, (generate_sensor_row(ts) for ts in timestamps))
+    weather = _csv_bytes(WEATHER_HEADERS, (generate_weather_row(ts) for ts in timestamps))
+    return sensor, weather, timestamps
+
+def time_ingest(name, payload, rows):
+    # process_csv_file prints a line per row; keep that out of the terminal, not the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        result = process_csv_file(io.BytesIO(payload))
+        seconds = time.perf_counter() - started
+    report = {
+        'rows': rows,
+        'inserted': result.get('success_count', 0),
+        'failed': result.get('fail_count', 0),
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+    }
+    print(f"ingest {name:8} {report['inserted']} rows in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s)")
+    return report
+
+def insert_recordings(count, timestamps, duration=600):
+    """'count' recordings of 'duration' seconds spread evenly over the dataset."""
+    ids = []
+    span = timestamps[-1] - timestamps[0] - duration
+    for i in range(count):
+        start = int(timestamps[0] + span * i / max(count - 1, 1))
+        ok, audio_id = insert_audio_data({
+            'start_timestamp': start,
+            'end_timestamp': start + duration,
+            'filepath': f"bench_{i:04}.wav",  # logical name, no stored file
+        })
+        if ok:
+            ids.append(audio_id)
+    return ids
+
+# ============
+# MEASUREMENTS
+# ============
+
+def summarize(samples):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        'runs': len(ms),
+        'min_ms': round(ms[0], 3),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p90_ms': round(percentile(ms, 90), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(ms[-1], 3),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+    }
+
+def measure(func, repeat, warmup):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    if isinstance(result, dict) and 'error' in result or isinstance(result, list) and result and 'error' in result[0]:
+        raise RuntimeError(f"query failed: {result}")
+    return summarize(samples)
+
+def representative_windows(timestamps):
+    """Filter sets the query page sends: newest rows, one day, one hour, the whole range."""
+    first = datetime.fromtimestamp(timestamps[0])
+    middle = datetime.fromtimestamp(timestamps[len(timestamps) // 2])
+    last = datetime.fromtimestamp(timestamps[-1])
+    return {
+        'latest': (None, None, None, None),
+        'day': (f"{middle:%Y-%m-%d}", f"{middle:%Y-%m-%d}", None, None),
+        'hour': (f"{middle:%Y-%m-%d}", f"{middle:%Y-%m-%d}", f"{middle:%H}:00", f"{middle:%H}:59"),
+        'full_range': (f"{first:%Y-%m-%d}", f"{last:%Y-%m-%d}", None, None),
+    }
+
+def run_queries(windows, audio_ids, repeat, warmup):
+    queries = {
+        'get_latest_sensor_data': lambda w: get_latest_sensor_data(*w, limit=100),
+        'get_latest_weather_data': lambda w: get_latest_weather_data(*w, limit=100),
+        'get_combined_data': lambda w: get_combined_data(*w, limit=200),
+    }
+    results = {}
+    for name, query in queries.items():
+        results[name] = {}
+        for window, filters in windows.items():
+            results[name][window] = measure(lambda: query(filters), repeat, warmup)
+            print(f"{name:34} {window:11} p50 {results[name][window]['p50_ms']:9.3f} ms   "
+                  f"p95 {results[name][window]['p95_ms']:9.3f} ms")
+
+    if audio_ids:
+        cycle = iter(audio_ids * (repeat + warmup))
+        stats = measure(lambda: get_audio_environmental_data_logic(next(cycle)), repeat, warmup)
+        results['get_audio_environmental_data_logic'] = {'recording': stats}
+        print(f"{'get_audio_environmental_data_logic':34} {'recording':11} p50 {stats['p50_ms']:9.3f} ms   "
+              f"p95 {stats['p95_ms']:9.3f} ms")
+    return results
+
+# ==========
+# RESULTS
+# ==========
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        commit = git('rev-parse', '--short', 'HEAD')
+        dirty = bool(git('status', '--porcelain', '--untracked-files=no'))
+    except OSError:
+        return 'unknown'
+    return f"{commit}-dirty" if dirty and commit else commit or 'unknown'
+
+def compare(results, baseline_path):
+    """Prints the p50/p95 change of every query and window against an older result file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit')} ({baseline_path}):")
+    for name, windows in results['queries'].items():
+        for window, stats in windows.items():
+            old = baseline.get('queries', {}).get(name, {}).get(window)
+            if not old:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms'):
+                delta = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                changes.append(f"{key[:3]} {old[key]:.3f} -> {stats[key]:.3f} ms ({delta:+.1f}%)")
+            print(f"  {name:34} {window:11} " + "   ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest and query benchmark.")
+    parser.add_argument('--backend', choices=sorted(storage.BACKENDS), default='mysql')
+    parser.add_argument('--database', default='WEATHER_DB_BENCH', help="scratch database, dropped and recreated")
+    parser.add_argument('--sqlite-path', default=os.path.join(BACKEND_DIR, 'benchmarks', 'bench.db'),
+                        help="scratch SQLite file for --backend sqlite, deleted first")
+    parser.add_argument('--rows', type=int, default=10000, help="sensor and weather rows each")
+    parser.add_argument('--step', type=int, default=60, help="seconds between rows")
+    parser.add_argument('--audio', type=int, default=20, help="audio recordings to add")
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="older result file to compare with")
+    args = parser.parse_args()
+
+    if args.backend == 'sqlite':
+        create_sqlite_database(args.sqlite_path)
+    else:
+        create_database(args.database)
+    query_cache.max_entries = 0  # measure the database, not the cache
+
+    sensor_csv, weather_csv, timestamps = generate_dataset(args.rows, args.step, args.seed)
+    ingest = {
+        'sensor': time_ingest('sensor', sensor_csv, args.rows),
+        'weather': time_ingest('weather', weather_csv, args.rows),
+    }
+    audio_ids = insert_recordings(args.audio, timestamps)
+
+    results = {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(' ', 'seconds'),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'ingest': ingest,
+        'queries': run_queries(representative_windows(timestamps), audio_ids, args.repeat, args.warmup),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+# backend/benchmarks/loadtest.py
+"""
+HTTP load generator for the /api/v1 endpoints (standard library only).
+
+Drives a weighted mix of sensors / weather / combined / environmental / upload requests
+either with a fixed number of concurrent clients (--concurrency, closed loop) or at a
+fixed request rate (--rate, open loop: latency counts from the moment a request was due,
+so a stalled server is not hidden by clients that wait for it). Reports throughput, error
+rate and p50/p95/p99 latency per endpoint.
+
+--ramp runs several stages with growing load and reports where the app saturates
+(throughput stops growing while latency climbs, or errors appear). --baseline compares
+with an earlier --output file and exits with status 1 on a regression.
+
+Run from the Backend folder:
+    python benchmarks/loadtest.py --start-app --concurrency 16 --duration 30
+    python benchmarks/loadtest.py --url http://localhost:80 --ramp 1,2,4,8,16,32
+    python benchmarks/loadtest.py --rate 200 --mix sensors=50,combined=40,upload=10
+
+Note: 'upload' inserts rows into whatever database the app is using.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from bench_stats import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = 'sensors=35,weather=25,combined=25,environmental=15'
+
+# Saturation: the next stage adds less than this much throughput...
+SATURATION_MIN_GAIN = 0.10
+# ...while p95 latency grows by more than this factor
+SATURATION_LATENCY_GROWTH = 1.5
+
+# ==========
+# WORKLOAD
+# ==========
+
+class Workload:
+    """Builds the requests of the mix: (endpoint name, method, path, body, headers)."""
+
+    def __init__(self, mix, days, audio_ids, upload_rows):
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.audio_ids = audio_ids
+        self.upload_rows = upload_rows
+        # No filter (newest rows) plus whole days and single hours of the given days
+        self.windows = ['']
+        for day in days:
+            self.windows.append(f"?start_date={day}&end_date={day}")
+            self.windows.append(f"?start_date={day}&end_date={day}&start_time=12:00&end_time=12:59")
+
+    def next_request(self, rng):
+        name = rng.choices(self.names, self.weights)[0]
+        if name == 'environmental':
+            return name, 'GET', f"/api/v1/audio/environmental?audio_id={rng.choice(self.audio_ids)}", None, {}
+        if name == 'upload':
+            body, content_type = self._upload_body(rng)
+            return name, 'POST', '/api/v1/upload', body, {'Content-Type': content_type}
+        return name, 'GET', f"/api/v1/{name}{rng.choice(self.windows)}", None, {}
+
+    def _upload_body(self, rng):
+        """A small sensor CSV at random timestamps, as the insert page would send it."""
+        start = int(time.time()) - rng.randrange(86400 * 365)
+        lines = ["moisture;timestamp"]
+        lines += [f"{rng.uniform(5, 95):.2f};{start + 60 * i}" for i in range(self.upload_rows)]
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="loadtest.csv"\r\n'
+            f"Content-Type: text/csv\r\n\r\n" + "\n".join(lines) + f"\r\n--{boundary}--\r\n"
+        ).encode('utf-8')
+        return body, f"multipart/form-data; boundary={boundary}"
+
+def _send(base_url, method, path, body, headers, timeout):
+    """Returns the HTTP status (0 for connection errors)."""
+    request = urllib.request.Request(base_url + path, data=body, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+def _get_json(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def discover_audio_ids(base_url, limit=100):
+    try:
+        return [item['id'] for item in _get_json(f"{base_url}/api/v1/audio?limit={limit}")['items']]
+    except Exception as e:
+        print(f"Could not list recordings: {e}")
+        return []
+
+# ===========
+# LOAD STAGES
+# ===========
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (endpoint, seconds, ok)
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, status):
+        with self._lock:
+            self.samples.append((name, seconds, 200 <= status < 400))
+
+def run_closed_loop(base_url, workload, concurrency, duration, timeout, seed):
+    """'concurrency' clients, each sending its next request as soon as the last one returns."""
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        while time.monotonic() < deadline:
+            name, method, path, body, headers = workload.next_request(rng)
+            started = time.monotonic()
+            status = _send(base_url, method, path, body, headers, timeout)
+            recorder.add(name, time.monotonic() - started, status)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder.samples
+
+def run_open_loop(base_url, workload, rate, duration, timeout, seed, max_workers):
+    """Starts requests at a fixed rate whether or not earlier ones have returned."""
+    recorder = Recorder()
+    rng = random.Random(seed)
+
+    def fire(name, method, path, body, headers, due):
+        status = _send(base_url, method, path, body, headers, timeout)
+        recorder.add(name, time.monotonic() - due, status)  # includes time spent queued
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        start = time.monotonic()
+        for i in range(int(rate * duration)):
+            due = start + i / rate
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, *workload.next_request(rng), due)
+    return recorder.samples
+
+# ========
+# REPORTS
+# ========
+
+def _stats(samples, seconds):
+    latencies = sorted(s[1] * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s[2])
+    if not latencies:
+        return {'requests': 0, 'throughput_rps': 0.0, 'error_rate': 0.0}
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / seconds, 2),
+        'error_rate': round(errors / len(samples), 4),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+
+def summarize_stage(samples, seconds, load):
+    names = sorted({s[0] for s in samples})
+    return {
+        'load': load,
+        'overall': _stats(samples, seconds),
+        'endpoints': {n: _stats([s for s in samples if s[0] == n], seconds) for n in names},
+    }
+
+def print_stage(stage):
+    o = stage['overall']
+    print(f"\n{stage['load']}: {o['requests']} requests, {o['throughput_rps']} req/s, "
+          f"{o['error_rate'] * 100:.2f}% errors")
+    print(f"  {'endpoint':14} {'req/s':>9} {'errors':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in [('ALL', o)] + list(stage['endpoints'].items()):
+        if not s['requests']:
+            continue
+        print(f"  {name:14} {s['throughput_rps']:9.2f} {s['error_rate'] * 100:7.2f}% "
+              f"{s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['p99_ms']:9.2f}")
+
+def find_saturation(stages, max_error_rate):
+    """First stage where more load stopped paying off, or None."""
+    for previous, stage in zip(stages, stages[1:]):
+        p, s = previous['overall'], stage['overall']
+        if not p['requests'] or not s['requests']:
+            continue
+        if s['error_rate'] > max_error_rate:
+            return stage, f"error rate {s['error_rate'] * 100:.2f}%"
+        gain = (s['throughput_rps'] - p['throughput_rps']) / p['throughput_rps'] if p['throughput_rps'] else 0
+        if gain < SATURATION_MIN_GAIN and s['p95_ms'] > p['p95_ms'] * SATURATION_LATENCY_GROWTH:
+            return stage, (f"throughput +{gain * 100:.1f}% while p95 went "
+                           f"{p['p95_ms']} -> {s['p95_ms']} ms")
+    return None
+
+def find_regressions(stages, baseline, tolerance):
+    """Stages run at the same load in both files: p95 up or throughput down by > tolerance."""
+    regressions = []
+    old_stages = {s['load']: s for s in baseline.get('stages', [])}
+    for stage in stages:
+        old = old_stages.get(stage['load'])
+        if not old:
+            continue
+        for name, s in [('ALL', stage['overall'])] + list(stage['endpoints'].items()):
+            o = old['overall'] if name == 'ALL' else old['endpoints'].get(name)
+            if not o or not o.get('requests') or not s['requests']:
+                continue
+            if s['p95_ms'] > o['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{stage['load']} {name}: p95 {o['p95_ms']} -> {s['p95_ms']} ms")
+            if name == 'ALL' and s['throughput_rps'] < o['throughput_rps'] * (1 - tolerance):
+                regressions.append(f"{stage['load']}: throughput {o['throughput_rps']} -> {s['throughput_rps']} req/s")
+    return regressions
+
+# ===========
+# LOCAL APP
+# ===========
+
+def start_app(server, port):
+    """Starts the app from the Backend folder and waits until it answers."""
+    env = dict(os.environ, WEB_BIND=f"127.0.0.1:{port}", PURGE_INTERVAL='0')
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, 'app.py']  # development server, always port 5000
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port if server == 'gunicorn' else 5000}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The app exited during startup (status {process.returncode}).")
+        if _send(base_url, 'GET', '/api/v1/cache/stats', None, {}, 2) == 200:
+            return process, base_url
+        time.sleep(0.5)
+    process.terminate()
+    sys.exit("The app did not come up within 30 seconds.")
+
+def stop_app(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'sensors', 'weather', 'combined', 'environmental', 'upload'}
+    if unknown:
+        sys.exit(f"Unknown endpoint(s) in --mix: {', '.join(sorted(unknown))}")
+    return {n: w for n, w in mix.items() if w > 0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent HTTP load test of the /api/v1 endpoints.")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="app base URL")
+    parser.add_argument('--start-app', choices=['gunicorn', 'flask'], nargs='?', const='gunicorn',
+                        help="start the app locally for the test (default server: gunicorn)")
+    parser.add_argument('--port', type=int, default=5050, help="port for --start-app gunicorn")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, help="concurrent clients (closed loop, default 8)")
+    load.add_argument('--rate', type=float, help="requests per second (open loop)")
+    parser.add_argument('--ramp', help="comma separated stage loads, e.g. 1,2,4,8,16 (clients, or req/s with --rate)")
+    parser.add_argument('--duration', type=float, default=20, help="seconds per stage")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX}; also: upload)")
+    parser.add_argument('--days', help="comma separated YYYY-MM-DD days to query (default: yesterday)")
+    parser.add_argument('--upload-rows', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--max-workers', type=int, default=256, help="request threads in --rate mode")
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="earlier --output file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative change vs. baseline")
+    args = parser.parse_args()
+
+    mode = 'rate' if args.rate else 'concurrency'
+    if args.ramp:
+        loads = [float(x) if mode == 'rate' else int(x) for x in args.ramp.split(',')]
+    else:
+        loads = [args.rate if mode == 'rate' else (args.concurrency or 8)]
+
+    process = None
+    base_url = args.url.rstrip('/')
+    if args.start_app:
+        process, base_url = start_app(args.start_app, args.port)
+
+    try:
+        mix = parse_mix(args.mix)
+        audio_ids = discover_audio_ids(base_url) if 'environmental' in mix else []
+        if 'environmental' in mix and not audio_ids:
+            print("No recordings found, leaving 'environmental' out of the mix.")
+            mix.pop('environmental')
+        days = args.days.split(',') if args.days else [f"{datetime.now() - timedelta(days=1):%Y-%m-%d}"]
+        workload = Workload(mix, days, audio_ids, args.upload_rows)
+
+        stages = []
+        for value in loads:
+            label = f"{value} req/s" if mode == 'rate' else f"{value} clients"
+            started = time.monotonic()
+            if mode == 'rate':
+                samples = run_open_loop(base_url, workload, value, args.duration, args.timeout,
+                                        args.seed, args.max_workers)
+            else:
+                samples = run_closed_loop(base_url, workload, value, args.duration, args.timeout, args.seed)
+            stage = summarize_stage(samples, time.monotonic() - started, label)
+            stages.append(stage)
+            print_stage(stage)
+    finally:
+        if process:
+            stop_app(process)
+
+    saturation = find_saturation(stages, args.max_error_rate)
+    if saturation:
+        stage, reason = saturation
+        best = max(stages, key=lambda s: s['overall']['throughput_rps'])
+        print(f"\nSaturated at {stage['load']} ({reason}); best throughput "
+              f"{best['overall']['throughput_rps']} req/s at {best['load']}.")
+    elif len(stages) > 1:
+        print("\nNo saturation within the tested loads.")
+
+    results = {
+        'created': datetime.now().isoformat(' ', 'seconds'),
+        'url': base_url,
+        'mode': mode,
+        'mix': mix,
+        'duration': args.duration,
+        'stages': stages,
+        'saturated_at': saturation[0]['load'] if saturation else None,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(stages, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.baseline} (tolerance {args.tolerance * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+# backend/cache.py
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_MAX_ROWS, QUERY_CACHE_TTL
+from metrics import Counter, Gauge
+
+# ==============
+# DATA VERSIONS
+# ==============
+
+# One write counter per table. The array lives in shared memory and is created at import
+# time, so when the app is preloaded before the server forks its workers they all see
+# the same counters and a write in one worker invalidates the caches of the others.
+VERSIONED_TABLES = ('SENSOR_DATA', 'WEATHER_DATA', 'AUDIO_RECORDING')
+_versions = multiprocessing.Array('q', len(VERSIONED_TABLES))
+# Second counter per table that only moves when rows other than brand-new ones changed
+# (deletes, restores, dropped partitions). While it stays put, everything that happened
+# since a given version can be found by primary key (see hot_window.py).
+_rewrite_versions = multiprocessing.Array('q', len(VERSIONED_TABLES))
+# Wall-clock time of the last rewrite per table: reads stay on the primary until the read
+# replicas have caught up with it (see replicas.py)
+_rewrite_times = multiprocessing.Array('d', len(VERSIONED_TABLES))
+# Wall-clock time of the last write of any kind per table
+_write_times = multiprocessing.Array('d', len(VERSIONED_TABLES))
+
+# Set while a result is loaded from a read replica that may not have the latest writes of
+# its tables yet (see replicas.py). Such a result is served but never cached: under the
+# new version it would also be served to the writer, who must see their own rows.
+_replica_behind = contextvars.ContextVar('replica_behind', default=False)
+# The same for a whole response: a list shared with the query threads of the request
+# (see watch_replica_reads); it must then not get an ETag either.
+_response_behind = contextvars.ContextVar('response_behind', default=None)
+
+# Counters restart at 0 on every boot, so ETags also carry a random boot id
+BOOT_ID = os.urandom(4).hex()
+
+def bump_data_version(table, appended=False):
+    """
+    Marks every cached result read from 'table' as stale. Call after a commit; pass
+    appended=True when the commit only inserted (or REPLACEd) rows.
+    """
+    index = VERSIONED_TABLES.index(table)
+    with _versions.get_lock():
+        _versions[index] += 1
+        _write_times[index] = time.time()
+    if not appended:
+        with _rewrite_versions.get_lock():
+            _rewrite_versions[index] += 1
+            _rewrite_times[index] = time.time()
+
+def data_version(table):
+    return _versions[VERSIONED_TABLES.index(table)]
+
+def rewrite_version(table):
+    return _rewrite_versions[VERSIONED_TABLES.index(table)]
+
+def rewrite_time(table):
+    return _rewrite_times[VERSIONED_TABLES.index(table)]
+
+def write_time(table):
+    return _write_times[VERSIONED_TABLES.index(table)]
+
+def mark_replica_behind():
+    _replica_behind.set(True)
+    marks = _response_behind.get()
+    if marks is not None:
+        marks.append(True)
+
+def watch_replica_reads():
+    """
+    Call before building a response. Returns a list that becomes non-empty when any read
+    made for it, in this thread or a query thread started from it, was marked behind.
+    """
+    marks = []
+    _response_behind.set(marks)
+    return marks
+
+def data_etag(tables):
+    """
+    ETag for a response built from 'tables'. It changes when any of the tables is written
+    and at least once per cache TTL, so edits made outside the app are picked up too.
+    """
+    versions = '.'.join(str(data_version(t)) for t in tables)
+    epoch = int(time.time() // QUERY_CACHE_TTL) if QUERY_CACHE_TTL > 0 else 0
+    return f"{BOOT_ID}-{epoch}-{versions}"
+
+# ============
+# QUERY CACHE
+# ============
+
+class QueryCache:
+    """
+    LRU + TTL cache for query results (lists of rows).
+    Each entry remembers the data versions it was read at and is never served once
+    one of them has moved on. Memory is bounded by entry count and total row count.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, max_rows=QUERY_CACHE_MAX_ROWS, ttl=QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, versions, rows)
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, entry_versions, rows = entry
+            if entry_versions != versions or expires_at < time.monotonic():
+                self._remove(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, versions, rows):
+        if self.max_entries <= 0 or self.ttl <= 0 or len(rows) > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, versions, rows)
+            self._rows += len(rows)
+
+            # Evict least recently used entries until both limits hold again
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, key, tables, loader, cacheable=lambda rows: True):
+        """
+        Returns the cached rows for 'key' or calls 'loader' and caches its result.
+        Versions are read *before* loading, so a write that lands while the query runs
+        leaves the new entry already stale instead of serving outdated rows later.
+        """
+        versions = tuple(data_version(t) for t in tables)
+        rows = self.get(key, versions)
+        if rows is not None:
+            return rows
+
+        token = _replica_behind.set(False)
+        try:
+            rows = loader()
+            behind = _replica_behind.get()
+        finally:
+            _replica_behind.reset(token)
+        if not behind and cacheable(rows):
+            self.put(key, versions, rows)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'rows': self._rows,
+                'max_entries': self.max_entries,
+                'max_rows': self.max_rows,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'data_versions': {t: data_version(t) for t in VERSIONED_TABLES},
+            }
+
+    def _remove(self, key):
+        _, _, rows = self._entries.pop(key)
+        self._rows -= len(rows)
+
+
+query_cache = QueryCache()
+
+Counter('query_cache_lookups_total', "Query cache lookups by result.", ('result',),
+        function=lambda: {('hit',): query_cache.hits, ('miss',): query_cache.misses})
+Gauge('query_cache_rows', "Rows held by the query cache.", function=lambda: query_cache._rows)
@@ -3,6 +3,9 @@ import os
 
 load_dotenv()
 # --- DATABASE CONFIG ---
+# 'mysql' (server, DB_CONFIG below) or 'sqlite' (embedded file at SQLITE_PATH, no server
+# process; meant for single-board deployments, see storage.py)
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
 # Inside Docker, 'host' must match the service name in docker-compose.yml
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'db'), 
@@ -11,6 +14,148 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME')
 }
 
+# --- SERVER ---
+# Debug (debugger + reloader) only when explicitly asked for, never by default
+DEBUG = os.getenv('FLASK_DEBUG', '0').lower() in ('1', 'true', 'yes') or os.getenv('FLASK_ENV') == 'development'
+# Production server (gunicorn.conf.py): worker processes and threads per worker
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+# Idle connections kept per worker process, server and cursor type (see db.py)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+
+# --- READ REPLICAS ---
+# MySQL replicas for read-only sessions (db_session(intent='read'), see replicas.py):
+# 'host' or 'host:port', comma separated, same user/password/database as DB_CONFIG (the
+# user needs REPLICATION CLIENT there). Each one is checked every
+# DB_REPLICA_CHECK_INTERVAL seconds and skipped while it is unreachable, not replicating
+# or more than DB_REPLICA_MAX_LAG seconds behind. After a delete or restore, and after a
+# client's own writes, reads stay on the primary until the replica has caught up plus
+# DB_REPLICA_STICKY_SECONDS.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 10))
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 2))
+
+# --- CONCURRENT QUERIES ---
+# Independent sub-queries of one request run in parallel on this many threads per
+# worker, each on its own pooled connection, and are cancelled after QUERY_TIMEOUT seconds
+QUERY_FANOUT_WORKERS = int(os.getenv('QUERY_FANOUT_WORKERS', 8))
+QUERY_TIMEOUT = float(os.getenv('QUERY_TIMEOUT', 10))
+
+# --- METRICS ---
+# Served at /metrics. With several workers each one writes its numbers to METRICS_DIR
+# every METRICS_FLUSH_INTERVAL seconds so a scrape can add them up (gunicorn.conf.py
+# sets a default); empty means this process only.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# --- QUERY PROFILING ---
+# Statements slower than SLOW_QUERY_MS go to the slow-query log (JSON lines with their
+# EXPLAIN plan) at SLOW_QUERY_LOG, or to stdout when that is empty; 0 turns it off.
+# QUERY_PROFILE adds per-request query timings (X-Query-Profile header, /api/v1/debug/queries).
+# Parameters are logged as their types only unless QUERY_LOG_PARAMS is 'full'.
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 1000))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', '')
+QUERY_PROFILE = os.getenv('QUERY_PROFILE', '1' if DEBUG else '0').lower() in ('1', 'true', 'yes')
+QUERY_PROFILE_KEEP = int(os.getenv('QUERY_PROFILE_KEEP', 100))
+QUERY_LOG_PARAMS = os.getenv('QUERY_LOG_PARAMS', 'redact')
+
+# --- INGEST API ---
+# Readings posted to /api/v1/ingest are appended to a spool file in INGEST_SPOOL_DIR
+# (fsync'ed before the reply, unless INGEST_FSYNC is off) and written to the database in
+# bulk every INGEST_FLUSH_INTERVAL seconds, or as soon as INGEST_BATCH_SIZE readings are
+# waiting. With more than INGEST_MAX_PENDING readings not yet written the endpoint
+# answers 503 so the stations back off; one request may carry INGEST_MAX_BATCH readings.
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+INGEST_FLUSH_INTERVAL = float(os.getenv('INGEST_FLUSH_INTERVAL', 1))
+INGEST_MAX_PENDING = int(os.getenv('INGEST_MAX_PENDING', 100000))
+INGEST_MAX_BATCH = int(os.getenv('INGEST_MAX_BATCH', 10000))
+INGEST_FSYNC = os.getenv('INGEST_FSYNC', '1').lower() in ('1', 'true', 'yes')
+
+# --- LIVE EVENTS ---
+# /api/v1/events pushes new rows over Server-Sent Events. Each worker checks for writes
+# every EVENTS_POLL_INTERVAL seconds (ingest flushes in the same worker wake it at once),
+# keeps at most EVENTS_QUEUE_SIZE unsent batches per subscriber and serves at most
+# EVENTS_MAX_SUBSCRIBERS streams, each of which occupies one of its threads.
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', 1))
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', max(1, WEB_THREADS // 2)))
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', 15))
+# Readers that follow a table by primary key (live events, hot window) read the ids of the
+# last LATE_COMMIT_SECONDS again: an id is taken at insert time but shows up at commit, so
+# a write transaction that runs longer than this can still slip past them.
+LATE_COMMIT_SECONDS = float(os.getenv('LATE_COMMIT_SECONDS', 10))
+
+# --- HOT WINDOW ---
+# The last HOT_WINDOW_HOURS hours of sensor and weather rows are kept in memory (NumPy
+# arrays, at most HOT_WINDOW_MAX_MB per worker) and answer the "latest rows" queries that
+# fall inside them; fully reloaded every HOT_WINDOW_REFRESH seconds. 0 hours turns it off.
+HOT_WINDOW_HOURS = float(os.getenv('HOT_WINDOW_HOURS', 24))
+HOT_WINDOW_MAX_MB = float(os.getenv('HOT_WINDOW_MAX_MB', 32))
+HOT_WINDOW_REFRESH = float(os.getenv('HOT_WINDOW_REFRESH', 300))
+
+# --- ALIGNMENT ---
+# The combined query can align sensor and weather rows onto a grid of ALIGN_STEP seconds
+# instead of joining equal timestamps (see alignment.py); at most ALIGN_MAX_POINTS grid
+# points per request. The audio details get AUDIO_ALIGN_POINTS interpolated points over
+# the recording, using samples up to AUDIO_ALIGN_TOLERANCE seconds outside of it.
+ALIGN_STEP = int(os.getenv('ALIGN_STEP', 60))
+ALIGN_MAX_POINTS = int(os.getenv('ALIGN_MAX_POINTS', 10000))
+AUDIO_ALIGN_POINTS = int(os.getenv('AUDIO_ALIGN_POINTS', 120))
+AUDIO_ALIGN_TOLERANCE = int(os.getenv('AUDIO_ALIGN_TOLERANCE', 300))
+
+# --- AUDIO FEATURES ---
+# Every WAV recording gets per-second loudness (RMS, peak) and the energy in the
+# frequency bands between these edges (Hz), see audio_features.py
+AUDIO_FEATURE_BANDS = [int(edge) for edge in os.getenv('AUDIO_FEATURE_BANDS', '0,250,1000,4000,8000,16000').split(',')]
+
+# --- STATISTICS SKETCHES ---
+# Hourly fixed-bin histograms per column, kept up to date with every write (see
+# sketches.py): column -> (lowest, highest, bin width). Quantiles from /api/v1/statistics
+# are exact to one bin width; values outside the range are counted but less precise.
+SKETCH_BINS = {
+    'moisture': (0, 100, 0.1),
+    'in_temperature': (-50, 60, 0.1),
+    'out_temperature': (-50, 60, 0.1),
+    'in_humidity': (0, 100, 1),
+    'out_humidity': (0, 100, 1),
+    'wind_speed': (0, 60, 0.1),
+    'daily_rain': (0, 300, 0.2),
+    'rain_rate': (0, 200, 0.2),
+}
+STATISTICS_MAX_BINS = int(os.getenv('STATISTICS_MAX_BINS', 200))
+
+# --- ROW STREAMING ---
+# /api/v1/rows/<type> streams up to ROWS_STREAM_MAX rows per request as NDJSON, read from
+# the database ROWS_STREAM_CHUNK rows at a time (the query page's scrolling table)
+ROWS_STREAM_CHUNK = int(os.getenv('ROWS_STREAM_CHUNK', 2000))
+ROWS_STREAM_MAX = int(os.getenv('ROWS_STREAM_MAX', 50000))
+
+# --- QUERY CACHE ---
+# Bounded LRU cache of query results. Entries expire after QUERY_CACHE_TTL seconds
+# and are dropped as soon as one of the tables they were read from changes.
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 256))
+QUERY_CACHE_MAX_ROWS = int(os.getenv('QUERY_CACHE_MAX_ROWS', 200000))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 60))
+
+# --- PARTITIONING ---
+# SENSOR_DATA and WEATHER_DATA are RANGE partitioned by month (see partitions.py).
+# Months older than DATA_RETENTION_MONTHS are dropped whole; 0 keeps everything.
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', 3))
+DATA_RETENTION_MONTHS = int(os.getenv('DATA_RETENTION_MONTHS', 0))
+
+# --- BATCH DELETE / RESTORE ---
+# Soft delete and restore never update more than this many rows per statement
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 1000))
+
+# --- PURGE WORKER ---
+# Soft deleted rows past their delete_at are removed in primary-key chunks of
+# PURGE_CHUNK_SIZE rows, sleeping PURGE_CHUNK_PAUSE seconds between chunks so ingest
+# never waits long on locks. PURGE_INTERVAL = 0 disables the background worker.
+PURGE_INTERVAL = float(os.getenv('PURGE_INTERVAL', 3600))
+PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', 500))
+PURGE_CHUNK_PAUSE = float(os.getenv('PURGE_CHUNK_PAUSE', 0.2))
+
 # --- FOLDER PATHS ---
 # os.path.dirname(os.path.abspath(__file__)) points to the 'Backend' folder
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -23,6 +168,15 @@ STATIC_FOLDER_PATH = os.path.join(BASE_DIR, 'static')
 AUDIO_DIRECTORY = os.path.join(BASE_DIR, 'audio_files')
 UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
 
+# Content-addressed audio files (objects/ab/cd/<sha256>.<ext>, see audio_store.py)
+AUDIO_STORE_DIR = os.getenv('AUDIO_STORE_DIR', os.path.join(AUDIO_DIRECTORY, 'store'))
+
+# Database file when DB_BACKEND = 'sqlite'
+SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(BASE_DIR, 'data', 'weather.db'))
+
+# Spool of accepted, not yet written ingest readings (see ingest.py)
+INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', os.path.join(BASE_DIR, 'data', 'ingest_spool'))
+
 # Create directories if they don't exist
 for d in [AUDIO_DIRECTORY, UPLOAD_DIR]:
     if not os.path.exists(d):
@@ -10,6 +10,27 @@ WEATHER_FIELDS = [
 ]
 # ------------------------------
 
+def convert_reading(data_row, data_type):
+    """
+    Converts the values of one reading in place (shared by CSV uploads and the ingest API).
+    Raises ValueError/TypeError when a value can't be converted.
+    """
+    # Convert timestamp (Unix)
+    data_row['timestamp'] = int(float(data_row['timestamp']))
+
+    # Conversion for Sensor Data
+    if data_type == 'sensor':
+        val_key = 'moisture' if 'moisture' in data_row else 'humidity'
+        data_row[val_key] = float(data_row[val_key])
+
+    # Conversion for Weather Data
+    elif data_type == 'weather':
+        for key in ['in_temperature', 'out_temperature', 'wind_speed', 'daily_rain', 'rain_rate']:
+            data_row[key] = float(data_row[key]) if data_row.get(key) else 0.0
+        for key in ['in_humidity', 'out_humidity']:
+            data_row[key] = int(float(data_row[key])) if data_row.get(key) else 0
+    return data_row
+
 def process_csv_file(file_stream):
     """
     Processes CSV data directly from memory. 
@@ -53,14 +74,17 @@ def process_csv_file(file_stream):
             field_map = SENSOR_FIELDS
             insert_func = db.insert_sensor_data
             data_type = "Sensor"
+            table = 'SENSOR_DATA'
         elif col_count == 9: 
             field_map = WEATHER_FIELDS
             insert_func = db.insert_weather_data
             data_type = "Weather"
+            table = 'WEATHER_DATA'
         else:
             return {"status": "error", "message": f"Unsupported column count: {col_count}"}
 
         # 4. Loop through remaining rows
+        inserted = []  # timestamps, for one sketch refresh at the end
         for row in csvreader:
             total_rows += 1
             stripped_row = [v.strip() for v in row]
@@ -75,26 +99,14 @@ def process_csv_file(file_stream):
                 if not data_row.get('timestamp'):
                     raise ValueError("Missing timestamp")
                 
-                # Convert timestamp (Unix)
-                data_row['timestamp'] = int(float(data_row['timestamp']))
-                
-                # Conversion for Sensor Data
-                if col_count == 2:
-                    val_key = 'moisture' if 'moisture' in data_row else 'humidity'
-                    data_row[val_key] = float(data_row[val_key])
-                    
-                # Conversion for Weather Data
-                elif col_count == 9:
-                    for key in ['in_temperature', 'out_temperature', 'wind_speed', 'daily_rain', 'rain_rate']:
-                        data_row[key] = float(data_row[key]) if data_row.get(key) else 0.0
-                    for key in ['in_humidity', 'out_humidity']:
-                        data_row[key] = int(float(data_row[key])) if data_row.get(key) else 0
+                convert_reading(data_row, 'sensor' if col_count == 2 else 'weather')
 
                 # 5. Insert into Database
-                result, msg = insert_func(data_row)
+                result, msg = insert_func(data_row, sketch=False)
                 
                 if result:
                     success_count += 1
+                    inserted.append(data_row['timestamp'])
                     print(f"[Row {total_rows}] SUCCESS: Processed {data_type} data.")
                 else:
                     fail_count += 1
@@ -105,6 +117,9 @@ def process_csv_file(file_stream):
                 fail_count += 1
                 errors.append(f"Row {total_rows} Conversion Error: {str(e)}")
 
+        # 6. Hourly statistics sketches of every touched hour, in one pass
+        db.refresh_loaded_sketches(table, inserted)
+
         return {
             "status": "completed",
             "success_count": success_count,
@@ -1,32 +1,205 @@
 # backend/db.py
-import pymysql
-import pymysql.cursors
+import collections
+import os
+import threading
+import time
 from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from config import *
-from utils import format_timestamp
+from utils import format_timestamp, timestamp_filter
+from cache import VERSIONED_TABLES, bump_data_version
+from metrics import Counter, Gauge, INGEST_ROWS, timed_query
+from storage import get_backend
+from audio_store import place_blob, remove_blob
+from sketches import refresh_sketch_hours, refresh_sketches
+from replicas import DB_READS, replica_set
 
 # ====================
 # CONNECTION HANDLING
 # ====================
 
-def get_db_connection(dict_cursor=False):
+def get_db_connection(dict_cursor=False, replica=None):
     try:
-        cursor_type = pymysql.cursors.DictCursor if dict_cursor else pymysql.cursors.Cursor
-        return pymysql.connect(**DB_CONFIG, cursorclass=cursor_type)
+        # MySQL server or embedded SQLite file, depending on DB_BACKEND (see storage.py);
+        # a read replica is the same kind of server at another address
+        if replica is not None:
+            return get_backend().connect(dict_cursor, **replica.options)
+        return get_backend().connect(dict_cursor)
     except Exception as e:
-        print(f"ERROR: Could not connect to the database. Details: {e}")
+        print(f"ERROR: Could not connect to the database{f' replica {replica.name}' if replica else ''}. Details: {e}")
         return None
 
+class ConnectionPool:
+    """
+    Small per-process pool of idle connections, one list per server (primary or read
+    replica) and cursor type.
+    Connections are never shared between processes: after a fork (each production
+    worker) the pool notices the new pid and starts empty, so every worker opens its own.
+    """
+    # Connections idle longer than this are pinged before reuse
+    PING_AFTER_SECONDS = 30
+
+    def __init__(self, size=DB_POOL_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Inherited sockets belong to the parent; drop them without sending QUIT
+        self._pid = os.getpid()
+        self._idle = {}  # (replica name or None, dict_cursor) -> [(conn, idle since)]
+        self.opened = 0
+        self.in_use = 0
+
+    def after_fork(self):
+        # A lock held by another thread at fork time would stay held forever in the child
+        self._lock = threading.Lock()
+        self._reset()
+
+    def acquire(self, dict_cursor=False, replica=None):
+        if self._pid != os.getpid():
+            self.after_fork()
+
+        conn, idle_since = None, 0
+        key = (replica.name if replica else None, dict_cursor)
+        with self._lock:
+            if self._idle.get(key):
+                conn, idle_since = self._idle[key].pop()
+
+        if conn is not None and time.monotonic() - idle_since > self.PING_AFTER_SECONDS:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                conn = None
+
+        if conn is None:
+            conn = get_db_connection(dict_cursor, replica)
+            if conn:
+                with self._lock:
+                    self.opened += 1
+        if conn:
+            with self._lock:
+                self.in_use += 1
+        return conn
+
+    def release(self, conn, dict_cursor=False, replica=None):
+        with self._lock:
+            self.in_use -= 1
+        try:
+            # End any open transaction so the next user starts from a fresh snapshot
+            conn.rollback()
+        except Exception:
+            self._close(conn)
+            return
+
+        with self._lock:
+            idle = self._idle.setdefault((replica.name if replica else None, dict_cursor), [])
+            if self._pid == os.getpid() and len(idle) < self.size:
+                idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._lock:
+            idle = [entry for entries in self._idle.values() for entry in entries]
+            self._idle = {}
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {'idle': sum(len(entries) for entries in self._idle.values()),
+                    'in_use': self.in_use, 'opened': self.opened}
+
+
+connection_pool = ConnectionPool()
+
+Gauge('db_pool_connections', "Pooled DB connections by state.", ('state',),
+      function=lambda: {(state,): count for state, count in connection_pool.stats().items() if state != 'opened'})
+Counter('db_pool_connections_opened_total', "DB connections opened by the pool.",
+        function=lambda: connection_pool.stats()['opened'])
+
+# thread id -> connection currently borrowed by that thread, so a query running on
+# another thread can be cancelled (see kill_running_query)
+_active_connections = {}
+
 @contextmanager
-def db_session(dict_cursor=False):
-    """Context manager to automatically handle opening and closing connections."""
-    conn = get_db_connection(dict_cursor)
+def db_session(dict_cursor=False, intent='write', tables=VERSIONED_TABLES):
+    """
+    Context manager that borrows a pooled connection and hands it back afterwards.
+    intent='read' promises the session only reads 'tables'; it may then be served by a
+    read replica that has caught up with the writes the reader must see (replicas.py).
+    """
+    replica = replica_set.choose(tables) if intent == 'read' else None
+    conn = connection_pool.acquire(dict_cursor, replica)
+    if replica is not None and not conn:
+        replica.mark_down("connection failed")
+        replica = None
+        conn = connection_pool.acquire(dict_cursor)  # fall back to the primary
+    if intent == 'read':
+        DB_READS.inc('replica' if replica else 'primary')
+    thread_id = threading.get_ident()
+    if conn:
+        _active_connections[thread_id] = conn
     try:
         yield conn
     finally:
         if conn:
-            conn.close()
+            _active_connections.pop(thread_id, None)
+            connection_pool.release(conn, dict_cursor, replica)
+
+def kill_running_query(thread_ident):
+    """
+    Aborts the statement the given Python thread is running (KILL QUERY on MySQL,
+    interrupt() on SQLite). The thread gets an 'interrupted' error and its connection
+    stays usable.
+    """
+    conn = _active_connections.get(thread_ident)
+    if conn is None:
+        return False
+    try:
+        get_backend().cancel(conn)
+        return True
+    except Exception as e:
+        print(f"Kill Query Error: {e}")
+        return False
+
+class IdFloor:
+    """
+    Where a reader that follows a table by primary key has to look again. Ids are taken at
+    insert time but become visible at commit, so a row can appear below the highest id
+    already read; every id above floor() may still do so and is read again.
+    """
+
+    def __init__(self, start_id=0, window=LATE_COMMIT_SECONDS):
+        self.window = window
+        # (time, highest id read by then); 'start_id' stands until a mark is old enough
+        self._marks = collections.deque([(float('-inf'), start_id)])
+
+    def seen(self, last_id):
+        """Records that every committed row up to 'last_id' has been read."""
+        if self._marks[-1][1] != last_id:
+            self._marks.append((time.monotonic(), last_id))
 
+    def floor(self):
+        """The highest id read at least 'window' seconds ago."""
+        cutoff = time.monotonic() - self.window
+        while len(self._marks) > 1 and self._marks[1][0] <= cutoff:
+            self._marks.popleft()
+        return self._marks[0][1]
+
+def newest_ids(cursor, table, pk, count=1000):
+    """The 'count' highest primary keys of 'table', ascending; where a new IdFloor starts."""
+    cursor.execute(f"SELECT {pk} FROM {table} ORDER BY {pk} DESC LIMIT %s", (count,))
+    return sorted(row[0] for row in cursor.fetchall())
+
+@timed_query('sync_all_data')
 def sync_all_data(timestamp, source_type, source_id):
     with db_session() as conn:
         if not conn: return
@@ -57,7 +230,9 @@ def sync_all_data(timestamp, source_type, source_id):
 # DATA INSERTION
 # ===============
 
-def insert_sensor_data(data_row):
+@timed_query('insert_sensor_data')
+def insert_sensor_data(data_row, sketch=True):
+    # sketch=False: the caller refreshes the hourly sketches itself (refresh_loaded_sketches)
     ts = format_timestamp(data_row.get('timestamp'))
     if not ts: 
         return False, "Invalid timestamp"
@@ -73,15 +248,21 @@ def insert_sensor_data(data_row):
         
         try:
             cursor.execute(query, values)
-            conn.commit()
             last_id = cursor.lastrowid
+            refresh_audio_summaries(cursor, ts['timestamp'], ts['timestamp'])
+            if sketch:
+                refresh_sketches(cursor, 'SENSOR_DATA', ts['timestamp'], ts['timestamp'])
+            conn.commit()
+            bump_data_version('SENSOR_DATA', appended=True)
+            INGEST_ROWS.inc('SENSOR_DATA')
             sync_all_data(ts['timestamp'], 'sensor', last_id)
             return True, last_id
         except Exception as e:
             print(f"Sensor Data Insertion Error: {e}")
             return False, str(e)
  
-def insert_weather_data(data_row):
+@timed_query('insert_weather_data')
+def insert_weather_data(data_row, sketch=True):
     ts = format_timestamp(data_row.get('timestamp'))
     if not ts: 
         return False, "Invalid timestamp" 
@@ -109,47 +290,366 @@ def insert_weather_data(data_row):
             )
         
             cursor.execute(query, values)
-            conn.commit()
             last_id = cursor.lastrowid
+            refresh_audio_summaries(cursor, ts['timestamp'], ts['timestamp'])
+            if sketch:
+                refresh_sketches(cursor, 'WEATHER_DATA', ts['timestamp'], ts['timestamp'])
+            conn.commit()
+            bump_data_version('WEATHER_DATA', appended=True)
+            INGEST_ROWS.inc('WEATHER_DATA')
             sync_all_data(ts['timestamp'], 'weather', last_id)
             return True, last_id
         
         except Exception as e:
             print(f"Weather Data Insertion Error: {e}")
             return False, f"Insertion failed: {e}"
-        
+
+# Bulk writes for the ingest API (see ingest.py): table, primary key, ALL_DATA link column, columns
+READING_TABLES = {
+    'sensor': ('SENSOR_DATA', 'sensor_id', 'sensor_data_id', ('moisture',)),
+    'weather': ('WEATHER_DATA', 'weather_id', 'weather_data_id',
+                ('in_temperature', 'out_temperature', 'in_humidity', 'out_humidity',
+                 'wind_speed', 'wind_direction', 'daily_rain', 'rain_rate')),
+}
+
+def refresh_loaded_sketches(table, timestamps):
+    """
+    Rebuilds the hourly sketches (sketches.py) of the hours a row-by-row load touched,
+    once for the whole load. 'timestamps' are Unix times as passed to the insert functions.
+    """
+    stamps = [ts['timestamp'] for ts in map(format_timestamp, timestamps) if ts]
+    if not stamps:
+        return
+    with db_session() as conn:
+        if not conn:
+            return
+        cursor = conn.cursor()
+        try:
+            refresh_sketch_hours(cursor, table, stamps)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            # 'python sketches.py backfill' catches up later
+            print(f"Sketch Refresh Error ({table}): {e}")
+
+def _select_in_chunks(cursor, query, keys, chunk_size=BATCH_CHUNK_SIZE):
+    """Runs 'query' (with one '{}' for the IN list) over 'keys' in chunks, returns all rows."""
+    rows = []
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        cursor.execute(query.format(', '.join(['%s'] * len(chunk))), chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+@timed_query('insert_readings_batch')
+def insert_readings_batch(readings):
+    """
+    Writes many readings in one transaction: one multi-row REPLACE per table, then the
+    ALL_DATA links of every touched timestamp (keeping the link of the other table, like
+    sync_all_data). 'readings' maps 'sensor'/'weather' to lists of converted data rows.
+    Returns (success, {table: rows written}) or (False, error message).
+    """
+    with db_session() as conn:
+        if not conn:
+            return False, "Database connection failed."
+        try:
+            cursor = conn.cursor()
+            links = {}  # timestamp -> {link column: id}
+            written = {}
+            for data_type, rows in readings.items():
+                if not rows:
+                    continue
+                table, pk, link_col, columns = READING_TABLES[data_type]
+                values = []
+                for data_row in rows:
+                    ts = format_timestamp(data_row.get('timestamp'))
+                    values.append((ts['timestamp'], ts['date'], ts['time'], *(data_row.get(c) for c in columns)))
+
+                # PyMySQL sends executemany of a REPLACE ... VALUES as multi-row statements
+                column_list = ', '.join(['`timestamp`', '`date`', '`time`', *columns])
+                placeholders = ', '.join(['%s'] * (3 + len(columns)))
+                cursor.executemany(f"REPLACE INTO {table} ({column_list}) VALUES ({placeholders})", values)
+
+                stamps = [v[0] for v in values]
+                refresh_sketch_hours(cursor, table, stamps)
+                for row_id, ts in _select_in_chunks(
+                        cursor, f"SELECT {pk}, `timestamp` FROM {table} WHERE `timestamp` IN ({{}})", stamps):
+                    links.setdefault(str(ts), {})[link_col] = row_id
+                written[table] = len(values)
+
+            if links:
+                stamps = list(links)
+                existing = _select_in_chunks(
+                    cursor, "SELECT `timestamp`, weather_data_id, sensor_data_id FROM ALL_DATA "
+                            "WHERE `timestamp` IN ({}) FOR UPDATE", stamps)
+                current = {str(ts): {'weather_data_id': w_id, 'sensor_data_id': s_id} for ts, w_id, s_id in existing}
+                cursor.executemany(
+                    "REPLACE INTO ALL_DATA (timestamp, weather_data_id, sensor_data_id) VALUES (%s, %s, %s)",
+                    [(ts, new.get('weather_data_id', current.get(ts, {}).get('weather_data_id')),
+                      new.get('sensor_data_id', current.get(ts, {}).get('sensor_data_id')))
+                     for ts, new in links.items()])
+                refresh_audio_summaries(cursor, min(links), max(links))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Batch Insertion Error: {e}")
+            return False, str(e)
+
+    for table, count in written.items():
+        bump_data_version(table, appended=True)
+        INGEST_ROWS.inc(table, amount=count)
+    return True, written
+
+# ===========================
+# AUDIO ENVIRONMENT SUMMARIES
+# ===========================
+# One AUDIO_ENV_SUMMARY row per recording with the conditions while it was recorded. The
+# rows are written in the same transaction as the measurements they are computed from:
+# every write to SENSOR_DATA / WEATHER_DATA refreshes the recordings overlapping the
+# written time range, each with one indexed range aggregate per table.
+
+# Measurement table -> (series name, summarized columns)
+SUMMARY_SOURCES = {
+    'SENSOR_DATA': ('sensor', ('moisture',)),
+    'WEATHER_DATA': ('weather', ('in_temperature', 'out_temperature', 'in_humidity', 'out_humidity',
+                                 'wind_speed', 'daily_rain', 'rain_rate')),
+}
+
+# Columns that can be searched on (see services.search_audio_recordings)
+SUMMARY_COLUMNS = tuple(
+    [f"{series}_{stat}" for series, _ in SUMMARY_SOURCES.values() for stat in ('samples', 'coverage')]
+    + [f"{column}_{stat}" for _, columns in SUMMARY_SOURCES.values() for column in columns
+       for stat in ('min', 'max', 'avg')])
+
+def _as_datetime(value):
+    """DATETIME values come back as datetime (MySQL) or text (SQLite)."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    text = str(value)
+    return datetime.strptime(text[:19], '%Y-%m-%d %H:%M:%S' if len(text) > 10 else '%Y-%m-%d')
+
+def summarize_recording(cursor, audio_id, start_time, end_time):
+    """(Re)writes the summary of one recording. Runs in the caller's transaction."""
+    start, end = _as_datetime(start_time), _as_datetime(end_time)
+    # Coverage: share of the minutes the recording touches that have at least one reading
+    minutes = max(int((end.replace(second=0) - start.replace(second=0)).total_seconds() // 60) + 1, 1)
+    values = {}
+    for table, (series, columns) in SUMMARY_SOURCES.items():
+        stats = ', '.join(f"MIN({c}), MAX({c}), AVG({c})" for c in columns)
+        cursor.execute(f"""
+            SELECT COUNT(*), COUNT(DISTINCT SUBSTR(`timestamp`, 1, 16)), {stats}
+            FROM {table}
+            WHERE is_deleted = 0 AND `timestamp` BETWEEN %s AND %s
+        """, (start, end))
+        row = cursor.fetchone()
+        values[f"{series}_samples"] = row[0]
+        values[f"{series}_coverage"] = round(min(row[1] / minutes, 1.0), 4)
+        for index, column in enumerate(columns):
+            for offset, stat in enumerate(('min', 'max', 'avg')):
+                value = row[2 + 3 * index + offset]
+                values[f"{column}_{stat}"] = None if value is None else float(value)
+
+    columns = ['audio_id', 'start_time', 'end_time', 'duration', *values]
+    cursor.execute(f"REPLACE INTO AUDIO_ENV_SUMMARY ({', '.join(columns)}) "
+                   f"VALUES ({', '.join(['%s'] * len(columns))})",
+                   (audio_id, start, end, max(int((end - start).total_seconds()), 0), *values.values()))
+
+def refresh_audio_summaries(cursor, first, last):
+    """
+    Recomputes the summaries of every recording overlapping [first, last] (timestamps of
+    changed measurements). Runs in the caller's transaction; returns the recordings updated.
+    """
+    # Recordings starting more than the longest duration before 'first' can't overlap it
+    cursor.execute("SELECT MAX(duration) FROM AUDIO_ENV_SUMMARY")
+    longest = cursor.fetchone()[0]
+    if longest is None:
+        return 0
+    first, last = _as_datetime(first), _as_datetime(last)
+    cursor.execute("""
+        SELECT audio_id, start_time, end_time FROM AUDIO_ENV_SUMMARY
+        WHERE start_time BETWEEN %s AND %s AND end_time >= %s
+    """, (first - timedelta(seconds=int(longest)), last, first))
+    recordings = cursor.fetchall()
+    for audio_id, start_time, end_time in recordings:
+        summarize_recording(cursor, audio_id, start_time, end_time)
+    return len(recordings)
+
+def delete_audio_summaries(cursor, ids):
+    """Drops the summaries and feature tracks (audio_features.py) of recordings removed for good."""
+    if ids:
+        marks = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"DELETE FROM AUDIO_ENV_SUMMARY WHERE audio_id IN ({marks})", list(ids))
+        cursor.execute(f"DELETE FROM AUDIO_FEATURES WHERE audio_id IN ({marks})", list(ids))
+
+def summarize_missing_recordings(chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Summarizes the recordings that have no summary yet (recordings from before the table
+    existed). Returns the number of recordings summarized.
+    """
+    done = 0
+    with db_session() as conn:
+        if not conn: return 0
+        cursor = conn.cursor()
+        try:
+            while True:
+                cursor.execute("""
+                    SELECT A.id, A.start_time, A.end_time FROM AUDIO_RECORDING A
+                    LEFT JOIN AUDIO_ENV_SUMMARY S ON S.audio_id = A.id
+                    WHERE S.audio_id IS NULL
+                    LIMIT %s
+                """, (chunk_size,))
+                recordings = cursor.fetchall()
+                for audio_id, start_time, end_time in recordings:
+                    summarize_recording(cursor, audio_id, start_time, end_time)
+                conn.commit()
+                done += len(recordings)
+                if len(recordings) < chunk_size:
+                    break
+        except Exception as e:
+            print(f"Audio Summary Error: {e}")
+            conn.rollback()
+    if done:
+        print(f"Audio summaries: summarized {done} recordings")
+    return done
+
 # ====================
 # AUDDIODATA FUNCTION
 # ====================
 
+# Stored audio files are shared by every recording with the same content; AUDIO_BLOB
+# counts the references (see audio_store.py). The counts change in the transaction that
+# adds or removes the recording rows. Files nothing refers to any more are deleted only
+# after that transaction has committed (remove_unused_blobs), so a rollback never leaves
+# a recording without its file.
+
+def retain_blob(cursor, content_hash, ext, size):
+    """Adds a reference to a stored file. Returns True if the file was already known."""
+    cursor.execute("INSERT IGNORE INTO AUDIO_BLOB (content_hash, ext, size, ref_count) VALUES (%s, %s, %s, 0)",
+                   (content_hash, ext, size))
+    created = cursor.rowcount == 1
+    cursor.execute("UPDATE AUDIO_BLOB SET ref_count = ref_count + 1 WHERE content_hash = %s", (content_hash,))
+    return not created
+
+def release_blobs(cursor, hashes, decrement=True):
+    """
+    Drops one reference per entry of 'hashes' (None = recording without a stored file) and
+    the AUDIO_BLOB rows nothing refers to any more. Returns their (content_hash, ext); pass
+    them to remove_unused_blobs once the transaction is committed.
+    """
+    counts = {}
+    for content_hash in hashes:
+        if content_hash:
+            counts[content_hash] = counts.get(content_hash, 0) + 1
+    if not counts:
+        return []
+    if decrement:
+        cursor.executemany("UPDATE AUDIO_BLOB SET ref_count = ref_count - %s WHERE content_hash = %s",
+                           [(count, content_hash) for content_hash, count in counts.items()])
+    marks = ', '.join(['%s'] * len(counts))
+    cursor.execute(f"SELECT content_hash, ext FROM AUDIO_BLOB WHERE ref_count <= 0 AND content_hash IN ({marks})",
+                   list(counts))
+    unused = [tuple(row) for row in cursor.fetchall()]
+    if unused:
+        cursor.execute(f"DELETE FROM AUDIO_BLOB WHERE content_hash IN ({', '.join(['%s'] * len(unused))})",
+                       [row[0] for row in unused])
+    return unused
+
+def remove_unused_blobs(blobs):
+    """
+    Deletes the files of blobs released by a committed transaction (release_blobs). A file
+    stays when an upload has registered the same content again meanwhile, and files left
+    behind by a failure here are removed by 'audio_store.py gc'. Returns the bytes freed.
+    """
+    if not blobs:
+        return 0
+    freed = 0
+    with db_session() as conn:
+        if not conn:
+            return 0
+        cursor = conn.cursor()
+        for content_hash, ext in blobs:
+            try:
+                # Claiming the row makes an upload of this content wait until the file is gone
+                cursor.execute("INSERT IGNORE INTO AUDIO_BLOB (content_hash, ext, size, ref_count) VALUES (%s, %s, 0, 0)",
+                               (content_hash, ext))
+                if cursor.rowcount == 1:
+                    freed += remove_blob(content_hash, ext)
+                    cursor.execute("DELETE FROM AUDIO_BLOB WHERE content_hash = %s", (content_hash,))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Audio Store Error ({content_hash}): {e}")
+    return freed
+
+@timed_query('insert_audio_data')
 def insert_audio_data(audio_metadata):
+    """
+    Adds a recording; one with the same file_path (logical name) or the same start time is
+    replaced. With 'content_hash', 'ext', 'size' and 'source_path' (audio_store.save_upload)
+    the file is moved into the store in the same transaction. Returns (success, id or message).
+    """
     start_ts = format_timestamp(audio_metadata.get('start_timestamp'))
     end_ts = format_timestamp(audio_metadata.get('end_timestamp'))
     if not start_ts or not end_ts:
         return False, "Invalid start or end timestamp"
 
+    released = []
+    placed = False
     with db_session() as conn:
         if not conn:
             return False, "Database connection failed at insert_audio_data"
 
         try:
             cursor = conn.cursor()
-            # -- NEW: Changed INSERT to REPLACE
-            query = "REPLACE INTO AUDIO_RECORDING (`date`, start_time, end_time, file_path) VALUES (%s, %s, %s, %s)"
+            # The new reference comes first, so re-uploading the same content never deletes its file
+            content_hash = audio_metadata.get('content_hash')
+            if content_hash:
+                retain_blob(cursor, content_hash, audio_metadata['ext'], audio_metadata['size'])
+                placed = place_blob(audio_metadata['source_path'], content_hash, audio_metadata['ext'])
+
+            # A re-upload (same name or same start time) replaces the old recording, its
+            # summary and its reference to the stored file
+            cursor.execute("SELECT id, content_hash FROM AUDIO_RECORDING WHERE file_path = %s OR start_time = %s FOR UPDATE",
+                           (audio_metadata.get('filepath'), start_ts['timestamp']))
+            replaced = cursor.fetchall()
+            if replaced:
+                ids = [row[0] for row in replaced]
+                print(f"Duplicate found! Replacing recording(s) {ids}")
+                cursor.execute(f"DELETE FROM AUDIO_RECORDING WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+                delete_audio_summaries(cursor, ids)
+                released = release_blobs(cursor, [row[1] for row in replaced])
+
+            query = """
+                INSERT INTO AUDIO_RECORDING (`date`, start_time, end_time, file_path, content_hash)
+                VALUES (%s, %s, %s, %s, %s)
+            """
             values = (
                 start_ts['date'], start_ts['timestamp'],
-                end_ts['timestamp'], audio_metadata.get('filepath')
+                end_ts['timestamp'], audio_metadata.get('filepath'), content_hash
             )
         
             cursor.execute(query, values)
+            audio_id = cursor.lastrowid
+            summarize_recording(cursor, audio_id, start_ts['timestamp'], end_ts['timestamp'])
             conn.commit()
-            return True, cursor.lastrowid
         except Exception as e:
+            if placed:
+                # Nothing else refers to the file we just stored: remove it while the
+                # AUDIO_BLOB row is still locked, before another upload can count on it
+                remove_blob(content_hash, audio_metadata['ext'])
+            conn.rollback()
             print(f"Audio Data Insertion Error: {e}")
             return False, f"Insertion failed: {e}"
 
+    bump_data_version('AUDIO_RECORDING', appended=True)
+    INGEST_ROWS.inc('AUDIO_RECORDING')
+    remove_unused_blobs(released)
+    return True, audio_id
+
 def get_latest_audio_data(limit=10):
-    with db_session(dict_cursor=True) as conn:
+    with db_session(dict_cursor=True, intent='read', tables=('AUDIO_RECORDING',)) as conn:
         if not conn: return []
         cursor = conn.cursor()
         query = "SELECT * FROM AUDIO_RECORDING ORDER BY start_time DESC LIMIT %s"
@@ -158,126 +658,208 @@ def get_latest_audio_data(limit=10):
     
 def delete_audio_by_start_time(formatted_start_time):
     """
-    Checks if an audio file exists with the exact same start time.
-    Returns the file_path of the old file so we can delete it from the folder.
+    Deletes the recording(s) with exactly this start time, with their summaries and their
+    references to stored files (a file nothing else uses is removed).
+    Returns the file_path (logical name) of the deleted recording, or None.
     """
     old_file_path = None
+    released = []
     
     with db_session() as conn:
         if not conn: return None
         cursor = conn.cursor()
         
-        # 1. Find the path of the existing file (if any)
-        check_query = "SELECT file_path FROM AUDIO_RECORDING WHERE start_time = %s"
+        # 1. Find the existing recording (if any)
+        check_query = "SELECT file_path, id, content_hash FROM AUDIO_RECORDING WHERE start_time = %s FOR UPDATE"
         cursor.execute(check_query, (formatted_start_time,))
-        result = cursor.fetchone()
+        result = cursor.fetchall()
         
         if result:
-            old_file_path = result[0] # Get the path string
-            
-            # 2. Delete the database row
-            delete_query = "DELETE FROM AUDIO_RECORDING WHERE start_time = %s"
-            cursor.execute(delete_query, (formatted_start_time,))
-            conn.commit()
+            old_file_path = result[0][0] # Get the path string
             
+            # 2. Delete the database row (and what belongs to it)
+            try:
+                delete_query = "DELETE FROM AUDIO_RECORDING WHERE start_time = %s"
+                cursor.execute(delete_query, (formatted_start_time,))
+                delete_audio_summaries(cursor, [row[1] for row in result])
+                released = release_blobs(cursor, [row[2] for row in result])
+                conn.commit()
+            except Exception as e:
+                print(f"Audio Deletion Error: {e}")
+                conn.rollback()
+                return None
+            bump_data_version('AUDIO_RECORDING')
+
+    remove_unused_blobs(released)
     return old_file_path
 
 # =================
 # Soft deletion
 # =================
 
-def perform_batch_delete(ids, data_type):
+# data_type from the frontend -> (table, primary key, time column)
+SOFT_DELETE_TABLES = {
+    'sensor': ('SENSOR_DATA', 'sensor_id', '`timestamp`'),
+    'weather': ('WEATHER_DATA', 'weather_id', '`timestamp`'),
+    'audio': ('AUDIO_RECORDING', 'id', 'start_time'),
+}
+
+# SET clauses for hiding and restoring rows
+SOFT_DELETE_SET = "is_deleted = 1, delete_at = DATE_ADD(NOW(), INTERVAL 7 DAY)"
+RESTORE_SET = "is_deleted = 0, delete_at = NULL"
+
+def _update_ids_in_chunks(table, pk, set_clause, ids, chunk_size):
+    """
+    Runs 'UPDATE table SET ... WHERE pk IN (...)' over 'ids' in chunks of 'chunk_size'.
+    Every chunk is its own short transaction (measurements also refresh the audio
+    summaries they overlap); if one fails it is rolled back and the loop stops.
+    Returns (success, number of rows changed).
+    """
+    affected = 0
     with db_session() as conn:
-        if not conn: return False
+        if not conn: return False, 0
         cursor = conn.cursor()
-        
-        # Bestäm tabell och kolumn baserat på data_type från frontenden
-        if data_type == 'sensor':
-            table, pk = 'SENSOR_DATA', 'sensor_id'
-        elif data_type == 'weather':
-            table, pk = 'WEATHER_DATA', 'weather_id'
-        elif data_type == 'audio':
-            table, pk = 'AUDIO_RECORDING', 'id'
-        else:
-            return False
 
-        
-        placeholders = ', '.join(['%s'] * len(ids))
-        query = f"""
-            UPDATE {table}
-            SET is_deleted = 1,
-            delete_at = DATE_ADD(NOW(), INTERVAL 7 DAY)
-            WHERE {pk} IN ({placeholders})
-            """
-        
-        try:
-            # Vi skickar med hela listan med ID:n som en tuple
-            cursor.execute(query, tuple(ids))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Database Error: {e}")
-            return False
+        for start in range(0, len(ids), chunk_size):
+            chunk = tuple(ids[start:start + chunk_size])
+            placeholders = ', '.join(['%s'] * len(chunk))
+            try:
+                cursor.execute(f"UPDATE {table} SET {set_clause} WHERE {pk} IN ({placeholders})", chunk)
+                changed = cursor.rowcount
+                if table in SUMMARY_SOURCES:
+                    cursor.execute(f"SELECT `timestamp` FROM {table} WHERE {pk} IN ({placeholders}) "
+                                   f"ORDER BY `timestamp`", chunk)
+                    stamps = [row[0] for row in cursor.fetchall()]
+                    if stamps:
+                        refresh_audio_summaries(cursor, stamps[0], stamps[-1])
+                        refresh_sketch_hours(cursor, table, stamps)
+                conn.commit()
+                affected += changed
+                bump_data_version(table)
+            except Exception as e:
+                print(f"Database Error: {e}")
+                conn.rollback()
+                return False, affected
+
+    return True, affected
+
+def _update_range_in_chunks(table, pk, ts_col, set_clause, current_flag, conditions, params, chunk_size):
+    """
+    Flips is_deleted for every row in a time range, 'chunk_size' rows at a time.
+    Each chunk locks its rows (SELECT ... FOR UPDATE), updates them by primary key and
+    commits, so no statement ever touches more than one chunk.
+    Returns (success, number of rows changed).
+    """
+    affected = 0
+    select = f"""
+        SELECT {pk}, {ts_col} FROM {table}
+        WHERE is_deleted = %s AND {' AND '.join(conditions)}
+        ORDER BY {ts_col} LIMIT %s FOR UPDATE
+    """
+    with db_session() as conn:
+        if not conn: return False, 0
+        cursor = conn.cursor()
+
+        while True:
+            try:
+                cursor.execute(select, [current_flag, *params, chunk_size])
+                rows = cursor.fetchall()
+                chunk = [row[0] for row in rows]
+                if not chunk:
+                    conn.commit()
+                    break
+
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"UPDATE {table} SET {set_clause} WHERE {pk} IN ({placeholders})", chunk)
+                changed = cursor.rowcount
+                if table in SUMMARY_SOURCES:
+                    refresh_audio_summaries(cursor, rows[0][1], rows[-1][1])  # ordered by time
+                    refresh_sketches(cursor, table, rows[0][1], rows[-1][1])
+                conn.commit()
+                affected += changed
+                bump_data_version(table)
+            except Exception as e:
+                print(f"Database Error: {e}")
+                conn.rollback()
+                return False, affected
+
+            # Updated rows no longer match 'is_deleted = current_flag', so the next
+            # SELECT moves on by itself; a short chunk means we reached the end.
+            if len(chunk) < chunk_size:
+                break
+
+    return True, affected
+
+def perform_batch_delete(ids, data_type, chunk_size=BATCH_CHUNK_SIZE):
+    """Hides rows by id. Returns (success, number of rows hidden)."""
+    if data_type not in SOFT_DELETE_TABLES:
+        return False, 0
+    table, pk, _ = SOFT_DELETE_TABLES[data_type]
+    return _update_ids_in_chunks(table, pk, SOFT_DELETE_SET, list(ids), chunk_size)
+
+def perform_range_delete(data_type, start_date=None, end_date=None, start_time=None, end_time=None,
+                         chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Hides every row of 'data_type' inside a date/time range (same filters as the query page).
+    At least one date is required so a missing filter can never hide a whole table.
+    Returns (success, number of rows hidden).
+    """
+    if data_type not in SOFT_DELETE_TABLES or not (start_date or end_date):
+        return False, 0
+    table, pk, ts_col = SOFT_DELETE_TABLES[data_type]
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, ts_col)
+    return _update_range_in_chunks(table, pk, ts_col, SOFT_DELETE_SET, 0, conditions, params, chunk_size)
 
 
+# Single-row helpers (True when the row was hidden or restored)
 #Hide row in weather data
 def delete_weather_data(weather_id):
-    return perform_batch_delete([weather_id], 'weather')
+    success, _ = perform_batch_delete([weather_id], 'weather')
+    return success
 
 
 #Hide row in Sensor data
 def delete_sensor_data(sensor_id):
-    return perform_batch_delete([sensor_id], 'sensor')
+    success, _ = perform_batch_delete([sensor_id], 'sensor')
+    return success
 
 #Hide row in Audio recording data 
 def delete_audio_recording(id):
-    return perform_batch_delete([id], 'audio')
+    success, _ = perform_batch_delete([id], 'audio')
+    return success
     
 # =================
 # Regret deletion
 # =================
 
-def perform_batch_regret(ids, data_type):
-    with db_session() as conn:
-        if not conn: return False
-        cursor = conn.cursor()
-        
-        # Bestäm tabell och kolumn baserat på data_type från frontenden
-        if data_type == 'sensor':
-            table, pk = 'SENSOR_DATA', 'sensor_id'
-        elif data_type == 'weather':
-            table, pk = 'WEATHER_DATA', 'weather_id'
-        elif data_type == 'audio':
-            table, pk = 'AUDIO_RECORDING', 'id'
-        else:
-            return False
-
-        # Skapa rätt antal %s för din SQL-fråga (t.ex. %s, %s, %s)
-        placeholders = ', '.join(['%s'] * len(ids))
-        query = f"""
-            UPDATE {table}
-            SET is_deleted = 0,
-            delete_at = NULL
-            WHERE {pk} IN ({placeholders})"""
-        
-        try:
-            # Vi skickar med hela listan med ID:n som en tuple
-            cursor.execute(query, tuple(ids))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Database Error: {e}")
-            return False
+def perform_batch_regret(ids, data_type, chunk_size=BATCH_CHUNK_SIZE):
+    """Restores hidden rows by id. Returns (success, number of rows restored)."""
+    if data_type not in SOFT_DELETE_TABLES:
+        return False, 0
+    table, pk, _ = SOFT_DELETE_TABLES[data_type]
+    return _update_ids_in_chunks(table, pk, RESTORE_SET, list(ids), chunk_size)
+
+def perform_range_regret(data_type, start_date=None, end_date=None, start_time=None, end_time=None,
+                         chunk_size=BATCH_CHUNK_SIZE):
+    """Restores every hidden row of 'data_type' inside a date/time range. Same rules as perform_range_delete."""
+    if data_type not in SOFT_DELETE_TABLES or not (start_date or end_date):
+        return False, 0
+    table, pk, ts_col = SOFT_DELETE_TABLES[data_type]
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, ts_col)
+    return _update_range_in_chunks(table, pk, ts_col, RESTORE_SET, 1, conditions, params, chunk_size)
 
 
 def regret_weather_data_deletion(weather_id):
-    return perform_batch_regret([weather_id], 'weather')
+    success, _ = perform_batch_regret([weather_id], 'weather')
+    return success
 
 def regret_sensor_data_deletion(sensor_id):
-    return perform_batch_regret([sensor_id], 'sensor')
+    success, _ = perform_batch_regret([sensor_id], 'sensor')
+    return success
 
 def regret_audio_recording_deletion(id):
-    return perform_batch_regret([id], 'audio')    
+    success, _ = perform_batch_regret([id], 'audio')
+    return success    
 
 # =================
 # Vew deleted data
@@ -0,0 +1,288 @@
+# backend/events.py
+"""
+Live push of new rows to browsers over Server-Sent Events (GET /api/v1/events).
+
+One publisher thread per process serves all of its subscribers. It watches the shared
+data versions (cache.py), so it sees writes from every worker: CSV uploads, audio uploads
+and the ingest API, whose flushes also wake it at once via notify(). When a table
+changed it fetches only the rows added since the last look (primary key > last seen,
+one indexed range query per table, no matter how many browsers listen) and hands them
+to every subscriber whose filter matches. Rows can commit out of primary key order, so
+the ids of the last LATE_COMMIT_SECONDS are read again and those already sent skipped.
+
+Every subscriber has a bounded queue. A client that can't keep up doesn't hold anything
+back: its queue is emptied and it gets a 'resync' event telling it to reload over REST.
+"""
+import os
+import queue
+import re
+import threading
+from config import (EVENTS_HEARTBEAT, EVENTS_MAX_SUBSCRIBERS, EVENTS_POLL_INTERVAL,
+                    EVENTS_QUEUE_SIZE)
+from cache import data_version
+from db import IdFloor, db_session, newest_ids
+from metrics import Counter, Gauge
+from serializer import dumps, rows_for_frontend
+from utils import fix_time
+
+# event type -> (table, primary key, query for new rows); same columns as the REST endpoints
+# plus 'timestamp' for filtering
+EVENT_SOURCES = {
+    'sensor': ('SENSOR_DATA', 'sensor_id', """
+        SELECT sensor_id, `timestamp`, DATE(`timestamp`) AS `date`, TIME(`timestamp`) AS `time`,
+               moisture AS `Moisture`
+        FROM SENSOR_DATA WHERE is_deleted = 0 AND sensor_id > %s ORDER BY sensor_id LIMIT %s
+    """),
+    'weather': ('WEATHER_DATA', 'weather_id', """
+        SELECT weather_id, `timestamp`, DATE(`timestamp`) AS `date`, TIME(`timestamp`) AS `time`,
+               in_temperature, out_temperature, in_humidity, out_humidity,
+               wind_speed, wind_direction, daily_rain, rain_rate
+        FROM WEATHER_DATA WHERE is_deleted = 0 AND weather_id > %s ORDER BY weather_id LIMIT %s
+    """),
+    'audio': ('AUDIO_RECORDING', 'id', """
+        SELECT id, start_time AS `timestamp`, date, start_time, end_time, TIME(start_time) AS time, file_path
+        FROM AUDIO_RECORDING WHERE is_deleted = 0 AND id > %s ORDER BY id LIMIT %s
+    """),
+}
+
+# Rows fetched per query; a bigger backlog is read in several rounds
+FETCH_LIMIT = 1000
+
+EVENTS_RESYNCS = Counter('events_resyncs_total', "Subscribers that fell behind and were told to reload.")
+
+class TooManySubscribers(Exception):
+    pass
+
+# =========
+# FILTERS
+# =========
+
+_BOUND_PARAM = re.compile(r"^(min|max)_(\w+)$")
+
+def _column(row, name):
+    # Case-insensitive, the REST columns aren't consistent ('Moisture', 'out_temperature')
+    for key, value in row.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def build_filter(args):
+    """
+    Row predicate from query parameters: start_date / end_date / start_time / end_time as
+    on the query page, plus min_<column> / max_<column> for numeric columns (a bound only
+    applies to event types that have the column). Raises ValueError for a bad bound.
+    """
+    checks = []
+    start_date, end_date = args.get('start_date'), args.get('end_date')
+    start_time, end_time = args.get('start_time'), args.get('end_time')
+    if start_date:
+        start = f"{start_date} {fix_time(start_time, '00:00:00')}"
+        checks.append(lambda row: row['timestamp'] >= start)
+    elif start_time and start_time.strip():
+        start_tod = fix_time(start_time, '00:00:00')
+        checks.append(lambda row: row['timestamp'][11:] >= start_tod)
+    if end_date:
+        end = f"{end_date} {fix_time(end_time, '23:59:59')}"
+        checks.append(lambda row: row['timestamp'] <= end)
+    elif end_time and end_time.strip():
+        end_tod = fix_time(end_time, '23:59:59')
+        checks.append(lambda row: row['timestamp'][11:] <= end_tod)
+
+    for name, value in args.items():
+        match = _BOUND_PARAM.match(name)
+        if not match:
+            continue
+        bound, column = float(value), match.group(2).lower()
+        if match.group(1) == 'min':
+            checks.append(lambda row, c=column, b=bound: _column(row, c) is None or _column(row, c) >= b)
+        else:
+            checks.append(lambda row, c=column, b=bound: _column(row, c) is None or _column(row, c) <= b)
+
+    if not checks:
+        return None
+    return lambda row: all(check(row) for check in checks)
+
+# =============
+# SUBSCRIBERS
+# =============
+
+class Subscription:
+    def __init__(self, types, predicate, queue_size):
+        self.types = frozenset(types)
+        self.predicate = predicate
+        self.queue = queue.Queue(queue_size)
+
+    def offer(self, event_type, rows):
+        if event_type not in self.types:
+            return
+        if self.predicate:
+            rows = [row for row in rows if self.predicate(row)]
+        if not rows:
+            return
+        try:
+            self.queue.put_nowait((event_type, rows))
+        except queue.Full:
+            self.resync()
+
+    def resync(self):
+        """Drops everything queued and asks the client to reload."""
+        EVENTS_RESYNCS.inc()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.queue.put_nowait(('resync', {'reason': 'missed events, reload the data'}))
+
+class EventPublisher:
+    def __init__(self, poll_interval=EVENTS_POLL_INTERVAL, max_subscribers=EVENTS_MAX_SUBSCRIBERS,
+                 queue_size=EVENTS_QUEUE_SIZE):
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._subscribers = set()
+        self._thread = None
+        self._last_ids = {}  # event type -> highest primary key already published
+        self._floors = {}  # event type -> IdFloor, ids above it are read again
+        self._sent = {}  # event type -> ids above the floor already published
+        self._versions = {}
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def subscriber_count(self):
+        return len(self._subscribers) if self._pid == os.getpid() else 0
+
+    def subscribe(self, types, predicate=None):
+        self._check_pid()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers(f"{len(self._subscribers)} live subscribers in this worker")
+            if self._thread is None:
+                # First subscriber: start from what is in the database now
+                self._versions = {kind: data_version(source[0]) for kind, source in EVENT_SOURCES.items()}
+                self._start_from_current_rows()
+                self._thread = threading.Thread(target=self._run, name='event-publisher', daemon=True)
+                self._thread.start()
+            subscription = Subscription(types, predicate, self.queue_size)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        self._wake.set()  # lets the thread stop if that was the last one
+
+    def notify(self):
+        """Wakes the publisher right away (called after writes in this process)."""
+        if self._thread is not None and self._pid == os.getpid():
+            self._wake.set()
+
+    def _start_from_current_rows(self):
+        """Everything in the database now counts as sent; newer ids (and late commits) will be."""
+        with db_session() as conn:
+            if not conn:
+                raise RuntimeError("Database connection failed at EventPublisher.")
+            cursor = conn.cursor()
+            for kind, (table, pk, _) in EVENT_SOURCES.items():
+                ids = newest_ids(cursor, table, pk)
+                self._last_ids[kind] = ids[-1] if ids else 0
+                self._floors[kind] = IdFloor(ids[0] if ids else 0)
+                self._sent[kind] = set(ids)
+
+    def _fetch_new_rows(self, kind):
+        table, pk, query = EVENT_SOURCES[kind]
+        floor = self._floors[kind].floor()
+        sent = self._sent[kind] = {row_id for row_id in self._sent[kind] if row_id > floor}
+        batches = []
+        with db_session() as conn:
+            if not conn:
+                return batches
+            cursor = conn.cursor()
+            after = floor
+            while True:
+                cursor.execute(query, (after, FETCH_LIMIT))
+                rows = rows_for_frontend(cursor)
+                if not rows:
+                    break
+                after = rows[-1][pk]
+                new_rows = [row for row in rows if row[pk] not in sent]
+                if new_rows:
+                    sent.update(row[pk] for row in new_rows)
+                    batches.append(new_rows)
+                if len(rows) < FETCH_LIMIT:
+                    break
+        self._last_ids[kind] = max(self._last_ids[kind], after)
+        self._floors[kind].seen(self._last_ids[kind])
+        return batches
+
+    def _publish_changes(self):
+        for kind, (table, _, _) in EVENT_SOURCES.items():
+            version = data_version(table)
+            if version == self._versions[kind]:
+                continue
+            self._versions[kind] = version
+            for rows in self._fetch_new_rows(kind):
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for subscription in subscribers:
+                    subscription.offer(kind, rows)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self._publish_changes()
+            except Exception as e:
+                print(f"Event Publisher Error: {e}")
+
+
+event_publisher = EventPublisher()
+
+Gauge('events_subscribers', "Live (SSE) subscribers connected to this worker.",
+      function=lambda: event_publisher.subscriber_count())
+
+# ==========
+# STREAMING
+# ==========
+
+def _format_event(event_type, data):
+    payload = dumps(data).decode('utf-8')
+    return f"event: {event_type}\ndata: {payload}\n\n"
+
+def stream_events(subscription, resync=False):
+    """
+    Generator for the text/event-stream response. Sends a comment every EVENTS_HEARTBEAT
+    seconds so proxies keep the connection open and a gone client is noticed; the
+    subscription ends when the client disconnects.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        if resync:
+            # A reconnect (Last-Event-ID) may have missed rows in between
+            yield _format_event('resync', {'reason': 'reconnected, reload the data'})
+        while True:
+            try:
+                event_type, data = subscription.queue.get(timeout=EVENTS_HEARTBEAT)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if event_type == 'resync':
+                yield _format_event(event_type, data)
+            else:
+                table, pk, _ = EVENT_SOURCES[event_type]
+                yield f"id: {event_type}-{data[-1][pk]}\n" + _format_event(event_type, data)
+    finally:
+        event_publisher.unsubscribe(subscription)
@@ -0,0 +1,72 @@
+# backend/executor.py
+"""
+Runs independent sub-queries of one request concurrently.
+
+Every task runs on a thread of a small per-process pool and opens its own db_session,
+so each gets a separate pooled connection and the request takes about as long as its
+slowest part instead of the sum of all of them. Tasks still running when the timeout
+expires get their statement aborted with KILL QUERY.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import QUERY_FANOUT_WORKERS, QUERY_TIMEOUT
+from db import kill_running_query
+
+class QueryTimeout(Exception):
+    """Raised by run_concurrently when some tasks did not finish in time."""
+
+    def __init__(self, names, timeout):
+        super().__init__(f"Queries timed out after {timeout}s: {', '.join(names)}")
+        self.names = names
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Pool threads do not survive a fork, so every worker process builds its own."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=QUERY_FANOUT_WORKERS, thread_name_prefix='query')
+            _executor_pid = os.getpid()
+        return _executor
+
+def run_concurrently(tasks, timeout=QUERY_TIMEOUT):
+    """
+    Runs every task at once and returns {name: result}.
+
+    :param tasks: {name: zero-argument callable}; each one should open its own db_session
+    :param timeout: seconds for the whole group; on expiry the running queries are killed
+                    and QueryTimeout is raised. Exceptions raised by a task propagate.
+    """
+    if len(tasks) == 1:
+        name, task = next(iter(tasks.items()))
+        return {name: task()}  # nothing to overlap, skip the thread hop
+
+    threads = {}
+
+    def track(name, task):
+        threads[name] = threading.get_ident()
+        try:
+            return task()
+        finally:
+            threads.pop(name, None)
+
+    # Each task runs in a copy of the caller's context, so its queries still count
+    # towards the request's query profile (see profiling.py)
+    executor = _get_executor()
+    futures = {name: executor.submit(contextvars.copy_context().run, track, name, task)
+               for name, task in tasks.items()}
+    _, pending = wait(futures.values(), timeout=timeout)
+
+    if pending:
+        late = [name for name, future in futures.items() if future in pending]
+        for name in late:
+            if not futures[name].cancel() and name in threads:
+                kill_running_query(threads[name])
+        raise QueryTimeout(late, timeout)
+
+    return {name: future.result() for name, future in futures.items()}
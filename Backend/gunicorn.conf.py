@@ -0,0 +1,70 @@
+# backend/gunicorn.conf.py
+# Production server:  gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Pre-fork model: the master imports the app once (preload_app) and forks WEB_WORKERS
+# processes with WEB_THREADS threads each. Graceful reload:
+#   kill -HUP <master pid>    re-reads this file and replaces the workers one by one,
+#                             in-flight requests finish first (graceful_timeout)
+#   kill -USR2 <master pid>   starts a new master with new code (preloaded code is only
+#                             re-imported this way), then send QUIT to the old master
+import os
+import tempfile
+
+# Workers share their metrics through snapshot files (see metrics.py); must be set
+# before config is imported
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'weather-metrics'))
+
+from config import WEB_THREADS, WEB_WORKERS
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = 'gthread'
+
+# Import the app and its modules once in the master; workers share those pages
+# copy-on-write and the query cache versions in shared memory (see cache.py)
+preload_app = True
+
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks can't build up
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """Runs once in the master: forget the metrics of a previous run, fill in missing summaries."""
+    from metrics import clear_snapshots
+    from db import connection_pool, summarize_missing_recordings
+    clear_snapshots()
+    summarize_missing_recordings()  # recordings from before AUDIO_ENV_SUMMARY existed
+    connection_pool.close_all()  # the workers open their own
+
+
+def post_fork(server, worker):
+    """Runs in every new worker: give it its own DB connections and background jobs."""
+    from db import connection_pool
+    from purge import start_purge_worker
+    from metrics import start_metrics_writer
+    from ingest import start_ingest_flusher
+    from hot_window import start_hot_windows
+
+    # Anything the master opened before forking must not be shared
+    connection_pool.after_fork()
+    start_purge_worker()  # an advisory lock makes sure only one worker purges at a time
+    start_metrics_writer()
+    start_ingest_flusher()  # every worker spools and flushes its own ingest readings
+    start_hot_windows()  # each worker keeps its own recent rows in memory
+
+
+def worker_exit(server, worker):
+    """Last flush and snapshot, so readings and counters of a recycled worker are not lost."""
+    from metrics import write_snapshot
+    from ingest import flush_ingest_buffer
+    flush_ingest_buffer()  # anything left over stays spooled for the next worker
+    write_snapshot()
@@ -0,0 +1,351 @@
+# backend/hot_window.py
+"""
+In-memory window of the most recent measurements, so the common "latest rows / last few
+hours" requests of get_latest_sensor_data and get_latest_weather_data never reach the
+database.
+
+Each table keeps its visible rows (is_deleted = 0) of the last HOT_WINDOW_HOURS hours in
+NumPy columns sorted by time: int64 ids and timestamps, float64 numbers (NULL = NaN) and
+small integer codes for text. Memory is bounded by HOT_WINDOW_MAX_MB; when the arrays are
+full the oldest rows are dropped and the window simply covers a shorter period.
+
+A query is answered from memory when it is guaranteed to give the same rows as the SQL
+query: its start lies inside the covered period, or the window alone already holds
+'limit' matching rows (everything outside is older). Anything else falls through.
+
+The window follows the shared data versions (cache.py): new rows (ingest, uploads) are
+fetched by primary key on the next query, re-reading the ids of the last
+LATE_COMMIT_SECONDS since a row can commit after a higher id; deletes, restores and
+dropped partitions bump the rewrite version, after which the window reloads in the
+background and the database answers meanwhile.
+"""
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from alignment import filter_bounds, time_of_day_mask, to_seconds
+from config import HOT_WINDOW_HOURS, HOT_WINDOW_MAX_MB, HOT_WINDOW_REFRESH
+from cache import data_version, rewrite_version
+from db import IdFloor, db_session, newest_ids
+from metrics import Counter, Gauge
+
+HOT_WINDOW_QUERIES = Counter('hot_window_queries_total', "Latest-rows queries by whether the hot window answered.",
+                             ('table', 'result'))
+
+# When the arrays are full, this share of the capacity is freed at once so appends stay cheap
+EVICT_FRACTION = 0.1
+
+def _now_seconds():
+    # Timestamps are stored as local time without a zone, so "seconds" here are naive too
+    return int(np.datetime64(datetime.now().replace(microsecond=0), 's').astype(np.int64))
+
+class HotWindow:
+    """
+    Recent rows of one table. 'columns' are (column, output key, kind) with kind 'float',
+    'int' or 'text'; rows come out exactly like the SQL endpoint returns them.
+    """
+
+    def __init__(self, table, pk, columns, hours=HOT_WINDOW_HOURS, max_bytes=0):
+        self.table = table
+        self.pk = pk
+        self.columns = columns
+        self.hours = hours
+        # id + timestamp + 8 bytes per number, 2 per text code
+        row_bytes = 16 + sum(2 if kind == 'text' else 8 for _, _, kind in columns)
+        self.capacity = max(1, int(max_bytes // row_bytes))
+        self._lock = threading.Lock()  # guards the arrays
+        self._sync_lock = threading.Lock()  # one loader at a time
+        self._loaded = False
+        self._valid = False
+        self._loading = False
+        self._floor = None  # IdFloor, ids above it are read again on catch-up; kept across reloads
+        self._allocate(self.capacity)
+
+    def _allocate(self, capacity):
+        self._ids = np.zeros(capacity, np.int64)
+        self._ts = np.zeros(capacity, np.int64)
+        self._values = {column: np.zeros(capacity, np.int16 if kind == 'text' else np.float64)
+                        for column, _, kind in self.columns}
+        self._categories = {column: [] for column, _, kind in self.columns if kind == 'text'}
+        self._codes = {column: {} for column in self._categories}
+        self._n = 0
+        self._cover_start = 0  # every visible row with timestamp >= this is in the arrays
+        self._last_id = 0  # highest primary key the window has looked at
+        self._version = self._rewrite = None
+        self._refresh_at = 0
+
+    def stats(self):
+        return {'rows': self._n, 'bytes': sum(a.nbytes for a in (self._ids, self._ts, *self._values.values()))}
+
+    # --- loading ---
+
+    def _select(self, where):
+        columns = ', '.join(column for column, _, _ in self.columns)
+        return f"SELECT {self.pk}, `timestamp`, {columns} FROM {self.table} WHERE is_deleted = 0 AND {where}"
+
+    def _encode(self, column, values):
+        codes, categories = self._codes[column], self._categories[column]
+        encoded = np.empty(len(values), np.int16)
+        for i, value in enumerate(values):
+            if value is None:
+                encoded[i] = -1
+                continue
+            code = codes.get(value)
+            if code is None:
+                if len(categories) >= np.iinfo(np.int16).max:
+                    raise ValueError(f"too many distinct values in {column}")
+                code = codes[value] = len(categories)
+                categories.append(value)
+            encoded[i] = code
+        return encoded
+
+    def _columns_from_rows(self, rows):
+        """Turns fetched tuples into (ids, seconds, {column: array}) sorted by time."""
+        ids = np.array([row[0] for row in rows], np.int64)
+        seconds = to_seconds([row[1] for row in rows])
+        values = {}
+        for offset, (column, _, kind) in enumerate(self.columns, start=2):
+            raw = [row[offset] for row in rows]
+            if kind == 'text':
+                values[column] = self._encode(column, raw)
+            else:
+                values[column] = np.array([np.nan if v is None else v for v in raw], np.float64)
+        order = np.argsort(seconds, kind='stable')
+        return ids[order], seconds[order], {c: v[order] for c, v in values.items()}
+
+    def _max_id(self, cursor):
+        cursor.execute(f"SELECT COALESCE(MAX({self.pk}), 0) FROM {self.table}")
+        return cursor.fetchone()[0]
+
+    def reload(self):
+        """Loads the window from scratch."""
+        with self._sync_lock:
+            version, rewrite = data_version(self.table), rewrite_version(self.table)
+            cutoff = _now_seconds() - int(self.hours * 3600)
+            with db_session() as conn:
+                if not conn:
+                    raise RuntimeError(f"Database connection failed at HotWindow({self.table}).")
+                cursor = conn.cursor()
+                last_id = self._max_id(cursor)
+                if self._floor is None:
+                    newest = newest_ids(cursor, self.table, self.pk)
+                    self._floor = IdFloor(newest[0] if newest else 0)
+                cursor.execute(self._select("`timestamp` >= %s") + " ORDER BY `timestamp` DESC LIMIT %s",
+                               (str(np.datetime64(cutoff, 's')).replace('T', ' '), self.capacity))
+                rows = cursor.fetchall()
+
+            with self._lock:
+                self._allocate(self.capacity)
+                if rows:
+                    ids, seconds, values = self._columns_from_rows(rows)
+                    self._store(ids, seconds, values)
+                # Cut short by the memory budget: covered from the oldest row we kept
+                self._cover_start = int(self._ts[0]) if len(rows) >= self.capacity else cutoff
+                self._last_id = last_id
+                self._floor.seen(last_id)
+                self._version, self._rewrite = version, rewrite
+                self._refresh_at = time.monotonic() + HOT_WINDOW_REFRESH
+                self._loaded = self._valid = True
+
+    def _catch_up(self):
+        """
+        Adds the rows inserted since the last look (by primary key), including those that
+        committed below an id already read. Caller holds _sync_lock.
+        """
+        version, rewrite = data_version(self.table), rewrite_version(self.table)
+        floor = self._floor.floor()
+        with db_session() as conn:
+            if not conn:
+                return False
+            cursor = conn.cursor()
+            last_id = self._max_id(cursor)
+            cursor.execute(self._select(f"{self.pk} > %s AND {self.pk} <= %s AND `timestamp` >= %s"),
+                           (floor, last_id, str(np.datetime64(self._cover_start, 's')).replace('T', ' ')))
+            rows = cursor.fetchall()
+
+        with self._lock:
+            if rows:
+                ids, seconds, values = self._columns_from_rows(rows)
+                held = self._ids[:self._n]
+                new = ~np.isin(ids, held[held > floor])
+                if new.any():
+                    self._merge(ids[new], seconds[new], {c: v[new] for c, v in values.items()})
+            self._last_id = max(self._last_id, last_id)
+            self._floor.seen(self._last_id)
+            if rewrite == self._rewrite:
+                self._version = version
+        return True
+
+    # --- array maintenance (caller holds _lock) ---
+
+    def _store(self, ids, seconds, values):
+        count = min(len(ids), self.capacity)
+        self._ids[:count] = ids[-count:]
+        self._ts[:count] = seconds[-count:]
+        for column, array in values.items():
+            self._values[column][:count] = array[-count:]
+        self._n = count
+
+    def _merge(self, ids, seconds, values):
+        n = self._n
+        current = self._ts[:n]
+        # REPLACE: the new row takes over the timestamp of an old one
+        found = np.searchsorted(current, seconds)
+        hit = found < n
+        hit[hit] = current[found[hit]] == seconds[hit]
+        replaced = np.zeros(n, bool)
+        replaced[found[hit]] = True
+        if not hit.any() and (n == 0 or seconds[0] > current[-1]) and n + len(ids) <= self.capacity:
+            # Usual case: newer rows appended at the end
+            self._ids[n:n + len(ids)] = ids
+            self._ts[n:n + len(ids)] = seconds
+            for column, array in values.items():
+                self._values[column][n:n + len(ids)] = array
+            self._n += len(ids)
+            return
+
+        keep = ~replaced
+        all_ids = np.concatenate([self._ids[:n][keep], ids])
+        all_ts = np.concatenate([current[keep], seconds])
+        all_values = {c: np.concatenate([self._values[c][:n][keep], v]) for c, v in values.items()}
+        order = np.argsort(all_ts, kind='stable')
+        all_ids, all_ts = all_ids[order], all_ts[order]
+        all_values = {c: v[order] for c, v in all_values.items()}
+
+        # Drop rows older than the window, then whatever doesn't fit the budget (with room to spare)
+        start = int(np.searchsorted(all_ts, _now_seconds() - int(self.hours * 3600)))
+        if len(all_ts) - start > self.capacity:
+            start = len(all_ts) - (self.capacity - int(self.capacity * EVICT_FRACTION))
+        if start > 0:
+            self._cover_start = max(self._cover_start, int(all_ts[start - 1]) + 1)
+        self._store(all_ids[start:], all_ts[start:], {c: v[start:] for c, v in all_values.items()})
+
+    # --- queries ---
+
+    def _start_reload(self, invalidate):
+        if invalidate:
+            self._valid = False
+        if self._loading:
+            return
+        self._loading = True
+
+        def run():
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Hot Window Error ({self.table}): {e}")
+            finally:
+                self._loading = False
+
+        threading.Thread(target=run, name=f"hot-window-{self.table}", daemon=True).start()
+
+    def _fresh(self):
+        """True when the arrays match the database right now (catching up inline if needed)."""
+        if not self._loaded:
+            self._start_reload(invalidate=True)
+            return False
+        if rewrite_version(self.table) != self._rewrite:
+            self._start_reload(invalidate=True)  # rows were hidden or restored
+            return False
+        if not self._valid:
+            return False
+        if time.monotonic() > self._refresh_at:
+            self._start_reload(invalidate=False)  # periodic full reload, keeps serving meanwhile
+        if data_version(self.table) == self._version:
+            return True
+        if not self._sync_lock.acquire(blocking=False):
+            return False  # someone else is loading; the database answers this one
+        try:
+            return self._catch_up() and self._version == data_version(self.table)
+        except Exception as e:
+            print(f"Hot Window Error ({self.table}): {e}")
+            return False
+        finally:
+            self._sync_lock.release()
+
+    def query(self, start_date=None, end_date=None, start_time=None, end_time=None, limit=300):
+        """
+        Same result as the SQL 'WHERE <filters> ORDER BY timestamp DESC LIMIT limit', or None
+        when the window can't guarantee that.
+        """
+        bounds = filter_bounds(start_date, end_date, start_time, end_time)
+        if bounds is None or not self._fresh():
+            HOT_WINDOW_QUERIES.inc(self.table, 'miss')
+            return None
+        lo, hi, time_lo, time_hi = bounds
+
+        with self._lock:
+            ts = self._ts[:self._n]
+            left = 0 if lo is None else int(np.searchsorted(ts, lo, 'left'))
+            right = len(ts) if hi is None else int(np.searchsorted(ts, hi, 'right'))
+            right = max(left, right)
+            if time_lo is None and time_hi is None:
+                matches = right - left
+                picked = np.arange(right - 1, max(left, right - limit) - 1, -1)
+            else:
+                positions = np.arange(left, right)
+                positions = positions[time_of_day_mask(ts[left:right], time_lo, time_hi)]
+                matches = len(positions)
+                picked = positions[len(positions) - min(limit, len(positions)):][::-1]
+
+            # Newest first, so with 'limit' matches in memory nothing older can make the cut
+            complete = (lo is not None and lo >= self._cover_start) or matches >= limit
+            if not complete:
+                HOT_WINDOW_QUERIES.inc(self.table, 'miss')
+                return None
+            rows = self._rows(picked)
+        HOT_WINDOW_QUERIES.inc(self.table, 'hit')
+        return rows
+
+    def _rows(self, positions):
+        stamps = np.datetime_as_string(self._ts[positions].astype('datetime64[s]'))
+        ids = self._ids[positions].tolist()
+        columns = []
+        for column, key, kind in self.columns:
+            array = self._values[column][positions]
+            if kind == 'text':
+                categories = self._categories[column]
+                columns.append((key, [categories[c] if c >= 0 else None for c in array.tolist()]))
+            elif kind == 'int':
+                columns.append((key, [None if v != v else int(v) for v in array.tolist()]))
+            else:
+                columns.append((key, [None if v != v else v for v in array.tolist()]))
+
+        rows = []
+        for i, stamp in enumerate(stamps.tolist()):
+            row = {self.pk: ids[i], 'date': stamp[:10], 'time': stamp[11:]}
+            for key, values in columns:
+                row[key] = values[i]
+            rows.append(row)
+        return rows
+
+
+# Output keys match the SELECTs of services._query_sensor_data / _query_weather_data
+_budget = HOT_WINDOW_MAX_MB * 1024 * 1024 / 2
+hot_windows = {
+    'SENSOR_DATA': HotWindow('SENSOR_DATA', 'sensor_id', [('moisture', 'Moisture', 'float')], max_bytes=_budget),
+    'WEATHER_DATA': HotWindow('WEATHER_DATA', 'weather_id', [
+        ('in_temperature', 'in_temperature', 'float'), ('out_temperature', 'out_temperature', 'float'),
+        ('in_humidity', 'in_humidity', 'int'), ('out_humidity', 'out_humidity', 'int'),
+        ('wind_speed', 'wind_speed', 'float'), ('wind_direction', 'wind_direction', 'text'),
+        ('daily_rain', 'daily_rain', 'float'), ('rain_rate', 'rain_rate', 'float'),
+    ], max_bytes=_budget),
+}
+
+Gauge('hot_window_rows', "Rows held in the in-memory hot window.", ('table',),
+      function=lambda: {(table, ): window.stats()['rows'] for table, window in hot_windows.items()})
+Gauge('hot_window_bytes', "Memory used by the hot window arrays.", ('table',),
+      function=lambda: {(table, ): window.stats()['bytes'] for table, window in hot_windows.items()})
+
+def query_hot_window(table, start_date, end_date, start_time, end_time, limit):
+    """Rows from the hot window of 'table', or None (disabled, not ready or out of range)."""
+    if HOT_WINDOW_HOURS <= 0:
+        return None
+    return hot_windows[table].query(start_date, end_date, start_time, end_time, limit)
+
+def start_hot_windows():
+    """Fills the windows in the background (call once per worker process)."""
+    if HOT_WINDOW_HOURS <= 0:
+        return
+    for window in hot_windows.values():
+        window._start_reload(invalidate=True)
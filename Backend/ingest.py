@@ -0,0 +1,285 @@
+# backend/ingest.py
+"""
+Write-behind ingest for readings the stations push to POST /api/v1/ingest.
+
+accept() appends a validated batch to this process's spool file and fsyncs it before the
+request is answered, so an acknowledged reading survives a crash. A flusher thread then
+coalesces the readings of all clients into one transaction per flush (a multi-row REPLACE
+per table plus the ALL_DATA links, see db.insert_readings_batch), as soon as
+INGEST_BATCH_SIZE readings are waiting or every INGEST_FLUSH_INTERVAL seconds.
+
+Spool files are INGEST_SPOOL_DIR/<pid>-<start time>-<n>.ndjson, flock'ed by the process
+writing them and deleted once their readings are committed. Files left behind by a process
+that died are picked up by the next flusher that can lock them.
+"""
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from config import (INGEST_BATCH_SIZE, INGEST_FLUSH_INTERVAL, INGEST_FSYNC, INGEST_MAX_PENDING,
+                    INGEST_SPOOL_DIR)
+from data_loader import SENSOR_FIELDS, WEATHER_FIELDS, convert_reading
+from db import insert_readings_batch
+from events import event_publisher
+from metrics import Counter, Gauge
+from utils import format_timestamp
+
+READING_FIELDS = {'sensor': SENSOR_FIELDS, 'weather': WEATHER_FIELDS}
+
+INGEST_FLUSHES = Counter('ingest_flushes_total', "Write-behind flushes of ingested readings.", ('result',))
+
+# =========
+# PARSING
+# =========
+
+def parse_readings(body, ndjson=False, default_type=None):
+    """
+    Turns a request body into ([(data_type, data_row)], [error messages]). A JSON body holds
+    one reading or a list of them, NDJSON one reading per line. A reading is an object with
+    'type' ('sensor' or 'weather'; defaults to 'default_type'), a Unix 'timestamp' and the
+    same values as the CSV columns. Raises ValueError if the body itself isn't valid JSON.
+    """
+    if ndjson:
+        records = [json.loads(line) for line in body.splitlines() if line.strip()]
+    else:
+        records = json.loads(body)
+        if not isinstance(records, list):
+            records = [records]
+
+    readings, errors = [], []
+    for number, record in enumerate(records, start=1):
+        try:
+            data_type = record.get('type', default_type)
+            if data_type not in READING_FIELDS:
+                raise ValueError(f"Unknown type: {data_type}")
+            data_row = {key: record[key] for key in READING_FIELDS[data_type] if key in record}
+            if data_row.get('timestamp') in (None, ''):
+                raise ValueError("Missing timestamp")
+            convert_reading(data_row, data_type)
+            if not format_timestamp(data_row['timestamp']):
+                raise ValueError("Invalid timestamp")
+            readings.append((data_type, data_row))
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError, OSError) as e:
+            errors.append(f"Reading {number}: {e}")
+    return readings, errors
+
+# ====================
+# WRITE-BEHIND BUFFER
+# ====================
+
+class IngestBufferFull(Exception):
+    pass
+
+class WriteBehindBuffer:
+    """
+    Readings accepted but not yet written, per process. Pending readings are kept per
+    timestamp, so a reading that is sent again before the flush replaces the earlier one
+    (what the REPLACE would do anyway).
+    """
+
+    def __init__(self, spool_dir=INGEST_SPOOL_DIR, batch_size=INGEST_BATCH_SIZE,
+                 interval=INGEST_FLUSH_INTERVAL, max_pending=INGEST_MAX_PENDING, fsync=INGEST_FSYNC):
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self._reset()
+
+    def _reset(self):
+        # Locks and spool files of a parent process are not ours after a fork
+        self._pid = os.getpid()
+        self._name = f"{self._pid}-{int(time.time() * 1000)}"  # unique even if a pid is reused
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {'sensor': {}, 'weather': {}}
+        self._count = 0
+        self._spool = None  # spool file new readings are appended to
+        self._segments = []  # older spool files whose readings are not committed yet
+        self._sequence = 0
+        self._thread = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def pending(self):
+        return self._count if self._pid == os.getpid() else 0
+
+    # --- spool files ---
+
+    def _open_spool(self):
+        """New spool file, locked before it gets the name other processes look for."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._sequence += 1
+        path = os.path.join(self.spool_dir, f"{self._name}-{self._sequence}.ndjson")
+        handle = open(path + '.new', 'a', encoding='utf-8')
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        os.rename(path + '.new', path)
+        if self.fsync:
+            # Make the rename itself durable, recover() only looks at *.ndjson
+            directory = os.open(self.spool_dir, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        handle.path = path
+        return handle
+
+    def _append(self, readings):
+        # Called with self._lock held
+        if self._spool is None:
+            self._spool = self._open_spool()
+        self._spool.write(''.join(json.dumps({'type': data_type, **data_row}) + '\n'
+                                  for data_type, data_row in readings))
+        self._spool.flush()
+        if self.fsync:
+            os.fsync(self._spool.fileno())
+        for data_type, data_row in readings:
+            self._pending[data_type][data_row['timestamp']] = data_row
+        self._count += len(readings)
+
+    def _discard(self, segments):
+        for handle in segments:
+            try:
+                os.remove(handle.path)
+            except OSError as e:
+                print(f"Ingest Spool Error: {e}")
+            handle.close()
+
+    # --- public API ---
+
+    def accept(self, readings):
+        """
+        Durably enqueues [(data_type, data_row)]. Returns the number of readings accepted;
+        raises IngestBufferFull when too many readings are waiting for the database and
+        OSError when the spool can't be written.
+        """
+        self._check_pid()
+        if not readings:
+            return 0
+        with self._lock:
+            if self._count + len(readings) > self.max_pending:
+                raise IngestBufferFull(f"{self._count} readings are waiting to be written")
+            self._append(readings)
+            count = self._count
+        self.start()
+        if count >= self.batch_size:
+            self._wake.set()
+        return len(readings)
+
+    def flush(self):
+        """Writes everything pending in one transaction. Returns the number of readings written."""
+        self._check_pid()
+        with self._flush_lock:
+            with self._lock:
+                if not self._count:
+                    return 0
+                batch, self._pending = self._pending, {'sensor': {}, 'weather': {}}
+                count, self._count = self._count, 0
+                segments = self._segments + ([self._spool] if self._spool else [])
+                self._segments = []
+                self._spool = None
+
+            success, result = insert_readings_batch({data_type: list(rows.values())
+                                                     for data_type, rows in batch.items()})
+            if not success:
+                INGEST_FLUSHES.inc('error')
+                with self._lock:
+                    # Put everything back; readings that came in meanwhile are newer and win
+                    for data_type, rows in batch.items():
+                        rows.update(self._pending[data_type])
+                        self._pending[data_type] = rows
+                    self._count += count
+                    if self._spool is None and segments:
+                        self._spool = segments.pop()
+                    self._segments = segments + self._segments
+                raise RuntimeError(f"Ingest flush failed: {result}")
+
+            INGEST_FLUSHES.inc('ok')
+            event_publisher.notify()  # push the new rows to live subscribers now
+            self._discard(segments)
+            return count
+
+    def recover(self):
+        """Takes over the spool files of processes that are gone. Returns the readings taken over."""
+        self._check_pid()
+        own = {handle.path for handle in self._segments + [self._spool] if handle}
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, '*.ndjson'))):
+            if path in own:
+                continue
+            try:
+                handle = open(path, 'r', encoding='utf-8')
+            except OSError:
+                continue  # committed and deleted by its owner meanwhile
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()  # its owner is alive
+                continue
+            if os.fstat(handle.fileno()).st_nlink == 0:
+                handle.close()  # deleted by its owner while we waited for the lock
+                continue
+
+            readings = []
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    readings.append((record.pop('type'), record))
+                except (ValueError, KeyError):
+                    pass  # a line cut short by the crash was never acknowledged
+            with self._lock:
+                if readings:
+                    self._append(readings)
+                os.remove(path)
+            handle.close()
+            recovered += len(readings)
+        if recovered:
+            print(f"Ingest: recovered {recovered} readings from old spool files")
+        return recovered
+
+    def start(self):
+        """Starts the flusher thread of this process (once)."""
+        self._check_pid()
+        with self._lock:
+            if self._thread is not None:
+                return self._thread
+            self._thread = threading.Thread(target=self._run, name='ingest-flusher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        failures = 0
+        while True:
+            # Back off while the database is unreachable, the readings are safe in the spool
+            self._wake.wait(min(self.interval * 2 ** failures, 60))
+            self._wake.clear()
+            try:
+                self.recover()
+                self.flush()
+                failures = 0
+            except Exception as e:
+                failures = min(failures + 1, 10)
+                print(f"Ingest Flusher Error: {e}")
+
+
+ingest_buffer = WriteBehindBuffer()
+
+Gauge('ingest_pending_readings', "Accepted readings not yet written to the database.",
+      function=lambda: ingest_buffer.pending())
+
+def start_ingest_flusher():
+    """Starts the flusher (and takes over spool files left by a previous run)."""
+    return ingest_buffer.start()
+
+def flush_ingest_buffer():
+    """Final flush on shutdown; whatever fails stays in the spool for the next start."""
+    try:
+        return ingest_buffer.flush()
+    except Exception as e:
+        print(f"Ingest Flush Error: {e}")
+        return 0
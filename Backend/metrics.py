@@ -0,0 +1,272 @@
+# backend/metrics.py
+"""
+Counters, gauges and histograms served in the Prometheus text format at /metrics.
+
+Recording a value is one dict update under a per-metric lock, so the hot path stays cheap.
+With several worker processes (gunicorn) every worker writes a snapshot of its own
+metrics to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds, and the worker answering
+/metrics adds up all snapshots, so a scrape sees the whole server.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from functools import wraps
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+# Seconds; the query page's requests mostly land between 5 ms and 1 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 200, 500, 1000, 5000, 10000, 50000)
+
+REGISTRY = []
+
+# ==============
+# METRIC TYPES
+# ==============
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), function=None):
+        """
+        :param labels: label names; values are passed positionally when recording
+        :param function: optional callback evaluated at scrape time instead of recorded
+                         values, returning a number or {label values tuple: number}
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def snapshot(self):
+        if self.function is not None:
+            values = self.function()
+            return values if isinstance(values, dict) else {(): values}
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value
+                    for key, value in self._values.items()}
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                # one count per bucket (the last one is +Inf), then the running sum
+                entry = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+# ==============
+# SHARED METRICS
+# ==============
+
+HTTP_REQUESTS = Counter('http_requests_total', "HTTP requests by route, method and status.",
+                        ('endpoint', 'method', 'status'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', "HTTP request latency by route.",
+                         ('endpoint', 'method'))
+DB_QUERY_LATENCY = Histogram('db_query_duration_seconds', "Duration of named database queries.", ('query',))
+DB_QUERY_ROWS = Histogram('db_query_rows', "Rows returned by named database queries.", ('query',), ROW_BUCKETS)
+DB_QUERY_ERRORS = Counter('db_query_errors_total', "Named database queries that failed.", ('query',))
+INGEST_ROWS = Counter('ingest_rows_total', "Rows written by the ingest paths.", ('table',))
+
+def _row_count(result):
+    """Rows in a query result, or None if 'result' is one of the repo's error shapes."""
+    if isinstance(result, list):
+        return None if result and isinstance(result[0], dict) and 'error' in result[0] else len(result)
+    if isinstance(result, dict):
+        if 'error' in result:
+            return None
+        return len(result['items']) if 'items' in result else 1
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], bool):
+        return 1 if result[0] else None  # (success, result) helpers
+    return 0 if result is None else 1
+
+def timed_query(name):
+    """Decorator: records duration, row count and failures of a DB function under 'name'."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                DB_QUERY_ERRORS.inc(name)
+                raise
+            finally:
+                DB_QUERY_LATENCY.observe(time.perf_counter() - started, name)
+
+            rows = _row_count(result)
+            if rows is None:
+                DB_QUERY_ERRORS.inc(name)
+            else:
+                DB_QUERY_ROWS.observe(rows, name)
+            return result
+        return wrapper
+    return decorator
+
+# ===============
+# FLASK HOOKS
+# ===============
+
+def init_app(app):
+    """Times every request and serves /metrics."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'  # 404s share one label
+            HTTP_LATENCY.observe(time.perf_counter() - started, endpoint, request.method)
+            HTTP_REQUESTS.inc(endpoint, request.method, str(response.status_code))
+        return response
+
+    def metrics_endpoint():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+
+# ===================
+# SNAPSHOTS / MERGING
+# ===================
+
+def _snapshot():
+    return {
+        metric.name: [[list(labels), value] for labels, value in metric.snapshot().items()]
+        for metric in REGISTRY
+    }
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"worker-{pid}.json")
+
+def write_snapshot():
+    """Publishes this process's metrics for the other workers (atomic replace)."""
+    if not METRICS_DIR:
+        return
+    path = _snapshot_path(os.getpid())
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(_snapshot(), f)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"Metrics Snapshot Error: {e}")
+
+def start_metrics_writer(interval=METRICS_FLUSH_INTERVAL):
+    """Writes snapshots every 'interval' seconds on a daemon thread (one per worker)."""
+    if not METRICS_DIR or interval <= 0:
+        return None
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+    def loop():
+        while True:
+            write_snapshot()
+            time.sleep(interval)
+
+    writer = threading.Thread(target=loop, name='metrics-writer', daemon=True)
+    writer.start()
+    return writer
+
+def clear_snapshots():
+    """Removes snapshots of a previous server run (call before the workers start)."""
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return
+    for name in os.listdir(METRICS_DIR):
+        if name.startswith('worker-'):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+def _other_snapshots():
+    """Snapshots of the other workers: (data, is_recent). Exited workers keep their counters."""
+    if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+        return
+    own = os.path.basename(_snapshot_path(os.getpid()))
+    stale_before = time.time() - 3 * METRICS_FLUSH_INTERVAL
+    for name in os.listdir(METRICS_DIR):
+        if name == own or not name.endswith('.json'):
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            recent = os.path.getmtime(path) >= stale_before
+            with open(path) as f:
+                yield json.load(f), recent
+        except (OSError, ValueError):
+            continue  # being replaced right now, it will be there next scrape
+
+def _add(total, value):
+    if isinstance(value, list):
+        return [a + b for a, b in zip(total, value)] if total is not None else list(value)
+    return (total or 0) + value
+
+def _merged_values():
+    """{metric name: {label values tuple: value}} summed over every worker."""
+    merged = {metric.name: dict(metric.snapshot()) for metric in REGISTRY}
+    kinds = {metric.name: metric.kind for metric in REGISTRY}
+    for data, recent in _other_snapshots():
+        for name, samples in data.items():
+            if name not in merged or (kinds[name] == 'gauge' and not recent):
+                continue  # a gauge of a worker that is gone no longer describes anything
+            values = merged[name]
+            for labels, value in samples:
+                key = tuple(labels)
+                values[key] = _add(values.get(key), value)
+    return merged
+
+# ==========
+# RENDERING
+# ==========
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    merged = _merged_values()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(merged[metric.name].items()):
+            if metric.kind != 'histogram':
+                lines.append(f"{metric.name}{_label_text(metric.labels, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                le = (('le', bound),)
+                lines.append(f"{metric.name}_bucket{_label_text(metric.labels, labels, le)} {cumulative}")
+            lines.append(f"{metric.name}_sum{_label_text(metric.labels, labels)} {value[-1]}")
+            lines.append(f"{metric.name}_count{_label_text(metric.labels, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,245 @@
+# backend/partitions.py
+"""
+Monthly RANGE partitioning of the measurement tables.
+
+SENSOR_DATA and WEATHER_DATA are partitioned on TO_DAYS(timestamp), one partition per
+month plus a catch-all 'p_future' (MAXVALUE). Range filters on `timestamp` are pruned to
+the matching months, and a month that has expired as a whole is removed with
+ALTER TABLE ... DROP PARTITION, which only touches metadata.
+
+MySQL only; with the embedded SQLite backend every function here does nothing.
+
+Usage (from the Backend folder):
+    python partitions.py migrate    # one-off: partition tables created by an older Database.sql
+    python partitions.py maintain   # create upcoming months and drop expired ones
+    python partitions.py list
+"""
+import argparse
+from datetime import date
+from config import DATA_RETENTION_MONTHS, PARTITION_MONTHS_AHEAD
+from db import db_session, refresh_audio_summaries
+from sketches import refresh_sketches
+from cache import bump_data_version
+from storage import get_backend
+
+# Partitioned table -> (primary key column, column in ALL_DATA that links to it)
+PARTITIONED_TABLES = {
+    'SENSOR_DATA': ('sensor_id', 'sensor_data_id'),
+    'WEATHER_DATA': ('weather_id', 'weather_data_id'),
+}
+
+# ========
+# HELPERS
+# ========
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def _partition_clause(month):
+    """One month: [month, next month)."""
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_add_months(month, 1):%Y-%m-%d}'))"
+
+def get_partitions(cursor, table):
+    """
+    Lists the partitions of 'table' in order. 'end' is the exclusive upper bound as a date
+    (None for MAXVALUE); an empty list means the table is not partitioned.
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+
+    partitions = []
+    start = None
+    for name, description, rows, size in cursor.fetchall():
+        # TO_DAYS() counts from year 0, Python ordinals from year 1
+        end = None if description == 'MAXVALUE' else date.fromordinal(int(description) - 365)
+        partitions.append({'name': name, 'start': start, 'end': end, 'rows': rows or 0, 'bytes': size or 0})
+        start = end
+    return partitions
+
+def _first_month(cursor, table):
+    cursor.execute(f"SELECT MIN(`timestamp`) FROM {table}")
+    oldest = cursor.fetchone()[0]
+    return _month_start(oldest or date.today())
+
+# =====================
+# PARTITION MAINTENANCE
+# =====================
+
+def ensure_future_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Splits 'p_future' so that every month up to 'months_ahead' from now has its own
+    partition. Returns {table: [created partition names]}.
+    """
+    created = {}
+    if get_backend().name != 'mysql':
+        return created
+    with db_session() as conn:
+        if not conn: return created
+        cursor = conn.cursor()
+        last_month = _add_months(_month_start(date.today()), months_ahead)
+
+        for table in PARTITIONED_TABLES:
+            partitions = get_partitions(cursor, table)
+            if not partitions:
+                print(f"Partitioning: {table} is not partitioned, run 'python partitions.py migrate' first.")
+                continue
+
+            bounds = [p['end'] for p in partitions if p['end']]
+            month = max(bounds) if bounds else _first_month(cursor, table)
+            new_months = []
+            while month <= last_month:
+                new_months.append(month)
+                month = _add_months(month, 1)
+            if not new_months:
+                continue
+
+            clauses = [_partition_clause(m) for m in new_months]
+            clauses.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+            try:
+                cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION p_future INTO ({', '.join(clauses)})")
+                created[table] = [f"p{m:%Y%m}" for m in new_months]
+            except Exception as e:
+                print(f"Partitioning Error ({table}): {e}")
+    return created
+
+def _partition_is_expired(cursor, table, partition, retention_start):
+    """
+    A closed month can go when it is older than the retention window, or when every row
+    in it is soft deleted and past its delete_at.
+    """
+    if partition['end'] is None or partition['end'] > _month_start(date.today()):
+        return False  # never drop the current month or p_future
+    if retention_start and partition['end'] <= retention_start:
+        return True
+    if partition['rows'] == 0:
+        return False  # empty months cost nothing and keep the layout regular
+
+    cursor.execute(f"""
+        SELECT 1 FROM {table} PARTITION ({partition['name']})
+        WHERE is_deleted = 0 OR delete_at IS NULL OR delete_at > NOW()
+        LIMIT 1
+    """)
+    return cursor.fetchone() is None
+
+def drop_expired_partitions(retention_months=DATA_RETENTION_MONTHS):
+    """
+    Drops whole expired months and unlinks their rows from ALL_DATA.
+    Returns a report with the dropped partitions and the (estimated) rows and bytes freed.
+    """
+    report = {'partitions': [], 'rows': 0, 'bytes': 0}
+    if get_backend().name != 'mysql':
+        return report
+    retention_start = None
+    if retention_months > 0:
+        retention_start = _add_months(_month_start(date.today()), -retention_months)
+
+    with db_session() as conn:
+        if not conn: return report
+        cursor = conn.cursor()
+
+        for table, (_, link_column) in PARTITIONED_TABLES.items():
+            for partition in get_partitions(cursor, table):
+                try:
+                    if not _partition_is_expired(cursor, table, partition, retention_start):
+                        continue
+
+                    # ALL_DATA has no foreign keys to partitioned tables, so unlink by hand
+                    bounds, params = ["timestamp < %s"], [partition['end']]
+                    if partition['start']:
+                        bounds.append("timestamp >= %s")
+                        params.append(partition['start'])
+                    where = " AND ".join(bounds)
+                    cursor.execute(f"UPDATE ALL_DATA SET {link_column} = NULL WHERE {where}", params)
+                    cursor.execute(f"""
+                        DELETE FROM ALL_DATA
+                        WHERE weather_data_id IS NULL AND sensor_data_id IS NULL AND {where}
+                    """, params)
+                    conn.commit()
+
+                    cursor.execute(f"ALTER TABLE {table} DROP PARTITION {partition['name']}")
+                    bump_data_version(table)
+                    # Recordings in the dropped month lose those readings from their summaries
+                    refresh_audio_summaries(cursor, partition['start'] or '1000-01-01', partition['end'])
+                    refresh_sketches(cursor, table, partition['start'] or '1000-01-01', partition['end'])
+                    conn.commit()
+
+                    report['partitions'].append(f"{table}.{partition['name']}")
+                    report['rows'] += partition['rows']
+                    report['bytes'] += partition['bytes']
+                except Exception as e:
+                    print(f"Partition Drop Error ({table}.{partition['name']}): {e}")
+                    conn.rollback()
+    return report
+
+# ==========
+# MIGRATION
+# ==========
+
+def migrate_to_partitions(months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Converts unpartitioned SENSOR_DATA / WEATHER_DATA tables (older Database.sql) in place.
+    MySQL requires the partitioning column in every unique key and does not allow foreign
+    keys on partitioned tables, so the primary keys become (id, timestamp) and the ALL_DATA
+    foreign keys are dropped; the application keeps ALL_DATA consistent instead.
+    """
+    if get_backend().name != 'mysql':
+        print("Partitioning needs the MySQL backend.")
+        return False
+    with db_session() as conn:
+        if not conn: return False
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'ALL_DATA'
+        """)
+        for (constraint,) in cursor.fetchall():
+            print(f"Dropping foreign key ALL_DATA.{constraint}")
+            cursor.execute(f"ALTER TABLE ALL_DATA DROP FOREIGN KEY {constraint}")
+
+        for table, (pk, _) in PARTITIONED_TABLES.items():
+            if get_partitions(cursor, table):
+                print(f"{table} is already partitioned.")
+                continue
+
+            first = _first_month(cursor, table)
+            last = _add_months(_month_start(date.today()), months_ahead)
+            clauses = [f"PARTITION p_start VALUES LESS THAN (TO_DAYS('{first:%Y-%m-%d}'))"]
+            month = first
+            while month <= last:
+                clauses.append(_partition_clause(month))
+                month = _add_months(month, 1)
+            clauses.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+
+            print(f"Partitioning {table} into {len(clauses)} partitions (this copies the table)...")
+            cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({pk}, `timestamp`)")
+            cursor.execute(f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(`timestamp`)) ({', '.join(clauses)})")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of SENSOR_DATA and WEATHER_DATA.")
+    parser.add_argument('command', choices=['migrate', 'maintain', 'list'])
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate_to_partitions()
+        print(ensure_future_partitions())
+    elif args.command == 'maintain':
+        print("Created:", ensure_future_partitions())
+        print("Dropped:", drop_expired_partitions())
+    else:
+        with db_session() as conn:
+            cursor = conn.cursor()
+            for table in PARTITIONED_TABLES:
+                for p in get_partitions(cursor, table):
+                    print(f"{table:13} {p['name']:10} {str(p['start']):10} -> {str(p['end']):10} "
+                          f"~{p['rows']} rows, {p['bytes']} bytes")
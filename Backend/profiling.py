@@ -0,0 +1,206 @@
+# backend/profiling.py
+"""
+Statement tracing for db.py.
+
+When enabled, connections are opened with the tracing cursor classes below. Every
+execute() is timed and recorded with the statement's fingerprint (SQL with literals
+replaced by '?'), its parameters (redacted unless QUERY_LOG_PARAMS = 'full') and the
+rows it returned. Statements slower than SLOW_QUERY_MS are written to the slow-query log
+as one JSON object per line, together with their EXPLAIN plan.
+
+With QUERY_PROFILE on, every response also carries an X-Query-Profile header and the
+statements of recent requests can be read at /api/v1/debug/queries.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import pymysql.cursors
+from config import QUERY_LOG_PARAMS, QUERY_PROFILE, QUERY_PROFILE_KEEP, SLOW_QUERY_LOG, SLOW_QUERY_MS
+
+TRACING_ENABLED = QUERY_PROFILE or SLOW_QUERY_MS > 0
+
+# Statements of the request being handled; copied into executor threads (see executor.py)
+current_profile = contextvars.ContextVar('current_profile', default=None)
+
+# ============
+# FINGERPRINTS
+# ============
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+def fingerprint(sql):
+    """SQL with literals and placeholders replaced by '?', so similar statements group."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?+)', sql)  # IN lists of any length share one fingerprint
+    return _SPACES.sub(' ', sql).strip()
+
+def fingerprint_id(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+def _redact(args):
+    """Parameters for the log: only their types unless QUERY_LOG_PARAMS = 'full'."""
+    if args is None:
+        return None
+    values = args.values() if isinstance(args, dict) else args if isinstance(args, (list, tuple)) else [args]
+    if QUERY_LOG_PARAMS == 'full':
+        return [repr(v)[:200] for v in values]
+    return [f"<{type(v).__name__}>" for v in values]
+
+# ===============
+# SLOW QUERY LOG
+# ===============
+
+_log_lock = threading.Lock()
+
+def _explain(connection, sql, args):
+    """EXPLAIN of a SELECT on a plain cursor, so it is neither traced nor disturbs results."""
+    if not sql.lstrip(' \n\t(').upper().startswith('SELECT'):
+        return None
+    try:
+        cursor = pymysql.cursors.DictCursor(connection)
+        cursor.execute("EXPLAIN " + sql, args)
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+    except Exception as e:
+        return [{'error': str(e)}]
+
+def _write_slow_query(entry):
+    line = json.dumps(entry, default=str)
+    with _log_lock:
+        if not SLOW_QUERY_LOG:
+            print(f"SLOW QUERY {line}")
+            return
+        try:
+            with open(SLOW_QUERY_LOG, 'a') as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Slow Query Log Error: {e}")
+
+# ===============
+# TRACING CURSORS
+# ===============
+
+class _TracingMixin:
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self._record(query, args, (time.perf_counter() - started) * 1000)
+
+    def _record(self, query, args, duration_ms):
+        profile = current_profile.get()
+        slow = 0 < SLOW_QUERY_MS <= duration_ms
+        if profile is None and not slow:
+            return
+
+        text = fingerprint(query)
+        rows = self.rowcount if self.rowcount is not None and self.rowcount >= 0 else None
+        entry = {
+            'fingerprint': text,
+            'fingerprint_id': fingerprint_id(text),
+            'params': _redact(args),
+            'duration_ms': round(duration_ms, 3),
+            'rows': rows,
+        }
+        if profile is not None:
+            profile['queries'].append(entry)
+        if slow:
+            slow_entry = dict(entry, time=datetime.now().isoformat(' ', 'seconds'),
+                              endpoint=profile['endpoint'] if profile else None)
+            # Unbuffered cursors still hold their result; EXPLAIN would have to wait for it
+            if not isinstance(self, pymysql.cursors.SSCursor):
+                slow_entry['explain'] = _explain(self.connection, query, args)
+            _write_slow_query(slow_entry)
+
+class TracingCursor(_TracingMixin, pymysql.cursors.Cursor):
+    pass
+
+class TracingDictCursor(_TracingMixin, pymysql.cursors.DictCursor):
+    pass
+
+def cursor_class(dict_cursor=False):
+    """Cursor class db.py should open connections with."""
+    if TRACING_ENABLED:
+        return TracingDictCursor if dict_cursor else TracingCursor
+    return pymysql.cursors.DictCursor if dict_cursor else pymysql.cursors.Cursor
+
+# =================
+# REQUEST PROFILES
+# =================
+
+_recent = OrderedDict()  # profile id -> profile, newest last
+_recent_lock = threading.Lock()
+
+def _summary(profile):
+    total = sum(q['duration_ms'] for q in profile['queries'])
+    return len(profile['queries']), round(total, 3)
+
+def init_app(app):
+    """Collects the statements of each request when QUERY_PROFILE is on."""
+    if not QUERY_PROFILE:
+        return
+    from flask import abort, g, jsonify, request
+
+    @app.before_request
+    def _start_profile():
+        profile = {
+            'id': os.urandom(6).hex(),
+            'endpoint': request.endpoint,
+            'path': request.full_path.rstrip('?'),
+            'method': request.method,
+            'queries': [],
+        }
+        g.profile_token = current_profile.set(profile)
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = current_profile.get()
+        if profile is None:
+            return response
+        current_profile.reset(g.pop('profile_token'))
+
+        count, total_ms = _summary(profile)
+        response.headers['X-Query-Profile'] = f"id={profile['id']}; queries={count}; db_ms={total_ms}"
+        response.headers['Server-Timing'] = f'db;dur={total_ms};desc="{count} queries"'
+        if profile['queries']:
+            with _recent_lock:
+                _recent[profile['id']] = profile
+                while len(_recent) > QUERY_PROFILE_KEEP:
+                    _recent.popitem(last=False)
+        return response
+
+    def recent_profiles_api():
+        """API endpoint handler for /api/v1/debug/queries"""
+        with _recent_lock:
+            profiles = list(_recent.values())
+        return jsonify([
+            {'id': p['id'], 'method': p['method'], 'path': p['path'],
+             'queries': _summary(p)[0], 'db_ms': _summary(p)[1]}
+            for p in reversed(profiles)
+        ])
+
+    def profile_api(profile_id):
+        """API endpoint handler for /api/v1/debug/queries/<id>"""
+        with _recent_lock:
+            profile = _recent.get(profile_id)
+        if profile is None:
+            abort(404)
+        return jsonify(profile)
+
+    app.add_url_rule('/api/v1/debug/queries', 'recent_profiles_api', recent_profiles_api)
+    app.add_url_rule('/api/v1/debug/queries/<profile_id>', 'profile_api', profile_api)
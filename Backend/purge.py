@@ -0,0 +1,234 @@
+# backend/purge.py
+"""
+Removes soft deleted data whose delete_at has passed (replaces the DELETE_EXPIRED_DATA
+event). Rows are deleted in small primary-key chunks with a pause in between, ALL_DATA
+links are cleaned up in the same transaction, and audio files no remaining recording uses
+are removed from the store (audio_store.py).
+
+Usage (from the Backend folder):
+    python purge.py          # one run, prints the report
+    python purge.py --loop   # run every PURGE_INTERVAL seconds
+"""
+import argparse
+import os
+import threading
+import time
+from config import AUDIO_DIRECTORY, PURGE_CHUNK_PAUSE, PURGE_CHUNK_SIZE, PURGE_INTERVAL
+from db import db_session, delete_audio_summaries, release_blobs, remove_unused_blobs
+from partitions import drop_expired_partitions, ensure_future_partitions
+from storage import get_backend
+
+# Table -> (primary key, column in ALL_DATA linking to it, the other ALL_DATA link)
+MEASUREMENT_TABLES = {
+    'SENSOR_DATA': ('sensor_id', 'sensor_data_id', 'weather_data_id'),
+    'WEATHER_DATA': ('weather_id', 'weather_data_id', 'sensor_data_id'),
+}
+
+# Only one process at a time runs the purge, even with several app workers
+# (GET_LOCK on MySQL, a lock file next to the database on SQLite)
+PURGE_LOCK_NAME = 'weather_db_purge'
+
+# ========
+# HELPERS
+# ========
+
+def _avg_row_length(cursor, table):
+    if get_backend().name != 'mysql':
+        return 0  # no table statistics to estimate from
+    cursor.execute("""
+        SELECT AVG_ROW_LENGTH FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    row = cursor.fetchone()
+    return (row[0] or 0) if row else 0
+
+def _is_inside_audio_directory(path):
+    root = os.path.realpath(AUDIO_DIRECTORY)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+def _remove_audio_file(path):
+    """Deletes one expired recording from disk. Returns the bytes freed."""
+    if not path or not os.path.isfile(path):
+        return 0
+    if not _is_inside_audio_directory(path):
+        print(f"Purge: refusing to delete file outside AUDIO_DIRECTORY: {path}")
+        return 0
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except OSError as e:
+        print(f"Purge: could not delete {path}: {e}")
+        return 0
+
+# ===============
+# CHUNKED PURGES
+# ===============
+
+def _purge_measurements(conn, table, chunk_size, pause):
+    """Deletes expired rows of SENSOR_DATA / WEATHER_DATA chunk by chunk. Returns the row count."""
+    pk, link, other_link = MEASUREMENT_TABLES[table]
+    cursor = conn.cursor()
+    purged = 0
+
+    while True:
+        try:
+            # Lock just this chunk; a restore racing with us waits for one small commit
+            cursor.execute(f"""
+                SELECT {pk}, `timestamp` FROM {table}
+                WHERE is_deleted = 1 AND delete_at <= NOW()
+                ORDER BY {pk} LIMIT %s FOR UPDATE
+            """, (chunk_size,))
+            chunk = cursor.fetchall()
+            if not chunk:
+                conn.commit()
+                break
+
+            ids = [row[0] for row in chunk]
+            timestamps = [row[1] for row in chunk]
+            id_marks = ', '.join(['%s'] * len(ids))
+            ts_marks = ', '.join(['%s'] * len(timestamps))
+
+            # Keep ALL_DATA consistent: unlink, then drop rows that point at nothing
+            cursor.execute(f"UPDATE ALL_DATA SET {link} = NULL WHERE {link} IN ({id_marks})", ids)
+            cursor.execute(f"""
+                DELETE FROM ALL_DATA
+                WHERE timestamp IN ({ts_marks}) AND {link} IS NULL AND {other_link} IS NULL
+            """, timestamps)
+            cursor.execute(f"DELETE FROM {table} WHERE {pk} IN ({id_marks})", ids)
+            conn.commit()
+            purged += len(ids)
+        except Exception as e:
+            print(f"Purge Error ({table}): {e}")
+            conn.rollback()
+            break
+
+        if len(chunk) < chunk_size:
+            break
+        time.sleep(pause)
+
+    return purged
+
+def _purge_audio(conn, chunk_size, pause):
+    """Deletes expired AUDIO_RECORDING rows and their files. Returns (rows, bytes)."""
+    cursor = conn.cursor()
+    purged = 0
+    freed = 0
+
+    while True:
+        try:
+            cursor.execute("""
+                SELECT id, file_path, content_hash FROM AUDIO_RECORDING
+                WHERE is_deleted = 1 AND delete_at <= NOW()
+                ORDER BY id LIMIT %s FOR UPDATE
+            """, (chunk_size,))
+            chunk = cursor.fetchall()
+            if not chunk:
+                conn.commit()
+                break
+
+            ids = [row[0] for row in chunk]
+            cursor.execute(f"DELETE FROM AUDIO_RECORDING WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+            delete_audio_summaries(cursor, ids)
+            # Stored files are shared: only those no other recording uses are removed
+            released = release_blobs(cursor, [row[2] for row in chunk])
+            conn.commit()
+            purged += len(ids)
+        except Exception as e:
+            print(f"Purge Error (AUDIO_RECORDING): {e}")
+            conn.rollback()
+            break
+
+        # Files go only after the rows are committed, so a failure never leaves a row
+        # without its file
+        freed += remove_unused_blobs(released)
+        for _, file_path, content_hash in chunk:
+            if not content_hash:
+                freed += _remove_audio_file(file_path)
+
+        if len(chunk) < chunk_size:
+            break
+        time.sleep(pause)
+
+    return purged, freed
+
+# =========
+# PURGE RUN
+# =========
+
+def purge_expired_data(chunk_size=PURGE_CHUNK_SIZE, pause=PURGE_CHUNK_PAUSE):
+    """
+    One purge run. Whole expired months are dropped as partitions first, the remaining
+    expired rows are then deleted in chunks. Returns a report of rows and bytes reclaimed
+    (row bytes are estimated from the table's average row length).
+    """
+    started = time.monotonic()
+    report = {'rows': {}, 'row_bytes': 0, 'file_bytes': 0, 'partitions': [], 'skipped': False}
+
+    with db_session() as conn:
+        if not conn:
+            report['error'] = "Database connection failed at purge_expired_data."
+            return report
+        cursor = conn.cursor()
+
+        backend = get_backend()
+        if not backend.try_lock(conn, PURGE_LOCK_NAME):
+            report['skipped'] = True  # another worker is already purging
+            return report
+
+        try:
+            ensure_future_partitions()
+            dropped = drop_expired_partitions()
+            report['partitions'] = dropped['partitions']
+            report['row_bytes'] += dropped['bytes']
+
+            for table in MEASUREMENT_TABLES:
+                avg_row = _avg_row_length(cursor, table)
+                count = _purge_measurements(conn, table, chunk_size, pause)
+                report['rows'][table] = count
+                report['row_bytes'] += count * avg_row
+            if dropped['rows']:
+                report['rows']['partition_rows'] = dropped['rows']
+
+            avg_row = _avg_row_length(cursor, 'AUDIO_RECORDING')
+            count, freed = _purge_audio(conn, chunk_size, pause)
+            report['rows']['AUDIO_RECORDING'] = count
+            report['row_bytes'] += count * avg_row
+            report['file_bytes'] = freed
+        finally:
+            backend.unlock(conn, PURGE_LOCK_NAME)
+
+    report['seconds'] = round(time.monotonic() - started, 3)
+    print(f"Purge finished: {report}")
+    return report
+
+def start_purge_worker(interval=PURGE_INTERVAL):
+    """Runs purge_expired_data every 'interval' seconds on a daemon thread."""
+    if interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            try:
+                purge_expired_data()
+            except Exception as e:
+                print(f"Purge Worker Error: {e}")
+            time.sleep(interval)
+
+    worker = threading.Thread(target=loop, name='purge-worker', daemon=True)
+    worker.start()
+    return worker
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Purge expired soft deleted data.")
+    parser.add_argument('--loop', action='store_true', help="keep running every PURGE_INTERVAL seconds")
+    parser.add_argument('--chunk-size', type=int, default=PURGE_CHUNK_SIZE)
+    parser.add_argument('--pause', type=float, default=PURGE_CHUNK_PAUSE)
+    args = parser.parse_args()
+
+    while True:
+        purge_expired_data(args.chunk_size, args.pause)
+        if not args.loop:
+            break
+        time.sleep(PURGE_INTERVAL)
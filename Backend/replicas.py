@@ -0,0 +1,172 @@
+# backend/replicas.py
+"""
+Routes read-only sessions to MySQL read replicas (DB_REPLICA_HOSTS).
+
+db_session(intent='read', tables=(...)) asks the ReplicaSet for a server; every other
+session uses the primary. A replica is only picked when it is known to have every write
+the reader must see, so nobody reads their own changes back stale:
+
+- Health: each replica is checked lazily, at most every DB_REPLICA_CHECK_INTERVAL seconds
+  (SHOW REPLICA STATUS). Unreachable, not replicating or more than DB_REPLICA_MAX_LAG
+  seconds behind means down; a replica that fails to connect is down until the next check.
+- Deletes and restores: cache.rewrite_time(table) is shared by all workers. A table
+  rewritten less than (replica lag + DB_REPLICA_STICKY_SECONDS) ago is read from the primary.
+- A client's own writes: every successful non-GET request sets a cookie with its time,
+  and that client's reads follow the same rule. Requests that write read from the primary.
+
+Rows appended by others (ingest, CSV uploads) show up on a replica after its lag, which
+stays below DB_REPLICA_MAX_LAG. A result read in that window is not put in the query
+cache, where it would be filed under the new data version and reach the writer too, and
+its response gets no ETag. Background jobs that follow the data by primary key (hot
+window, events) keep using the primary.
+"""
+import contextvars
+import itertools
+import os
+import threading
+import time
+from config import (DB_BACKEND, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_HOSTS, DB_REPLICA_MAX_LAG,
+                    DB_REPLICA_STICKY_SECONDS)
+from cache import VERSIONED_TABLES, mark_replica_behind, rewrite_time, write_time
+from metrics import Counter, Gauge
+from storage import get_backend
+
+# Time of the current client's last write (see init_app); float('inf') = primary only
+client_write_time = contextvars.ContextVar('client_write_time', default=0.0)
+
+WRITE_COOKIE = 'db_last_write'
+
+DB_READS = Counter('db_reads_total', "Read-only sessions by the server that served them.", ('target',))
+
+class Replica:
+    """One read replica and what the last health check found out about it."""
+
+    def __init__(self, address):
+        host, _, port = address.partition(':')
+        self.name = address
+        self.options = {'host': host, 'port': int(port) if port else 3306}
+        self.healthy = False
+        self.lag = 0.0
+        self.checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Runs the health check when it is due. Other threads keep the last result meanwhile."""
+        if time.monotonic() - self.checked_at < DB_REPLICA_CHECK_INTERVAL:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self.checked_at >= DB_REPLICA_CHECK_INTERVAL:
+                self._set_state(*self._check())
+        finally:
+            self._lock.release()
+
+    def _check(self):
+        """Returns (healthy, lag seconds, reason)."""
+        try:
+            conn = get_backend().connect(connect_timeout=2, **self.options)
+        except Exception as e:
+            return False, 0.0, f"unreachable ({e})"
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SHOW REPLICA STATUS")  # MySQL 8.0.22+
+                lag_column = 'Seconds_Behind_Source'
+            except Exception:
+                cursor.execute("SHOW SLAVE STATUS")
+                lag_column = 'Seconds_Behind_Master'
+            row = cursor.fetchone()
+            if not row:
+                return False, 0.0, "replication is not configured"
+            status = dict(zip([column[0] for column in cursor.description], row))
+        except Exception as e:
+            return False, 0.0, f"status check failed ({e})"
+        finally:
+            conn.close()
+
+        lag = status.get(lag_column)
+        if lag is None:
+            return False, 0.0, "replication is stopped"
+        if lag > DB_REPLICA_MAX_LAG:
+            return False, float(lag), f"{lag}s behind"
+        return True, float(lag), None
+
+    def _set_state(self, healthy, lag, reason=None):
+        if healthy != self.healthy:
+            print(f"Read replica {self.name} is {'up' if healthy else 'down'}{f': {reason}' if reason else ''}")
+        self.healthy, self.lag = healthy, lag
+        self.checked_at = time.monotonic()
+
+    def mark_down(self, reason):
+        self._set_state(False, 0.0, reason)
+
+
+class ReplicaSet:
+    """The configured replicas of this process (round robin over the usable ones)."""
+
+    def __init__(self, addresses=DB_REPLICA_HOSTS):
+        # Replicas are a MySQL server feature; the SQLite backend has nothing to route
+        self.replicas = [Replica(address) for address in addresses] if DB_BACKEND == 'mysql' else []
+        self._turn = itertools.count()
+        self._pid = os.getpid()
+
+    def choose(self, tables=VERSIONED_TABLES):
+        """A replica that has every write a read of 'tables' must see, or None (primary)."""
+        if not self.replicas:
+            return None
+        if self._pid != os.getpid():
+            # A check in progress at fork time would keep its lock held in the child
+            self._pid = os.getpid()
+            for replica in self.replicas:
+                replica.after_fork()
+
+        # Age of the newest write this reader must see, on the wall clock shared by all workers
+        newest = max([client_write_time.get(), *(rewrite_time(table) for table in tables)])
+        age = time.time() - newest
+        usable = []
+        for replica in self.replicas:
+            replica.refresh()
+            if replica.healthy and age > replica.lag + DB_REPLICA_STICKY_SECONDS:
+                usable.append(replica)
+        if not usable:
+            return None
+        replica = usable[next(self._turn) % len(usable)]
+        if time.time() - max(write_time(table) for table in tables) <= replica.lag + DB_REPLICA_STICKY_SECONDS:
+            mark_replica_behind()  # may miss the latest appends: don't cache what it returns
+        return replica
+
+    def stats(self):
+        return [{'name': r.name, 'healthy': r.healthy, 'lag': r.lag} for r in self.replicas]
+
+
+replica_set = ReplicaSet()
+
+Gauge('db_replica_up', "1 while a read replica passes its health check.", ('replica',),
+      function=lambda: {(r.name,): int(r.healthy) for r in replica_set.replicas})
+Gauge('db_replica_lag_seconds', "Replication delay found by the last health check.", ('replica',),
+      function=lambda: {(r.name,): r.lag for r in replica_set.replicas})
+
+
+def init_app(app):
+    """Read-your-writes for clients: remembers the time of a client's last write in a cookie."""
+    if not replica_set.replicas:
+        return
+    from flask import request
+
+    @app.before_request
+    def _read_after_writes():
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            client_write_time.set(float('inf'))  # a writing request reads its own rows
+        else:
+            client_write_time.set(request.cookies.get(WRITE_COOKIE, 0.0, type=float))
+
+    @app.after_request
+    def _remember_write(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            keep = int(DB_REPLICA_MAX_LAG + DB_REPLICA_STICKY_SECONDS) + 1
+            response.set_cookie(WRITE_COOKIE, f"{time.time():.3f}", max_age=keep, httponly=True, samesite='Lax')
+        return response
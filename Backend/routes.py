@@ -1,20 +1,62 @@
 # backend/routes.py
-from flask import jsonify, render_template, request
+from flask import Response, jsonify, render_template, request
 import os
+from datetime import datetime
 
 # Internal project imports
-from db import (perform_batch_delete, delete_weather_data, delete_audio_recording, get_db_connection, get_latest_audio_data)
+from db import perform_batch_delete, get_latest_audio_data, SUMMARY_COLUMNS
 from services import (
     get_audio_environmental_data_logic,
     get_latest_sensor_data,    
     get_latest_weather_data,   
     get_combined_data,         
+    get_aligned_data,
+    get_cache_stats,
+    get_data_bundle,
+    DATA_SOURCES,
+    get_deleted_page,
+    get_audio_page,
+    search_audio_recordings,
+    get_audio_features,
+    stream_rows,
+    STREAM_SOURCES,
+    get_statistics,
+    TRASH_QUERIES,
     handle_audio_upload_logic
 )
+from cache import data_etag, watch_replica_reads
+from serializer import json_response
 from data_loader import process_csv_file
+from ingest import IngestBufferFull, ingest_buffer, parse_readings
+from events import EVENT_SOURCES, TooManySubscribers, build_filter, event_publisher, stream_events
+from config import (ALIGN_MAX_POINTS, ALIGN_STEP, AUDIO_ALIGN_TOLERANCE, INGEST_MAX_BATCH, ROWS_STREAM_CHUNK,
+                    ROWS_STREAM_MAX, STATISTICS_MAX_BINS)
+from sketches import SKETCH_SERIES
 from utils import is_allowed_file, format_for_frontend
+from alignment import ALIGN_METHODS
 
 
+def _conditional_json(tables, load):
+    """
+    Sends 'load()' as JSON with an ETag derived from the data versions of 'tables'.
+    If the client already holds that version we answer 304 without running the query.
+    Data read from a replica that may lag behind that version is sent without an ETag.
+    """
+    etag = data_etag(tables)
+    behind = watch_replica_reads()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        data = load()
+        if data and 'error' in data[0]:
+            return jsonify({'error': data[0]['error']}), 500
+        response = json_response(data)
+
+    if not behind:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache' # Always revalidate, never reuse blindly
+    return response
+
 # --- SENSOR DATA FUNCTIONS --- #
 
 def get_sensor_api():
@@ -24,13 +66,9 @@ def get_sensor_api():
     start_time = request.args.get('start_time')
     end_time = request.args.get('end_time')
     
-    sensor_data = get_latest_sensor_data(start_date, end_date, start_time, end_time, limit=100)
-    
-    if sensor_data and 'error' in sensor_data[0]:
-        return jsonify({'error': sensor_data[0]['error']}), 500
-        
-    # Success: Convert Python list of dicts to JSON
-    return jsonify(sensor_data)
+    # Success: Convert Python list of dicts to JSON (or 304 if the client is up to date)
+    return _conditional_json(('SENSOR_DATA',), 
+        lambda: get_latest_sensor_data(start_date, end_date, start_time, end_time, limit=100))
 
 def get_weather_api():
     
@@ -40,12 +78,8 @@ def get_weather_api():
     start_time = request.args.get('start_time')
     end_time = request.args.get('end_time')
 
-    weather_data = get_latest_weather_data(start_date, end_date, start_time, end_time, limit=100)
-    
-    if weather_data and 'error' in weather_data[0]:
-        return jsonify({'error': weather_data[0]['error']}), 500
-        
-    return jsonify(weather_data)    
+    return _conditional_json(('WEATHER_DATA',),
+        lambda: get_latest_weather_data(start_date, end_date, start_time, end_time, limit=100))
 
 def get_combined_api():
     """API endpoint handler for /api/v1/combined"""
@@ -54,14 +88,115 @@ def get_combined_api():
     start_time = request.args.get('start_time') 
     end_time = request.args.get('end_time')    
 
-    # Fetch data using the new DB function
-    combined_data = get_combined_data(start_date, end_date, start_time, end_time, limit=200)
-    
-    # Error Handling
-    if combined_data and 'error' in combined_data[0]:
-        return jsonify({'error': combined_data[0]['error']}), 500
-        
-    return jsonify(combined_data)
+    # ?align=nearest|previous|linear puts both series on a time grid instead of joining
+    # equal timestamps; step and tolerance in seconds, points = grid points returned
+    method = request.args.get('align')
+    if not method:
+        # Fetch data using the new DB function
+        return _conditional_json(('WEATHER_DATA', 'SENSOR_DATA'),
+            lambda: get_combined_data(start_date, end_date, start_time, end_time, limit=200))
+
+    if method not in ALIGN_METHODS:
+        return jsonify({'error': f"Unknown align method: {method}", 'available': list(ALIGN_METHODS)}), 400
+    try:
+        step = int(request.args.get('step', ALIGN_STEP))
+        tolerance = int(request.args.get('tolerance', step))
+        points = int(request.args.get('points', 200))
+    except ValueError:
+        return jsonify({'error': 'step, tolerance and points must be whole numbers'}), 400
+    if step < 1 or tolerance < 0 or not 1 <= points <= ALIGN_MAX_POINTS:
+        return jsonify({'error': f"Need step >= 1, tolerance >= 0 and 1 <= points <= {ALIGN_MAX_POINTS}"}), 400
+
+    return _conditional_json(('WEATHER_DATA', 'SENSOR_DATA'),
+        lambda: get_aligned_data(start_date, end_date, start_time, end_time, points, method, step, tolerance))
+
+def rows_stream_api(data_type):
+    """
+    API endpoint: /api/v1/rows/<sensor|weather|combined>?limit=5000&cursor=...&start_date=...
+    Streams the rows newest first as NDJSON (one JSON object per line); the last line is
+    {"next_cursor": "..." or null, "rows": n}. Pass next_cursor back for the next rows.
+    """
+    if data_type not in STREAM_SOURCES:
+        return jsonify({'error': f"Unknown data type: {data_type}", 'available': list(STREAM_SOURCES)}), 400
+    limit = min(max(request.args.get('limit', ROWS_STREAM_CHUNK, type=int), 1), ROWS_STREAM_MAX)
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        try:
+            datetime.strptime(cursor, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return jsonify({'error': "Invalid cursor"}), 400
+
+    response = Response(stream_rows(data_type, request.args.get('start_date'), request.args.get('end_date'),
+                                    request.args.get('start_time'), request.args.get('end_time'),
+                                    limit=limit, cursor=cursor),
+                        mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass the rows on as they come
+    return response
+
+def statistics_api():
+    """
+    API endpoint: /api/v1/statistics?series=out_temperature&start_date=...&end_date=...&q=5,50,95&bins=20
+    Count, min, max, mean, the requested percentiles and a histogram of one column over
+    any range, from the hourly sketches. Returns {"quantiles": {"p5": ...}, "histogram":
+    {"edges": [...], "counts": [...]}, ...}
+    """
+    series = request.args.get('series', '')
+    if series not in SKETCH_SERIES:
+        return jsonify({'error': f"Unknown series: {series}", 'available': list(SKETCH_SERIES)}), 400
+    try:
+        quantiles = [float(p) / 100 for p in request.args.get('q', '5,50,95').split(',') if p.strip()]
+        bins = int(request.args.get('bins', 20))
+    except ValueError:
+        return jsonify({'error': 'q must be percentages and bins a whole number'}), 400
+    if not quantiles or not all(0 <= q <= 1 for q in quantiles) or not 1 <= bins <= STATISTICS_MAX_BINS:
+        return jsonify({'error': f"Need percentages between 0 and 100 and 1 to {STATISTICS_MAX_BINS} bins"}), 400
+
+    data = get_statistics(series, request.args.get('start_date'), request.args.get('end_date'),
+                          request.args.get('start_time'), request.args.get('end_time'), quantiles, bins)
+    if 'error' in data:
+        return jsonify(data), 500
+    return json_response(data)
+
+# Row limits of the single-source endpoints above, reused by the bundle
+DEFAULT_LIMITS = {'sensors': 100, 'weather': 100, 'combined': 200}
+
+def get_bundle_api():
+    """
+    API endpoint handler for /api/v1/bundle?include=sensors,weather,combined
+    Runs the requested queries for one window concurrently and answers with one object.
+    """
+    include = request.args.get('include', 'sensors,weather,combined')
+    sources = [s.strip() for s in include.split(',') if s.strip()]
+    unknown = [s for s in sources if s not in DATA_SOURCES]
+    if not sources or unknown:
+        return jsonify({'error': f"Unknown source(s): {', '.join(unknown) or 'none'}"}), 400
+
+    tables = sorted({t for s in sources for t in DATA_SOURCES[s][1]})
+    etag = data_etag(tables)
+    behind = watch_replica_reads()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        bundle = get_data_bundle(
+            {s: DEFAULT_LIMITS[s] for s in sources},
+            request.args.get('start_date'), request.args.get('end_date'),
+            request.args.get('start_time'), request.args.get('end_time'))
+        if 'error' in bundle:
+            return jsonify(bundle), 504
+        for rows in bundle.values():
+            if rows and 'error' in rows[0]:
+                return jsonify({'error': rows[0]['error']}), 500
+        response = json_response(bundle)
+
+    if not behind:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def cache_stats_api():
+    """API endpoint handler for /api/v1/cache/stats"""
+    return jsonify(get_cache_stats())
 
 # --- AUDIO DATA FUNCTIONS --- #
 
@@ -96,7 +231,7 @@ def get_audio_environmental_api():
         status_code = 404 if "not found" in data['error'] else 400
         return jsonify(data), status_code
         
-    return jsonify(data), 200
+    return json_response(data)
 
 
 #--- Delete batch API --- #
@@ -114,18 +249,53 @@ def batch_delete_api():
 
         # Anropa den nya batch-funktionen i db.py
         from db import perform_batch_delete
-        success = perform_batch_delete(ids, data_type)
+        success, affected = perform_batch_delete(ids, data_type)
 
         if success:
-            return jsonify({'message': 'Successfully marked as deleted'}), 200
+            return jsonify({'message': 'Successfully marked as deleted', 'affected': affected}), 200
         else:
-            return jsonify({'error': 'Database update failed'}), 500
+            return jsonify({'error': 'Database update failed', 'affected': affected}), 500
             
     except Exception as e:
         print(f"Route error: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+def _range_update_api(update_func, message):
+    """Shared body of the range delete/restore endpoints."""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        from db import SOFT_DELETE_TABLES
+        if data.get('type') not in SOFT_DELETE_TABLES:
+            return jsonify({'error': 'Unknown data type'}), 400
+        # A missing filter must never hide (or restore) a whole table
+        if not data.get('start_date') and not data.get('end_date'):
+            return jsonify({'error': 'A start or end date is required'}), 400
+
+        success, affected = update_func(data['type'], data.get('start_date'), data.get('end_date'),
+                                        data.get('start_time'), data.get('end_time'))
+        if success:
+            return jsonify({'message': message, 'affected': affected}), 200
+        else:
+            return jsonify({'error': 'Database update failed', 'affected': affected}), 500
+
+    except Exception as e:
+        print(f"Route error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def range_delete_api():
+    """
+    API endpoint: POST /api/v1/delete/range
+    Body: {"type": "sensor", "start_date": "...", "end_date": "...", "start_time": "...", "end_time": "..."}
+    Hides everything in the range server-side instead of sending every id.
+    """
+    from db import perform_range_delete
+    return _range_update_api(perform_range_delete, 'Successfully marked as deleted')
+
+
 # --- Restore API --- #
 def restore_api():
     try:
@@ -135,14 +305,20 @@ def restore_api():
 
         from db import perform_batch_regret
     
-        success = perform_batch_regret(ids, data_type)
+        success, affected = perform_batch_regret(ids or [], data_type)
         if success:
-            return jsonify({'success': success})
+            return jsonify({'success': success, 'affected': affected})
         else:
-            return jsonify({'error': 'Database update failed'}), 400
+            return jsonify({'error': 'Database update failed', 'affected': affected}), 400
     except Exception as e:
         print(f"Route error: {e}")
         return jsonify({'error': str(e)}), 500
+
+
+def range_restore_api():
+    """API endpoint: POST /api/v1/restore/range, same body as /api/v1/delete/range."""
+    from db import perform_range_regret
+    return _range_update_api(perform_range_regret, 'Successfully restored')
     
 
 def upload_csv_file():
@@ -159,6 +335,74 @@ def upload_csv_file():
         
     return jsonify(result), 200 # Returns 200 if at least some rows succeeded
 
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def ingest_api():
+    """
+    API endpoint: POST /api/v1/ingest (machine ingest for the stations)
+    Body: JSON (one reading or a list) or NDJSON (one reading per line), e.g.
+      {"type": "sensor", "timestamp": 1741000000, "moisture": 41.5}
+    '?type=sensor' sets the type of readings without one. Answers 202 once the valid
+    readings are spooled; they reach the database with the next flush (see ingest.py).
+    """
+    try:
+        readings, errors = parse_readings(request.get_data(as_text=True),
+                                          ndjson=request.mimetype in NDJSON_TYPES,
+                                          default_type=request.args.get('type'))
+    except ValueError as e:
+        return jsonify({'error': f"Invalid JSON: {e}"}), 400
+
+    if len(readings) + len(errors) > INGEST_MAX_BATCH:
+        return jsonify({'error': f"At most {INGEST_MAX_BATCH} readings per request"}), 413
+    if not readings:
+        return jsonify({'error': 'No valid readings', 'rejected': len(errors), 'errors': errors[:5]}), 400
+
+    try:
+        accepted = ingest_buffer.accept(readings)
+    except IngestBufferFull as e:
+        response = jsonify({'error': f"Ingest queue full, retry later ({e})"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except OSError as e:
+        print(f"Ingest Spool Error: {e}")
+        return jsonify({'error': 'Could not queue readings'}), 503
+
+    return jsonify({'accepted': accepted, 'rejected': len(errors), 'errors': errors[:5]}), 202
+
+def events_api():
+    """
+    API endpoint: GET /api/v1/events (Server-Sent Events)
+    Pushes new rows as they are written: 'sensor', 'weather' and 'audio' events, each
+    carrying a list of rows. Filters: ?types=sensor,weather (default all), the date/time
+    filters of the query page and min_<column> / max_<column>, e.g. max_moisture=20.
+    A 'resync' event means rows were missed and the client should reload over REST.
+    """
+    types = [t for t in request.args.get('types', ','.join(EVENT_SOURCES)).split(',') if t]
+    unknown = [t for t in types if t not in EVENT_SOURCES]
+    if unknown or not types:
+        return jsonify({'error': f"Unknown event types: {', '.join(unknown) or 'none'}",
+                        'available': list(EVENT_SOURCES)}), 400
+    try:
+        predicate = build_filter(request.args)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid filter: {e}"}), 400
+
+    try:
+        subscription = event_publisher.subscribe(types, predicate)
+    except TooManySubscribers as e:
+        response = jsonify({'error': f"Too many live subscribers, retry later ({e})"})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+    except Exception as e:
+        print(f"Route error: {e}")
+        return jsonify({'error': 'Live updates unavailable'}), 503
+
+    response = Response(stream_events(subscription, resync=bool(request.headers.get('Last-Event-ID'))),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
 def upload_audio_metadata():
     """
     Saves file and extracts metadata
@@ -218,69 +462,102 @@ def query_page():
 def audio_page():
     """
     Logic for the audio management page.
-    Fetches all recordings to display them in the list.
+    The list itself is fetched page by page from /api/v1/audio by audio.js.
     """
-    conn = None
-    recordings = []
-    try:
-        # Use dict_cursor=True so we can access columns by name in the HTML
-        conn = get_db_connection(dict_cursor=True)
-        if not conn:
-            return render_template('audio.html', recordings=[])
-
-        cursor = conn.cursor()
-        
-        # Query matching your SQL schema
-        # We fetch start_time to show the user when it was recorded
-        query = "SELECT id, date, start_time, file_path FROM AUDIO_RECORDING WHERE is_deleted = 0 ORDER BY start_time DESC"
-
-        cursor.execute(query)
-        recordings = cursor.fetchall()
-
-        # Clean up data for the HTML template
-        for record in recordings:
-            # Extract filename from path (e.g., /path/to/file.wav -> file.wav)
-            if record['file_path']:
-                record['filename'] = os.path.basename(record['file_path'])
-            
-            # Format date and time objects to strings for clean display
-            if record['date']:
-                record['date'] = record['date'].strftime('%Y-%m-%d')
-            if record['start_time']:
-                record['start_time'] = record['start_time'].strftime('%H:%M:%S')
+    return render_template('audio.html')
 
-    except Exception as e:
-        print(f"Error in audio_page logic: {e}")
-    finally:
-        if conn:
-            conn.close()
-
-    return render_template('audio.html', recordings=recordings)
+def audio_list_api():
+    """
+    API endpoint: /api/v1/audio?limit=50&cursor=...&start_date=...&end_date=...&prefix=...
+    Returns {"items": [...], "next_cursor": "..." or null}
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    page = get_audio_page(request.args.get('start_date'), request.args.get('end_date'),
+                          request.args.get('start_time'), request.args.get('end_time'),
+                          prefix=(request.args.get('prefix') or '').strip() or None,
+                          limit=limit, cursor=request.args.get('cursor') or None)
+    if 'error' in page:
+        status = 400 if page['error'] == "Invalid cursor" else 500
+        return jsonify(page), status
+    return json_response(page)
+
+def audio_search_api():
+    """
+    API endpoint: /api/v1/audio/search?min_wind_speed_max=10&min_out_humidity_avg=80&limit=50
+    min_<column> / max_<column> are inclusive bounds on the summary columns (<metric>_min,
+    _max, _avg, sensor/weather _samples and _coverage); the date/time filters apply to the
+    recording start. Returns {"items": [...], "next_cursor": "..." or null}
+    """
+    bounds = []
+    for name, value in request.args.items():
+        if not name.startswith(('min_', 'max_')):
+            continue
+        column = name[4:]
+        if column not in SUMMARY_COLUMNS:
+            return jsonify({'error': f"Unknown condition: {name}", 'available': list(SUMMARY_COLUMNS)}), 400
+        try:
+            bounds.append((column, '>=' if name.startswith('min_') else '<=', float(value)))
+        except ValueError:
+            return jsonify({'error': f"Invalid number for {name}: {value}"}), 400
+
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    page = search_audio_recordings(bounds, request.args.get('start_date'), request.args.get('end_date'),
+                                   request.args.get('start_time'), request.args.get('end_time'),
+                                   limit=limit, cursor=request.args.get('cursor') or None)
+    if 'error' in page:
+        status = 400 if page['error'] == "Invalid cursor" else 500
+        return jsonify(page), status
+    return json_response(page)
+
+def audio_features_api():
+    """
+    API endpoint: /api/v1/audio/features?audio_id=123 or ?start_date=...&end_date=...
+    Per-second loudness and band energies of the recording(s), averaged over 'step'
+    seconds, with the weather and sensor values aligned to every row (align=nearest|
+    previous|linear, tolerance in seconds). Returns {"columns": [...], "rows": [...]}
+    """
+    method = request.args.get('align', 'nearest')
+    if method not in ALIGN_METHODS:
+        return jsonify({'error': f"Unknown align method: {method}", 'available': list(ALIGN_METHODS)}), 400
+    try:
+        audio_id = request.args.get('audio_id', type=int)
+        step = int(request.args.get('step', 1))
+        tolerance = int(request.args.get('tolerance', AUDIO_ALIGN_TOLERANCE))
+    except ValueError:
+        return jsonify({'error': 'step and tolerance must be whole numbers'}), 400
+    if step < 1 or tolerance < 0:
+        return jsonify({'error': 'Need step >= 1 and tolerance >= 0'}), 400
+
+    data = get_audio_features(audio_id, request.args.get('start_date'), request.args.get('end_date'),
+                              request.args.get('start_time'), request.args.get('end_time'),
+                              step, method, tolerance, limit=ALIGN_MAX_POINTS)
+    if 'error' in data:
+        status = 404 if data['error'].startswith("No audio features") else 400
+        return jsonify(data), status
+    return json_response(data)
 
 def audio_details_page():
     return render_template('audio_details.html')
 
 def trash_page():
-    from db import view_deleted_audio_data, view_deleted_sensor_data, view_deleted_weather_data
-    import os
-
-    # 1. Hämta all data en gång
-    audio = view_deleted_audio_data()
-    weather = view_deleted_weather_data()
-    sensors = view_deleted_sensor_data()
-
-    # 2. Formatera all data (Datum och Filnamn)
-    for collection in [audio, weather, sensors]:
-        for item in collection:
-            # Fixa tidsstämplar för timern
-            if 'delete_at' in item and item['delete_at']:
-                item['delete_at'] = item['delete_at'].strftime('%Y-%m-%d %H:%M:%S')
-            if 'timestamp' in item and item['timestamp']:
-                item['timestamp'] = item['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Specifikt för ljudfiler: Extrahera filnamnet från sökvägen
-            if 'file_path' in item and item['file_path']:
-                item['filename'] = os.path.basename(item['file_path'])
+    # The lists are loaded page by page from /api/v1/trash/<type> by trash.js
+    return render_template('trashcan.html')
 
-    # 3. Skicka den färdigformaterade datan till HTML-sidan
-    return render_template('trashcan.html', audio=audio, weather=weather, sensors=sensors)
\ No newline at end of file
+def trash_api(data_type):
+    """
+    API endpoint: /api/v1/trash/<sensor|weather|audio>?limit=50&offset=0&start_date=...
+    Returns {"items": [...], "total": n, "limit": ..., "offset": ...}
+    """
+    if data_type not in TRASH_QUERIES:
+        return jsonify({'error': 'Unknown data type'}), 404
+
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    page = get_deleted_page(data_type,
+                            request.args.get('start_date'), request.args.get('end_date'),
+                            request.args.get('start_time'), request.args.get('end_time'),
+                            limit=limit, offset=offset)
+    if 'error' in page:
+        return jsonify(page), 500
+    return json_response(page)
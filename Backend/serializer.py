@@ -0,0 +1,135 @@
+# backend/serializer.py
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from operator import itemgetter
+from flask import Response
+from pymysql.constants import FIELD_TYPE
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up, the stdlib encoder produces the same JSON
+    orjson = None
+
+# ====================
+# COLUMN CONVERTERS
+# ====================
+# Same output as utils.format_for_frontend, but each column's converter is picked once
+# per query instead of running isinstance checks on every cell.
+
+def _format_datetime(value):
+    try:
+        return value.isoformat(' ', 'seconds')  # == strftime('%Y-%m-%d %H:%M:%S'), ~3x faster
+    except (AttributeError, TypeError):
+        return value  # e.g. zero dates that the driver hands back as strings
+
+def _format_date(value):
+    try:
+        return value.isoformat()
+    except AttributeError:
+        return value
+
+def _format_timedelta(value):
+    try:
+        total_seconds = int(value.total_seconds())
+    except AttributeError:
+        return value
+    return f"{total_seconds // 3600:02}:{(total_seconds % 3600) // 60:02}:{total_seconds % 60:02}"
+
+_CONVERTERS_BY_TYPE = {
+    FIELD_TYPE.DATETIME: _format_datetime,
+    FIELD_TYPE.TIMESTAMP: _format_datetime,
+    FIELD_TYPE.DATE: _format_date,
+    FIELD_TYPE.NEWDATE: _format_date,
+    FIELD_TYPE.TIME: _format_timedelta,
+}
+
+def _converter_for_value(value):
+    """Fallback for drivers that don't report column types: look at a sample value."""
+    if isinstance(value, datetime):
+        return _format_datetime
+    if isinstance(value, date):
+        return _format_date
+    if hasattr(value, 'total_seconds'):
+        return _format_timedelta
+    return None
+
+def compile_row_converter(description, first_row=None, hidden=()):
+    """
+    Builds a function that turns one raw tuple row into a frontend-ready dict.
+
+    :param description: cursor.description of the executed query
+    :param first_row: a sample row, only used for columns without a known type code
+    :param hidden: helper columns (e.g. 'sort_ts') left out of the result
+    """
+    names = [col[0] for col in description]
+    converters = []
+    for index, col in enumerate(description):
+        converter = _CONVERTERS_BY_TYPE.get(col[1])
+        if converter is None and col[1] is None and first_row is not None:
+            converter = _converter_for_value(first_row[index])
+        if converter is not None and names[index] not in hidden:
+            converters.append((index, converter))
+
+    keep = [i for i, name in enumerate(names) if name not in hidden]
+    keys = tuple(names[i] for i in keep)
+    # zip() simply stops early when the hidden columns are the trailing ones (the usual case)
+    if keep == list(range(len(keep))):
+        pick = None
+    elif len(keep) == 1:
+        pick = lambda row: (row[keep[0]],)
+    else:
+        pick = itemgetter(*keep)
+
+    def convert(row):
+        if converters:
+            row = list(row)
+            for index, converter in converters:
+                value = row[index]
+                if value is not None:
+                    row[index] = converter(value)
+        return dict(zip(keys, row if pick is None else pick(row)))
+
+    return convert
+
+def rows_for_frontend(cursor, hidden=()):
+    """Fetches every row of an executed (tuple) cursor as JSON-ready dicts."""
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    convert = compile_row_converter(cursor.description, rows[0], hidden)
+    return [convert(row) for row in rows]
+
+def row_for_frontend(cursor, hidden=()):
+    """Same as rows_for_frontend for a single row; returns None if nothing matched."""
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return compile_row_converter(cursor.description, row, hidden)(row)
+
+# ==========
+# ENCODING
+# ==========
+
+def _default(value):
+    # Mirrors Flask's DefaultJSONProvider for the types it knows about
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    # Sorted keys like Flask's jsonify, the frontend builds its table columns from key order
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(payload):
+        return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(payload):
+        return json.dumps(payload, default=_default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Drop-in for jsonify() that uses the fast encoder."""
+    return Response(dumps(payload) + b"\n", status=status, mimetype='application/json')
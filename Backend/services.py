@@ -2,16 +2,55 @@
 import os
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from config import AUDIO_DIRECTORY
-from db import db_session, insert_audio_data, delete_audio_by_start_time
-from utils import extract_audio_metadata, format_for_frontend, format_timestamp, timestamp_filter
+import numpy as np
+from config import AUDIO_ALIGN_POINTS, AUDIO_ALIGN_TOLERANCE, ROWS_STREAM_CHUNK, SKETCH_BINS
+from alignment import (SENSOR_COLUMNS, WEATHER_COLUMNS, align_series, aligned_rows, filter_bounds, latest_grid,
+                       series_from_rows, span_grid, time_of_day_mask, to_seconds, to_strings)
+from audio_features import extract_recording_features, feature_names, load_feature_tracks, queue_extraction
+from db import SUMMARY_COLUMNS, db_session, insert_audio_data
+from audio_store import file_extension, save_upload
+from cache import query_cache
+from executor import QueryTimeout, run_concurrently
+from hot_window import query_hot_window
+from metrics import timed_query
+from serializer import dumps, rows_for_frontend
+from sketches import SKETCH_SERIES, bin_count, coarse_histogram, layout_text, merge_counts, quantile_values
+from utils import extract_audio_metadata, timestamp_filter
+
+# ============
+# QUERY CACHE
+# ============
+
+def _is_cacheable(rows):
+    """Error results look like [{'error': ...}] and must never be cached."""
+    return not (rows and 'error' in rows[0])
+
+def _cached_query(endpoint, tables, loader, conditions, params, limit):
+    """
+    Serves a query through the shared result cache. The key uses the SQL conditions built
+    by timestamp_filter, so equivalent filters (e.g. '10:00' and '10:00:00') share an entry.
+    """
+    key = (endpoint, tuple(conditions), tuple(params), limit)
+    return query_cache.get_or_load(key, tables, lambda: loader(conditions, params, limit), _is_cacheable)
+
+def get_cache_stats():
+    return query_cache.stats()
 
 # =========
 # DATA GET
 # =========
 
 def get_latest_sensor_data(start_date=None, end_date=None, start_time=None, end_time=None, limit=300):
-    with db_session(dict_cursor=True) as conn:
+    # Recent rows come from memory when the window covers the request (see hot_window.py)
+    rows = query_hot_window('SENSOR_DATA', start_date, end_date, start_time, end_time, limit)
+    if rows is not None:
+        return rows
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time)
+    return _cached_query('sensors', ('SENSOR_DATA',), _query_sensor_data, conditions, params, limit)
+
+@timed_query('get_latest_sensor_data')
+def _query_sensor_data(conditions, params, limit):
+    with db_session(intent='read', tables=('SENSOR_DATA',)) as conn:
         if not conn:
             return[{'error': "Database connection failed at get_latest_sensor_data."}]
         cursor = conn.cursor()
@@ -27,14 +66,13 @@ def get_latest_sensor_data(start_date=None, end_date=None, start_time=None, end_
             WHERE is_deleted = 0
         """
 
-        conditions, params = timestamp_filter(start_date, end_date, start_time, end_time)          
         if conditions:
             query += " AND " + " AND ".join(conditions)
         query += f" ORDER BY `timestamp` DESC LIMIT {limit}"
 
         try:
             cursor.execute(query, params)      
-            return format_for_frontend(cursor.fetchall())
+            return rows_for_frontend(cursor)
         except Exception as e:
             print(f"Sensor Database Query Error: {e}")
             return [{'error': f"Failed to load sensor data: {e}"}]
@@ -45,7 +83,15 @@ def get_latest_weather_data(start_date=None, end_date=None, start_time=None, end
     Retrieves WEATHER_DATA, handling date/time formatting and serialization issues.
     It selects all detailed weather metrics along with the date and time.
     """
-    with db_session(dict_cursor=True) as conn:
+    rows = query_hot_window('WEATHER_DATA', start_date, end_date, start_time, end_time, limit)
+    if rows is not None:
+        return rows
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time)
+    return _cached_query('weather', ('WEATHER_DATA',), _query_weather_data, conditions, params, limit)
+
+@timed_query('get_latest_weather_data')
+def _query_weather_data(conditions, params, limit):
+    with db_session(intent='read', tables=('WEATHER_DATA',)) as conn:
         if not conn:
             return [{'error': "Database connection failed at get_latest_weather_data."}]
         cursor = conn.cursor()
@@ -62,7 +108,6 @@ def get_latest_weather_data(start_date=None, end_date=None, start_time=None, end
             WHERE is_deleted = 0
         """
 
-        conditions, params = timestamp_filter(start_date, end_date, start_time, end_time)          
         if conditions:
             query += " AND " + " AND ".join(conditions)
                 
@@ -70,7 +115,7 @@ def get_latest_weather_data(start_date=None, end_date=None, start_time=None, end
 
         try:
             cursor.execute(query, params)
-            return format_for_frontend(cursor.fetchall())
+            return rows_for_frontend(cursor)
         except Exception as e:
             print(f"Weather Database Query Error: {e}")
             return [{'error': f"Failed to load weather data: {e}"}]
@@ -78,29 +123,20 @@ def get_latest_weather_data(start_date=None, end_date=None, start_time=None, end
 
 def get_combined_data(start_date=None, end_date=None, start_time=None, end_time=None, limit=10000):
     """ Combines weather and sensor data using a UNION."""
-    with db_session(dict_cursor=True) as conn:
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, 'sort_ts')
+    return _cached_query('combined', ('WEATHER_DATA', 'SENSOR_DATA'), _query_combined_data, conditions, params, limit)
+
+@timed_query('get_combined_data')
+def _query_combined_data(conditions, params, limit):
+    with db_session(intent='read', tables=('WEATHER_DATA', 'SENSOR_DATA')) as conn:
         if not conn:
             return[{'error': "Database connection failed at get_combined_data."}]
         cursor = conn.cursor()
 
         # We use COALESCE(W.col, S.col) to pick whichever table has the data.
         # This ensures that even if Weather is missing, we see the Sensor's Date/Time.
-        subquery = """
-            SELECT 
-                COALESCE(W.date, S.date) AS date,
-                COALESCE(W.time, S.time) AS time,
-                W.in_temperature, W.out_temperature, W.in_humidity, W.out_humidity, 
-                W.wind_speed, W.wind_direction, W.daily_rain, W.rain_rate,
-                S.moisture,
-                COALESCE(W.timestamp, S.timestamp) AS sort_ts
-            FROM WEATHER_DATA W
-            LEFT JOIN SENSOR_DATA S ON W.timestamp = S.timestamp
-            WHERE (W.is_deleted = 0 OR W.is_deleted IS NULL)
-                AND (S.is_deleted = 0 OR S.is_deleted IS NULL)
-            
-            UNION
-            
-            SELECT 
+        branch = """
+            SELECT * FROM (SELECT 
                 COALESCE(W.date, S.date) AS date,
                 COALESCE(W.time, S.time) AS time,
                 W.in_temperature, W.out_temperature, W.in_humidity, W.out_humidity, 
@@ -108,39 +144,399 @@ def get_combined_data(start_date=None, end_date=None, start_time=None, end_time=
                 S.moisture,
                 COALESCE(W.timestamp, S.timestamp) AS sort_ts
             FROM WEATHER_DATA W
-            RIGHT JOIN SENSOR_DATA S ON W.timestamp = S.timestamp
+            {join} JOIN SENSOR_DATA S ON W.timestamp = S.timestamp
             WHERE (W.is_deleted = 0 OR W.is_deleted IS NULL)
                 AND (S.is_deleted = 0 OR S.is_deleted IS NULL)
+                {filters}
+            ORDER BY {ts} DESC LIMIT {limit}) AS {alias}
         """
 
-        # Build the wrapper query for filtering and sorting
-        final_query = f"SELECT * FROM ({subquery}) AS combined_result"
-        
-        conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, 'sort_ts')
-
-        if conditions:
-            final_query += " WHERE " + " AND ".join(conditions)
-        
+        # The filters are pushed into each branch on the column sort_ts is taken from
+        # (W.timestamp for the LEFT JOIN, S.timestamp for the RIGHT JOIN). Filtering the raw
+        # column lets MySQL use the timestamp index and prune partitions, and each branch
+        # only needs its own newest 'limit' rows for the final top-'limit' to be correct.
+        # Each branch is wrapped in a derived table (not bare parentheses) so the same
+        # statement also runs on SQLite.
+        branches = []
+        final_params = []
+        for join, ts, alias in (('LEFT', 'W.timestamp', 'weather_side'), ('RIGHT', 'S.timestamp', 'sensor_side')):
+            filters = "".join(f" AND {c.replace('sort_ts', ts)}" for c in conditions)
+            branches.append(branch.format(join=join, ts=ts, filters=filters, limit=limit, alias=alias))
+            final_params += params
+
+        # Build the wrapper query for sorting
+        final_query = f"SELECT * FROM ({' UNION '.join(branches)}) AS combined_result"
         final_query += f" ORDER BY sort_ts DESC LIMIT {limit}"
+        params = final_params
 
         try:
             cursor.execute(final_query, params)
-            raw_data = cursor.fetchall()
-            data = format_for_frontend(raw_data)
-
-            # Clean up internal helper columns befor returning to frontend
-            for row in data:
-                row.pop('sort_ts', None)
-            return data 
+            # The internal helper column is left out while the rows are built
+            return rows_for_frontend(cursor, hidden=('sort_ts',))
 
         except Exception as e:
             print(f"Combined Query Error: {e}")
             return [{'error': str(e)}]
 
+def get_aligned_data(start_date=None, end_date=None, start_time=None, end_time=None, limit=10000,
+                     method='nearest', step=60, tolerance=60):
+    """
+    Combined rows on a grid of 'step' seconds instead of equal timestamps: each series is
+    sampled at every grid point with 'method' (see alignment.py). Newest first, like the
+    UNION query.
+    """
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time)
+    bounds = filter_bounds(start_date, end_date, start_time, end_time)
+    if bounds is None:
+        return [{'error': "Invalid date or time filter."}]
+    loader = lambda c, p, l: _query_aligned_data(c, p, l, bounds, method, step, tolerance)
+    return _cached_query(f'combined-{method}-{step}-{tolerance}', ('WEATHER_DATA', 'SENSOR_DATA'),
+                         loader, conditions, params, limit)
+
+def _load_series(table, columns, start, end):
+    """One series, oldest first, between two timestamps (seconds)."""
+    with db_session(intent='read', tables=(table,)) as conn:
+        if not conn:
+            raise RuntimeError(f"DB connection failed while loading {table}.")
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT `timestamp`, {', '.join(columns)} FROM {table}
+            WHERE is_deleted = 0 AND `timestamp` BETWEEN %s AND %s
+            ORDER BY `timestamp` ASC
+        """, tuple(to_strings([start, end])))
+        return series_from_rows(rows_for_frontend(cursor), columns)
+
+@timed_query('get_aligned_data')
+def _query_aligned_data(conditions, params, limit, bounds, method, step, tolerance):
+    with db_session(intent='read', tables=('SENSOR_DATA', 'WEATHER_DATA')) as conn:
+        if not conn:
+            return[{'error': "Database connection failed at get_aligned_data."}]
+        cursor = conn.cursor()
+
+        # The grid ends at the newest matching row and can't go further back than the
+        # oldest one (minus the tolerance, a sample still reaches that far)
+        filters = "".join(f" AND {c}" for c in conditions)
+        ends = []
+        try:
+            for table in ('SENSOR_DATA', 'WEATHER_DATA'):
+                cursor.execute(f"SELECT MIN(`timestamp`), MAX(`timestamp`) FROM {table} "
+                               f"WHERE is_deleted = 0{filters}", params)
+                ends += [value for value in cursor.fetchone() if value is not None]
+        except Exception as e:
+            print(f"Aligned Query Error: {e}")
+            return [{'error': str(e)}]
+    if not ends:
+        return []
+
+    ends = to_seconds(ends)
+    grid = latest_grid(int(ends.max()), int(ends.min()) - tolerance, step, limit, bounds)
+    if not len(grid):
+        return []
+    start, end = int(grid[0]) - tolerance, int(grid[-1]) + tolerance
+    try:
+        series = run_concurrently({
+            'sensor': lambda: _load_series('SENSOR_DATA', SENSOR_COLUMNS, start, end),
+            'weather': lambda: _load_series('WEATHER_DATA', WEATHER_COLUMNS, start, end),
+        })
+    except Exception as e:
+        print(f"Aligned Query Error: {e}")
+        return [{'error': str(e)}]
+
+    rows = aligned_rows(grid, [(*series['weather'], WEATHER_COLUMNS), (*series['sensor'], SENSOR_COLUMNS)],
+                        method, tolerance, newest_first=True)
+    # Same column order as the UNION query
+    return [{'date': row['date'], 'time': row['time'],
+             **{column: row[column] for column in WEATHER_COLUMNS}, 'moisture': row['moisture']}
+            for row in rows]
+
+# ==============
+# ROW STREAMING
+# ==============
+
+# data_type -> (loader, column the cursor is compared with). Timestamps are unique in
+# each table, so the last row's timestamp is all a cursor needs.
+STREAM_SOURCES = {
+    'sensor': (_query_sensor_data, '`timestamp`'),
+    'weather': (_query_weather_data, '`timestamp`'),
+    'combined': (_query_combined_data, 'sort_ts'),
+}
+
+def stream_rows(data_type, start_date=None, end_date=None, start_time=None, end_time=None,
+                limit=ROWS_STREAM_CHUNK, cursor=None, chunk_size=ROWS_STREAM_CHUNK):
+    """
+    Yields up to 'limit' rows, newest first, as NDJSON (bytes, one chunk of lines at a
+    time), then a last line {"next_cursor": ..., "rows": n} to continue from. Every chunk
+    is a keyset query on a short session of its own (not cached), so a slow client never
+    holds a database connection.
+    """
+    loader, column = STREAM_SOURCES[data_type]
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, column)
+    sent = 0
+    while sent < limit:
+        size = min(chunk_size, limit - sent)
+        keyset = ([f"{column} < %s"], [cursor]) if cursor else ([], [])
+        rows = loader(conditions + keyset[0], params + keyset[1], size)
+        if rows and 'error' in rows[0]:
+            yield dumps(rows[0]) + b"\n"
+            return
+        if rows:
+            yield b"\n".join(dumps(row) for row in rows) + b"\n"
+            sent += len(rows)
+            cursor = f"{rows[-1]['date']} {rows[-1]['time']}"
+        if len(rows) < size:
+            cursor = None  # nothing left
+            break
+    yield dumps({'next_cursor': cursor, 'rows': sent}) + b"\n"
+
+# Source name -> (getter, tables it reads), for requests that want several at once
+DATA_SOURCES = {
+    'sensors': (get_latest_sensor_data, ('SENSOR_DATA',)),
+    'weather': (get_latest_weather_data, ('WEATHER_DATA',)),
+    'combined': (get_combined_data, ('WEATHER_DATA', 'SENSOR_DATA')),
+}
+
+def get_data_bundle(limits, start_date=None, end_date=None, start_time=None, end_time=None):
+    """
+    Loads several sources for the same window concurrently, each on its own connection.
+    'limits' maps each wanted source to its row limit. Returns {source: rows}, or
+    {'error': ...} if the group did not finish in time.
+    """
+    def task(getter, limit):
+        return lambda: getter(start_date, end_date, start_time, end_time, limit)
+
+    tasks = {source: task(DATA_SOURCES[source][0], limit) for source, limit in limits.items()}
+    try:
+        return run_concurrently(tasks)
+    except QueryTimeout as e:
+        print(f"Bundle Query Error: {e}")
+        return {'error': str(e)}
+
+# ===========
+# STATISTICS
+# ===========
+
+def get_statistics(series, start_date=None, end_date=None, start_time=None, end_time=None,
+                   quantiles=(0.05, 0.5, 0.95), bins=20):
+    """
+    Count, min, max, mean, quantiles and a histogram of one column over a time range,
+    merged from the hourly sketches (sketches.py) instead of the rows, so the length of
+    the range hardly matters. The range is rounded to whole hours; quantiles are exact
+    to 'resolution'.
+    """
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, 'bucket')
+    try:
+        with db_session(intent='read', tables=(SKETCH_SERIES[series],)) as conn:
+            if not conn:
+                return {'error': "Database connection failed at get_statistics."}
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT bucket, samples, min_value, max_value, sum_value, bins, counts
+                FROM MEASUREMENT_SKETCH
+                WHERE {' AND '.join(['series = %s', *conditions])}
+                ORDER BY bucket
+            """, [series, *params])
+            rows = cursor.fetchall()
+    except Exception as e:
+        print(f"Statistics Query Error: {e}")
+        return {'error': str(e)}
+
+    # Sketches made with other bins (changed SKETCH_BINS) can't be merged until rebuilt
+    current = [row for row in rows if row[5] == layout_text(series)]
+    result = {'series': series, 'resolution': SKETCH_BINS[series][2], 'buckets': len(current),
+              'outdated_buckets': len(rows) - len(current), 'samples': 0}
+    if not current:
+        return result
+
+    counts = merge_counts([row[6] for row in current], bin_count(series) + 2)
+    samples = int(counts.sum())
+    minimum, maximum = min(row[2] for row in current), max(row[3] for row in current)
+    values = quantile_values(series, counts, minimum, maximum, quantiles)
+    result.update({
+        'first': str(current[0][0]),
+        'last': str(current[-1][0]),  # start of the last hour
+        'samples': samples,
+        'min': minimum,
+        'max': maximum,
+        'mean': round(sum(row[4] for row in current) / samples, 6),
+        'quantiles': {f"p{q * 100:g}": round(value, 6) for q, value in zip(quantiles, values)},
+        'histogram': coarse_histogram(series, counts, minimum, maximum, bins),
+    })
+    return result
+
+# ======
+# TRASH
+# ======
+
+# data_type -> (table, primary key, columns shown on the trash page, time column)
+TRASH_QUERIES = {
+    'sensor': ('SENSOR_DATA', 'sensor_id', "sensor_id, `timestamp`, moisture, delete_at", '`timestamp`'),
+    'weather': ('WEATHER_DATA', 'weather_id', "weather_id, `timestamp`, out_temperature, delete_at", '`timestamp`'),
+    'audio': ('AUDIO_RECORDING', 'id', "id, start_time AS `timestamp`, file_path, delete_at", 'start_time'),
+}
+
+@timed_query('get_deleted_page')
+def get_deleted_page(data_type, start_date=None, end_date=None, start_time=None, end_time=None,
+                     limit=50, offset=0):
+    """
+    One page of soft deleted rows, the ones closest to permanent deletion first.
+    The ORDER BY and the count are served by the (is_deleted, delete_at) index.
+    """
+    table, pk, columns, ts_col = TRASH_QUERIES[data_type]
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, ts_col)
+    where = " AND ".join(["is_deleted = 1", *conditions])
+
+    with db_session(intent='read', tables=(table,)) as conn:
+        if not conn:
+            return {'error': "Database connection failed at get_deleted_page."}
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)
+            total = cursor.fetchone()[0]
+
+            cursor.execute(f"""
+                SELECT {columns} FROM {table}
+                WHERE {where}
+                ORDER BY delete_at ASC, {pk} ASC
+                LIMIT %s OFFSET %s
+            """, [*params, limit, offset])
+            items = rows_for_frontend(cursor)
+        except Exception as e:
+            print(f"Trash Query Error: {e}")
+            return {'error': f"Failed to load deleted {data_type} data: {e}"}
+
+    # Only the page is post-processed, never the whole trash
+    for item in items:
+        if item.get('file_path'):
+            item['filename'] = os.path.basename(item['file_path'])
+
+    return {'items': items, 'total': total, 'limit': limit, 'offset': offset}
+
 # ==========
 # AUDIO GET
 # ==========
 
+def _escape_like(value):
+    # '!' rather than a backslash: the ESCAPE clause then reads the same on MySQL and SQLite
+    return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+
+@timed_query('get_audio_page')
+def get_audio_page(start_date=None, end_date=None, start_time=None, end_time=None, prefix=None,
+                   limit=50, cursor=None):
+    """
+    One page of non-deleted recordings, newest first.
+    Keyset pagination on (start_time, id) walks the (is_deleted, start_time) index; a
+    filename prefix becomes a LIKE range on the indexed file_path column.
+
+    :param cursor: 'next_cursor' from the previous page, None for the first page
+    :return: {'items': [...], 'next_cursor': str or None}
+    """
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, 'start_time')
+    conditions.insert(0, "is_deleted = 0")
+
+    if prefix:
+        # file_path is the logical name (the uploaded filename), see audio_store.py
+        conditions.append("file_path LIKE %s ESCAPE '!'")
+        params.append(_escape_like(prefix) + '%')
+
+    if cursor:
+        try:
+            last_start, last_id = cursor.rsplit('|', 1)
+            conditions.append("(start_time < %s OR (start_time = %s AND id < %s))")
+            params += [last_start, last_start, int(last_id)]
+        except ValueError:
+            return {'error': "Invalid cursor"}
+
+    query = f"""
+        SELECT id, date, start_time, TIME(start_time) AS time, file_path
+        FROM AUDIO_RECORDING
+        WHERE {' AND '.join(conditions)}
+        ORDER BY start_time DESC, id DESC
+        LIMIT %s
+    """
+
+    with db_session(intent='read', tables=('AUDIO_RECORDING',)) as conn:
+        if not conn:
+            return {'error': "Database connection failed at get_audio_page."}
+        db_cursor = conn.cursor()
+        try:
+            # One extra row tells us whether there is a next page
+            db_cursor.execute(query, [*params, limit + 1])
+            items = rows_for_frontend(db_cursor)
+        except Exception as e:
+            print(f"Audio List Query Error: {e}")
+            return {'error': f"Failed to load audio recordings: {e}"}
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = f"{items[-1]['start_time']}|{items[-1]['id']}"
+
+    for item in items:
+        if item['file_path']:
+            item['filename'] = os.path.basename(item['file_path'])
+
+    return {'items': items, 'next_cursor': next_cursor}
+
+def search_audio_recordings(bounds, start_date=None, end_date=None, start_time=None, end_time=None,
+                            limit=50, cursor=None):
+    """
+    One page of non-deleted recordings whose environmental summary (AUDIO_ENV_SUMMARY)
+    matches every bound, newest first, e.g. [('wind_speed_max', '>=', 10)]. The summary
+    columns are indexed, so the database doesn't need to look at the measurements.
+
+    :param bounds: (column from SUMMARY_COLUMNS, '>=' or '<=', number) tuples
+    :param cursor: 'next_cursor' from the previous page, None for the first page
+    :return: {'items': [...], 'next_cursor': str or None}
+    """
+    conditions, params = timestamp_filter(start_date, end_date, start_time, end_time, 'S.start_time')
+    conditions.insert(0, "A.is_deleted = 0")
+    for column, operator, value in bounds:
+        if column not in SUMMARY_COLUMNS or operator not in ('>=', '<='):
+            return {'error': f"Invalid condition: {column}"}
+        conditions.append(f"S.{column} {operator} %s")
+        params.append(value)
+
+    if cursor:
+        try:
+            last_start, last_id = cursor.rsplit('|', 1)
+            conditions.append("(S.start_time < %s OR (S.start_time = %s AND S.audio_id < %s))")
+            params += [last_start, last_start, int(last_id)]
+        except ValueError:
+            return {'error': "Invalid cursor"}
+
+    query = f"""
+        SELECT A.id, A.date, A.start_time, TIME(A.start_time) AS time, A.end_time, A.file_path,
+               {', '.join(f'S.{column}' for column in SUMMARY_COLUMNS)}
+        FROM AUDIO_ENV_SUMMARY S
+        JOIN AUDIO_RECORDING A ON A.id = S.audio_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY S.start_time DESC, S.audio_id DESC
+        LIMIT %s
+    """
+
+    with db_session(intent='read') as conn:
+        if not conn:
+            return {'error': "Database connection failed at search_audio_recordings."}
+        db_cursor = conn.cursor()
+        try:
+            # One extra row tells us whether there is a next page
+            db_cursor.execute(query, [*params, limit + 1])
+            items = rows_for_frontend(db_cursor)
+        except Exception as e:
+            print(f"Audio Search Query Error: {e}")
+            return {'error': f"Failed to search audio recordings: {e}"}
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = f"{items[-1]['start_time']}|{items[-1]['id']}"
+
+    for item in items:
+        if item['file_path']:
+            item['filename'] = os.path.basename(item['file_path'])
+
+    return {'items': items, 'next_cursor': next_cursor}
+
 def get_sensor_data_for_audio(audio_id):
     """
     Retrieves all sensor data that falls within an audio recording's time range.
@@ -148,7 +544,7 @@ def get_sensor_data_for_audio(audio_id):
     :param audio_id: ID of the audio recording
     :return: List of sensor data dictionaries
     """
-    with db_session(dict_cursor=True) as conn:
+    with db_session(dict_cursor=True, intent='read', tables=('SENSOR_DATA', 'AUDIO_RECORDING')) as conn:
         if not conn:
             return []
         try:
@@ -174,7 +570,7 @@ def get_weather_data_for_audio(audio_id):
     :param audio_id: ID of the audio recording
     :return: List of weather data dictionaries
     """
-    with db_session(dict_cursor=True) as conn:
+    with db_session(dict_cursor=True, intent='read', tables=('WEATHER_DATA', 'AUDIO_RECORDING')) as conn:
         if not conn: return []
         try:
             cursor = conn.cursor()
@@ -192,97 +588,195 @@ def get_weather_data_for_audio(audio_id):
             return []
 
 
+@timed_query('get_audio_environmental_data')
+def _query_window(table, start_time, end_time):
+    """Every row of 'table' recorded between start_time and end_time, on its own connection."""
+    with db_session(intent='read', tables=(table,)) as conn:
+        if not conn:
+            raise RuntimeError(f"DB connection failed while loading {table}.")
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM {table}
+            WHERE timestamp BETWEEN %s AND %s
+            ORDER BY timestamp ASC
+        """, (start_time, end_time))
+        return rows_for_frontend(cursor)
+
 def get_audio_environmental_data_logic(audio_id):
     """
     Fetches a specific audio recording and all environmental data 
     captured during its duration
     """
-    with db_session(dict_cursor=True) as conn:
+    with db_session(intent='read', tables=('AUDIO_RECORDING',)) as conn:
         if not conn:
             return {"error": "DB connection failed."}
         cursor = conn.cursor()
-
         cursor.execute("SELECT start_time, end_time FROM AUDIO_RECORDING WHERE id = %s", (audio_id,))
         audio = cursor.fetchone()
 
-        if not audio:
-            return {"error": "Audio recroding not found"}
+    if not audio:
+        return {"error": "Audio recroding not found"}
+    start_time, end_time = audio
 
-        # Fetch Sensor Data in that window
-        cursor.execute("""
-            SELECT * FROM SENSOR_DATA 
-            WHERE timestamp BETWEEN %s AND %s
-            ORDER BY timestamp ASC
-        """, (audio['start_time'], audio['end_time']))
-        sensors = cursor.fetchall()
-
-        # Fetch Weather Data in that window
-        cursor.execute("""
-            SELECT * FROM WEATHER_DATA 
-            WHERE timestamp BETWEEN %s AND %s
-            ORDER BY timestamp ASC
-        """, (audio['start_time'], audio['end_time']))
-        weather = cursor.fetchall()
+    # Sensor and weather data don't depend on each other, fetch them side by side. The
+    # window is widened by the tolerance so the aligned series has samples at both ends.
+    start, end = (int(value) for value in to_seconds([start_time, end_time]))
+    window = to_strings([start - AUDIO_ALIGN_TOLERANCE, end + AUDIO_ALIGN_TOLERANCE])
+    try:
+        result = run_concurrently({
+            "sensor_data": lambda: _query_window('SENSOR_DATA', *window),
+            "weather_data": lambda: _query_window('WEATHER_DATA', *window),
+        })
+    except Exception as e:
+        print(f"Audio Environment Query Error: {e}")
+        return {"error": str(e)}
+
+    # Both series on one grid over the recording, e.g. for plotting them together
+    grid = span_grid(start, end, AUDIO_ALIGN_POINTS)
+    aligned = aligned_rows(grid, [
+        (*series_from_rows(result["weather_data"], WEATHER_COLUMNS), WEATHER_COLUMNS),
+        (*series_from_rows(result["sensor_data"], SENSOR_COLUMNS), SENSOR_COLUMNS),
+    ], 'linear', AUDIO_ALIGN_TOLERANCE)
+
+    first, last = to_strings([start, end])
+    return { 
+        "sensor_data": [row for row in result["sensor_data"] if first <= row['timestamp'] <= last],
+        "weather_data": [row for row in result["weather_data"] if first <= row['timestamp'] <= last],
+        "aligned": aligned
+    }
+
+def _bin_track(start, track, step, bounds):
+    """
+    One feature track on a grid of 'step' seconds within the filter bounds: energies
+    (RMS, bands) are averaged, the peak is the highest. Returns (grid seconds, values).
+    """
+    lo, hi, time_lo, time_hi = bounds
+    seconds = start + np.arange(len(track), dtype=np.int64)
+    mask = time_of_day_mask(seconds, time_lo, time_hi)
+    if lo is not None:
+        mask &= seconds >= lo
+    if hi is not None:
+        mask &= seconds <= hi
+    seconds, track = seconds[mask], track[mask].astype(np.float64)
+    if not len(seconds):
+        return seconds, track
+
+    bins = seconds - seconds % step
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    counts = np.diff(np.r_[starts, len(bins)])[:, None]
+    values = 10 * np.log10(np.add.reduceat(10 ** (track / 10), starts) / counts)
+    values[:, 1] = np.maximum.reduceat(track[:, 1], starts)
+    return bins[starts], values
+
+def get_audio_features(audio_id=None, start_date=None, end_date=None, start_time=None, end_time=None,
+                       step=1, method='nearest', tolerance=AUDIO_ALIGN_TOLERANCE, limit=10000):
+    """
+    Per-second audio features (audio_features.py) of one recording or of every recording
+    in a time range, averaged over 'step' seconds, each row with the weather and sensor
+    values aligned to it ('method' and 'tolerance' as in alignment.py). Oldest first.
+    """
+    bounds = (None, None, None, None)
+    if audio_id is None:
+        bounds = filter_bounds(start_date, end_date, start_time, end_time)
+        if bounds is None or bounds[0] is None or bounds[1] is None:
+            return {'error': "A valid start_date and end_date (or an audio_id) are required."}
 
-        return { 
-            "sensor_data": format_for_frontend(sensors),
-            "weather_data": format_for_frontend(weather)
-        }
+    try:
+        if audio_id is None:
+            tracks = load_feature_tracks(first=to_strings([bounds[0]])[0], last=to_strings([bounds[1]])[0])
+        else:
+            tracks = load_feature_tracks(audio_id)
+            # Recordings from before the tracks existed are analysed on first use
+            if not tracks and extract_recording_features(audio_id):
+                tracks = load_feature_tracks(audio_id, intent='write')  # just written, read it back from the primary
+            if not tracks:
+                return {'error': "No audio features for this recording (not found or not a WAV file)"}
+    except Exception as e:
+        print(f"Audio Feature Query Error: {e}")
+        return {'error': str(e)}
+
+    parts = []
+    for track_id, start, bands, track in tracks:
+        grid, values = _bin_track(start, track, step, bounds)
+        if len(grid):
+            parts.append((track_id, grid, values, feature_names(bands)))
+    points = sum(len(grid) for _, grid, _, _ in parts)
+    if points > limit:
+        return {'error': f"{points} points requested, at most {limit}: use a larger step or a shorter range"}
+    if not points:
+        return {'columns': feature_names(), 'rows': []}
+
+    grid = np.concatenate([grid for _, grid, _, _ in parts])
+    first, last = int(grid.min()) - tolerance, int(grid.max()) + tolerance
+    try:
+        series = run_concurrently({
+            'sensor': lambda: _load_series('SENSOR_DATA', SENSOR_COLUMNS, first, last),
+            'weather': lambda: _load_series('WEATHER_DATA', WEATHER_COLUMNS, first, last),
+        })
+    except Exception as e:
+        print(f"Audio Feature Query Error: {e}")
+        return {'error': str(e)}
+    environment = {}
+    for name, columns in (('weather', WEATHER_COLUMNS), ('sensor', SENSOR_COLUMNS)):
+        environment.update(align_series(grid, *series[name], columns, method, tolerance))
+
+    rows = []
+    offset = 0
+    for track_id, part_grid, values, names in parts:
+        stamps = to_strings(part_grid)
+        values = np.round(values, 2).tolist()
+        for i, stamp in enumerate(stamps):
+            row = {'audio_id': track_id, 'date': stamp[:10], 'time': stamp[11:]}
+            row.update((name, None if value != value else value) for name, value in zip(names, values[i]))
+            row.update((column, aligned[offset + i]) for column, aligned in environment.items())
+            rows.append(row)
+        offset += len(stamps)
+    rows.sort(key=lambda row: (row['date'], row['time'], row['audio_id']))
+
+    columns = list(dict.fromkeys(name for _, _, _, names in parts for name in names))
+    return {'columns': columns, 'rows': rows}
 
 def handle_audio_upload_logic(file):
-    if not os.path.exists(AUDIO_DIRECTORY):
-        os.makedirs(AUDIO_DIRECTORY, exist_ok=True)
-
     filename = secure_filename(file.filename)
-    final_path = os.path.join(AUDIO_DIRECTORY, filename)
-    temp_path = os.path.join(AUDIO_DIRECTORY, f"temp_{filename}")
 
     try:
-        # 1. Save as TEMP file first to read the date
-        file.save(temp_path)
+        # 1. Save as TEMP file first to read the date (hashed while it is written)
+        temp_path, content_hash, size = save_upload(file.stream, filename)
+    except OSError as e:
+        return False, str(e)
 
+    try:
         # 2. Get the Date/Time (Metadata) from the file
         metadata = extract_audio_metadata(temp_path)
         if not metadata or 'start_timestamp' not in metadata:
             raise Exception("Could not read date from file.")
 
-        # Convert Unix timestamp to MySQL format (YYYY-MM-DD HH:MM:SS)
-        formatted_time = format_timestamp(metadata['start_timestamp'])
-        mysql_start_time = formatted_time['timestamp']
-
-        # ---------------------------------------------------------
-        # 3. CHECK DUPLICATES: "Kollar andra filer om har samma datum"
-        # ---------------------------------------------------------
-        old_file_path = delete_audio_by_start_time(mysql_start_time)
-
-        if old_file_path:
-            print(f"Duplicate found! Removing old file: {old_file_path}")
-            # Remove the OLD file from the computer folder
-            if os.path.exists(old_file_path):
-                os.remove(old_file_path)
-
         # ---------------------------------------------------------
-        # 4. SAVE NEW: "Laddar upp"
+        # 3. SAVE: the file goes into the content-addressed store (a byte-identical file
+        # already there is reused) and a recording with the same name or start time is
+        # replaced, all in one transaction (see db.insert_audio_data)
         # ---------------------------------------------------------
-        
-        # Prepare metadata for final save
-        metadata['filepath'] = final_path
+        metadata['filepath'] = filename  # logical name, the file itself is found by its hash
         metadata['filename'] = filename
+        metadata.update(content_hash=content_hash, ext=file_extension(filename), size=size,
+                        source_path=temp_path)
         
         # Save to Database
         success, db_result = insert_audio_data(metadata)
         if not success:
             raise Exception(db_result)
 
-        # Rename Temp file to Final filename
-        if os.path.exists(final_path):
-            os.remove(final_path) # Safety check
-        os.rename(temp_path, final_path)
-
-        return True, {"id": db_result, "filename": filename}
-
     except Exception as e:
         # If anything fails, delete the temp file
         if os.path.exists(temp_path):
             os.remove(temp_path)
-        return False, str(e)
\ No newline at end of file
+        return False, str(e)
+
+    # Per-second features for /api/v1/audio/features, analysed in the background. The
+    # recording is committed by now: a file that can't be analysed is still a valid upload
+    try:
+        queue_extraction(db_result)
+    except Exception as e:
+        print(f"Audio Feature Error ({filename}): {e}")
+
+    return True, {"id": db_result, "filename": filename}
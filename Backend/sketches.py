@@ -0,0 +1,220 @@
+# backend/sketches.py
+"""
+Hourly histogram sketches of the measurements, for quantiles and distributions over any
+time range without reading the rows.
+
+Every hour of every column in SKETCH_BINS has one MEASUREMENT_SKETCH row: the number of
+readings, their exact min / max / sum and a histogram with fixed bins (lowest, highest,
+width). Values outside [lowest, highest) are counted in an extra bin below or above.
+Histograms with the same bins simply add up, so a range of any length is answered by
+merging its hours: a season is a few thousand small rows.
+
+- Quantiles are exact to one bin width (interpolated inside the bin they fall in); min,
+  max, mean and counts are exact. Ranges are rounded to whole hours.
+- The rows are rebuilt in the same transaction as every write to the measurements (ingest,
+  deletes, restores, dropped partitions; see db.py), from the visible rows of the hours
+  the write touched. CSV uploads insert row by row and rebuild once, after the last row.
+- A row made with other bins than SKETCH_BINS (changed config) is left out of the answers
+  until it is rebuilt.
+
+Usage (from the Backend folder):
+    python sketches.py backfill   # hours without sketches, or with other bins
+"""
+import argparse
+import numpy as np
+from config import SKETCH_BINS
+from alignment import to_seconds, to_strings
+
+HOUR = 3600
+
+# Measurement table -> sketched columns
+SKETCH_SOURCES = {
+    'SENSOR_DATA': ('moisture',),
+    'WEATHER_DATA': ('in_temperature', 'out_temperature', 'in_humidity', 'out_humidity',
+                     'wind_speed', 'daily_rain', 'rain_rate'),
+}
+SKETCH_SERIES = {column: table for table, columns in SKETCH_SOURCES.items() for column in columns
+                 if column in SKETCH_BINS}
+
+# ==========
+# HISTOGRAM
+# ==========
+
+def layout_text(series):
+    return ','.join(str(value) for value in SKETCH_BINS[series])
+
+def bin_count(series):
+    lowest, highest, width = SKETCH_BINS[series]
+    return int(np.ceil((highest - lowest) / width))
+
+def bin_indexes(series, values):
+    """Bin of every value: 0 below lowest, 1..n the fixed bins, n + 1 at or above highest."""
+    lowest, highest, width = SKETCH_BINS[series]
+    n = bin_count(series)
+    indexes = np.clip(np.floor((values - lowest) / width).astype(np.int64) + 1, 0, n)
+    return np.where(values >= highest, n + 1, indexes)
+
+def encode_counts(counts):
+    """Dense counts -> the non-empty bins as little-endian (uint16 bins, uint32 counts)."""
+    bins = np.flatnonzero(counts)
+    return bins.astype('<u2').tobytes() + counts[bins].astype('<u4').tobytes()
+
+def merge_counts(blobs, size):
+    """Adds up encoded histograms into one dense array of 'size' bins."""
+    bins, counts = [np.zeros(0, '<u2')], [np.zeros(0, '<u4')]
+    for data in blobs:
+        pairs = len(data) // 6
+        bins.append(np.frombuffer(data, '<u2', pairs))
+        counts.append(np.frombuffer(data, '<u4', pairs, offset=2 * pairs))
+    return np.bincount(np.concatenate(bins), np.concatenate(counts), size).astype(np.int64)
+
+def _bin_edges(series, minimum, maximum):
+    """Left edge of every bin plus the right edge of the last; the outer bins end at min / max."""
+    lowest, highest, width = SKETCH_BINS[series]
+    n = bin_count(series)
+    edges = lowest + width * np.arange(-1, n + 2, dtype=np.float64)
+    edges[n + 1] = highest
+    edges[0] = min(minimum, lowest)
+    edges[n + 2] = max(maximum, highest)
+    return edges
+
+def quantile_values(series, counts, minimum, maximum, quantiles):
+    """Values at the given quantiles (0..1) of a merged histogram, linear inside a bin."""
+    edges = _bin_edges(series, minimum, maximum)
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    values = []
+    for q in quantiles:
+        target = q * total
+        index = min(int(np.searchsorted(cumulative, target, side='left')), len(counts) - 1)
+        before = cumulative[index] - counts[index]
+        share = (target - before) / counts[index] if counts[index] else 0.0
+        value = edges[index] + share * (edges[index + 1] - edges[index])
+        values.append(float(min(max(value, minimum), maximum)))
+    return values
+
+def coarse_histogram(series, counts, minimum, maximum, bins):
+    """
+    At most 'bins' bars between min and max, each a whole number of sketch bins, so the
+    counts stay exact. Returns {'edges': [...], 'counts': [...]}.
+    """
+    edges = _bin_edges(series, minimum, maximum)
+    used = np.flatnonzero(counts)
+    first, last = used[0], used[-1]
+    group = max(int(np.ceil((last - first + 1) / bins)), 1)
+    starts = np.arange(first, last + 1, group)
+    bar_edges = np.append(edges[starts], edges[min(starts[-1] + group, len(counts))])
+    bar_edges[0], bar_edges[-1] = max(bar_edges[0], minimum), min(bar_edges[-1], maximum)
+    return {'edges': [round(float(edge), 6) for edge in bar_edges],
+            'counts': np.add.reduceat(counts[first:last + 1], starts - first).tolist()}
+
+# ============
+# MAINTENANCE
+# ============
+
+def refresh_sketches(cursor, table, first, last):
+    """
+    Rebuilds the sketches of every hour from 'first' to 'last' (timestamps of changed rows
+    of 'table') from its visible rows. Runs in the caller's transaction; returns the rows written.
+    """
+    columns = [column for column in SKETCH_SOURCES.get(table, ()) if column in SKETCH_BINS]
+    if not columns:
+        return 0
+    start, end = to_seconds([first, last]) // HOUR * HOUR
+    bounds = to_strings([start, end + HOUR])
+    cursor.execute(f"""
+        SELECT `timestamp`, {', '.join(columns)} FROM {table}
+        WHERE is_deleted = 0 AND `timestamp` >= %s AND `timestamp` < %s
+    """, bounds)
+    rows = cursor.fetchall()
+    marks = ', '.join(['%s'] * len(columns))
+    cursor.execute(f"DELETE FROM MEASUREMENT_SKETCH WHERE series IN ({marks}) AND bucket >= %s AND bucket < %s",
+                   (*columns, *bounds))
+    if not rows:
+        return 0
+
+    hours = to_seconds([row[0] for row in rows]) // HOUR * HOUR
+    values = np.array([row[1:] for row in rows], dtype=np.float64)  # NULL -> nan
+    sketches = []
+    for hour in np.unique(hours):
+        in_hour = values[hours == hour]
+        bucket = to_strings([hour])[0]
+        for index, series in enumerate(columns):
+            column = in_hour[:, index]
+            column = column[~np.isnan(column)]
+            if not len(column):
+                continue
+            counts = np.bincount(bin_indexes(series, column), minlength=bin_count(series) + 2)
+            sketches.append((series, bucket, len(column), float(column.min()), float(column.max()),
+                             float(column.sum()), layout_text(series), encode_counts(counts)))
+    cursor.executemany("""
+        INSERT INTO MEASUREMENT_SKETCH (series, bucket, samples, min_value, max_value, sum_value, bins, counts)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, sketches)
+    return len(sketches)
+
+def refresh_sketch_hours(cursor, table, timestamps, max_hours=24 * 7):
+    """refresh_sketches for the hours of scattered timestamps, one query per run of consecutive hours."""
+    hours = np.unique(to_seconds(list(timestamps)) // HOUR * HOUR).tolist()
+    return sum(refresh_sketches(cursor, table, *to_strings([first, last]))
+               for first, last in _hour_runs(hours, max_hours))
+
+def _hour_runs(hours, max_hours):
+    """Sorted hour starts (seconds) -> [first, last] runs of consecutive hours."""
+    runs = []
+    for hour in hours:
+        if runs and hour == runs[-1][1] + HOUR and hour - runs[-1][0] < max_hours * HOUR:
+            runs[-1][1] = hour
+        else:
+            runs.append([hour, hour])
+    return runs
+
+def rebuild_sketches(max_hours=24 * 7):
+    """
+    Rebuilds the sketches of the hours that have readings but no sketch, or a sketch with
+    other bins, at most 'max_hours' hours per transaction. Returns the sketch rows written.
+    """
+    from db import db_session  # the tool needs the database, the write path passes its cursor
+
+    written = 0
+    with db_session() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed at rebuild_sketches.")
+        cursor = conn.cursor()
+        for table, columns in SKETCH_SOURCES.items():
+            columns = [column for column in columns if column in SKETCH_BINS]
+            if not columns:
+                continue
+            # Hours as 'YYYY-MM-DD HH' text, the same on both backends
+            cursor.execute(f"SELECT DISTINCT SUBSTR(`timestamp`, 1, 13) FROM {table} WHERE is_deleted = 0")
+            todo = {row[0] for row in cursor.fetchall()}
+            marks = ', '.join(['%s'] * len(columns))
+            cursor.execute(f"SELECT DISTINCT SUBSTR(bucket, 1, 13) FROM MEASUREMENT_SKETCH WHERE series IN ({marks})",
+                           columns)
+            todo -= {row[0] for row in cursor.fetchall()}
+            for series in columns:
+                cursor.execute("SELECT DISTINCT SUBSTR(bucket, 1, 13) FROM MEASUREMENT_SKETCH "
+                               "WHERE series = %s AND bins <> %s", (series, layout_text(series)))
+                todo |= {row[0] for row in cursor.fetchall()}
+            conn.rollback()
+
+            # Consecutive hours are rebuilt together
+            hours = sorted(to_seconds([f"{hour}:00:00" for hour in todo]).tolist())
+            for first, last in _hour_runs(hours, max_hours):
+                try:
+                    written += refresh_sketches(cursor, table, *to_strings([first, last]))
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    print(f"Sketch Rebuild Error ({table}): {e}")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Hourly histogram sketches of the measurements.")
+    parser.add_argument('command', choices=['backfill'])
+    parser.parse_args()
+
+    print(f"Wrote {rebuild_sketches()} hourly sketches")
+
+if __name__ == '__main__':
+    main()
@@ -8,36 +8,121 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- 1. LIST PAGE LOGIC ---
-    // This only runs if we are on the page with audio items
-    const audioItems = document.querySelectorAll('.audio-item');
-    audioItems.forEach(item => {
-        item.addEventListener('click', () => {
+    // This only runs if we are on the page with the audio list
+    const audioList = document.getElementById('audio-list');
+    const listStatus = document.getElementById('audio-list-status');
+    const sentinel = document.getElementById('audio-list-sentinel');
+    const prefixInput = document.getElementById('audio-prefix');
+    const startDateInput = document.getElementById('audio-start-date');
+    const endDateInput = document.getElementById('audio-end-date');
+    const searchButton = document.getElementById('audio-search-btn');
+    const bulkContainer = document.getElementById('bulk-actions-container');
+    const selectedCountSpan = document.getElementById('selected-count');
+
+    let nextCursor = null;
+    let hasMore = true;
+    let loading = false;
+
+    const escapeHtml = (value) => String(value ?? '').replace(/[&<>"']/g,
+        c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
+    function renderRecording(record) {
+        const item = document.createElement('div');
+        item.className = 'container upload-box audio-item';
+        item.dataset.audioId = record.id;
+        item.dataset.filename = record.filename || '';
+        item.style.cssText = 'display: flex !important; flex-direction: row !important; align-items: center !important; gap: 20px; cursor: pointer; padding: 20px;';
+        item.innerHTML = `
+            <div class="checkbox-container" style="display: flex; align-items: center;">
+                <input type="checkbox" class="delete-checkbox" data-id="${record.id}"
+                    style="width: 20px; height: 20px; cursor: pointer;">
+            </div>
+            <div style="text-align: left; flex-grow: 1">
+                <h2 style="margin: 0;">${escapeHtml(record.filename)}</h2>
+                <p style="color: var(--secondary-text-clr); margin-top: 5px;">
+                    ${escapeHtml(record.date)} | ${escapeHtml(record.time)}
+                </p>
+            </div>`;
+        return item;
+    }
+
+    async function loadNextPage() {
+        if (loading || !hasMore) return;
+        loading = true;
+        listStatus.textContent = 'Loading recordings...';
+
+        const params = new URLSearchParams({ limit: 50 });
+        if (nextCursor) params.append('cursor', nextCursor);
+        if (prefixInput.value.trim()) params.append('prefix', prefixInput.value.trim());
+        if (startDateInput.value) params.append('start_date', startDateInput.value);
+        if (endDateInput.value) params.append('end_date', endDateInput.value);
+
+        try {
+            const response = await fetch(`/api/v1/audio?${params.toString()}`);
+            const page = await response.json();
+            if (!response.ok) throw new Error(page.error || `Status: ${response.status}`);
+
+            page.items.forEach(record => audioList.appendChild(renderRecording(record)));
+            nextCursor = page.next_cursor;
+            hasMore = Boolean(nextCursor);
+
+            if (!audioList.children.length) {
+                listStatus.textContent = 'No audio recordings found.';
+            } else {
+                listStatus.textContent = hasMore ? '' : 'All recordings loaded.';
+            }
+        } catch (e) {
+            listStatus.textContent = `Error: ${e.message}`;
+        } finally {
+            loading = false;
+        }
+    }
+
+    function updateBulkActions() {
+        const checkedCount = document.querySelectorAll('.delete-checkbox:checked').length;
+        if (checkedCount > 0) {
+            bulkContainer.style.display = 'flex'; // Show the button
+            selectedCountSpan.textContent = checkedCount;
+        } else {
+            bulkContainer.style.display = 'none'; // Hide if none selected
+        }
+    }
+
+    if (audioList) {
+        // Items are added later, so clicks are handled on the list itself
+        audioList.addEventListener('click', (event) => {
+            if (event.target.classList.contains('delete-checkbox')) {
+                event.stopPropagation();
+                return;
+            }
+            const item = event.target.closest('.audio-item');
+            if (!item) return;
             const audioId = item.getAttribute('data-audio-id');
             const filename = item.getAttribute('data-filename');
             window.location.href = `/audio/details?id=${audioId}&name=${encodeURIComponent(filename)}`;
         });
-    });
-    const bulkContainer = document.getElementById('bulk-actions-container');
-    const selectedCountSpan = document.getElementById('selected-count');
-    const checkboxes = document.querySelectorAll('.delete-checkbox');
-    checkboxes.forEach(checkbox => {
-        checkbox.addEventListener('click', (event) => {
-            event.stopPropagation();
+        audioList.addEventListener('change', (event) => {
+            if (event.target.classList.contains('delete-checkbox')) updateBulkActions();
         });
-    });
-    
-    checkboxes.forEach(cb => {
-        cb.addEventListener('change', () => {
-            const checkedCount = document.querySelectorAll('.delete-checkbox:checked').length;
-        
-            if (checkedCount > 0) {
-                bulkContainer.style.display = 'flex'; // Show the button
-                selectedCountSpan.textContent = checkedCount;
-            } else {
-                bulkContainer.style.display = 'none'; // Hide if none selected
-            }
+
+        // Fetch the next page whenever the end of the list scrolls into view
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+        }).observe(sentinel);
+
+        const restartSearch = () => {
+            audioList.innerHTML = '';
+            nextCursor = null;
+            hasMore = true;
+            updateBulkActions();
+            loadNextPage();
+        };
+        searchButton.addEventListener('click', restartSearch);
+        prefixInput.addEventListener('keydown', (event) => {
+            if (event.key === 'Enter') restartSearch();
         });
-    });
+    }
+
     // --- 2. DETAILS PAGE LOGIC ---
     const urlParams = new URLSearchParams(window.location.search);
     const idFromUrl = urlParams.get('id');
@@ -62,10 +147,6 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    if (deleteButton) {
-        deleteButton.addEventListener('click', deleteSelected);
-    }
-
     async function deleteSelected() {
         const selectedCheckboxes = document.querySelectorAll('.delete-checkbox:checked');
         const selectedIds = Array.from(selectedCheckboxes).map(cb => cb.getAttribute('data-id'));
@@ -98,7 +179,7 @@ document.addEventListener('DOMContentLoaded', () => {
 function renderData(data) {
     let html = '';
 
-    if (!data.sensor_data?.length && !data.weather_data?.length) {
+    if (!data.sensor_data?.length && !data.weather_data?.length && !data.aligned?.length) {
         content.innerHTML = '<p class="status-message info">No correlated data found.</p>';
         return;
     }
@@ -139,6 +220,26 @@ function renderData(data) {
         html += '</tbody></table></div>'; 
     }
 
+    // --- ALIGNED TABLE (both series interpolated onto one time grid) ---
+    if (data.aligned?.length > 0) {
+        const value = (v, unit) => v === null || v === undefined ? '-' : `${v}${unit}`;
+        html += '<h2 class="section-title">Aligned Sensor &amp; Weather Data</h2>';
+        html += '<div class="table-container"><table class="data-table"><thead><tr>';
+        html += '<th>Date</th><th>Time</th><th>Moisture</th><th>In Temp</th><th>Out Temp</th><th>In Hum</th><th>Out Hum</th><th>Wind Speed</th><th>Wind Dir</th><th>Rain Rate</th>';
+        html += '</tr></thead><tbody>';
+
+        data.aligned.forEach(a => {
+            html += `<tr>
+                <td>${a.date}</td><td>${a.time}</td>
+                <td>${value(a.moisture, '%')}</td><td>${value(a.in_temperature, '°C')}</td>
+                <td>${value(a.out_temperature, '°C')}</td><td>${value(a.in_humidity, '%')}</td>
+                <td>${value(a.out_humidity, '%')}</td><td>${value(a.wind_speed, ' m/s')}</td>
+                <td>${value(a.wind_direction, '')}</td><td>${value(a.rain_rate, ' mm/h')}</td>
+            </tr>`;
+        });
+        html += '</tbody></table></div>';
+    }
+
     content.innerHTML = html; 
 }
 });
\ No newline at end of file
@@ -3,12 +3,16 @@ document.addEventListener('DOMContentLoaded', () => {
     const loadButton = document.getElementById('load-data-btn');
     const resultsDiv = document.getElementById('results-area');
     const deleteButton = document.getElementById('delete-selected-btn')
+    const deleteRangeButton = document.getElementById('delete-range-btn');
+    const liveButton = document.getElementById('live-btn');
     
     // Select the inputs - using optional chaining to prevent crashes
     const startDateInput = document.getElementById('start-date');
     const endDateInput = document.getElementById('end-date');
     const startTimeInput = document.getElementById('start-time'); // Added
     const endTimeInput = document.getElementById('end-time');     // Added
+    const alignSelect = document.getElementById('align-select');
+    const alignStepInput = document.getElementById('align-step');
 
     // --- CORE LOGIC ---
     if (loadButton) {
@@ -17,39 +21,78 @@ document.addEventListener('DOMContentLoaded', () => {
     if (deleteButton) {
         deleteButton.addEventListener('click', deleteSelected);
     }
+    if (deleteRangeButton) {
+        deleteRangeButton.addEventListener('click', deleteRange);
+    }
+    if (liveButton) {
+        liveButton.addEventListener('click', toggleLive);
+        dataSelect.addEventListener('change', stopLive);
+    }
     
+    // --- RESULTS (virtualized) ---
+    // Rows are kept in memory and only the ones in view (plus a margin) are in the DOM, so
+    // the table can hold hundreds of thousands of rows. They are streamed as NDJSON from
+    // /api/v1/rows/<type>, PAGE_ROWS at a time; the next page is loaded when the user
+    // scrolls near the end of what is there.
+    const PAGE_ROWS = 5000;
+    const OVERSCAN = 20;      // rows rendered above and below the visible ones
+    const PREFETCH = 500;     // load the next page when this few loaded rows are left below
+    let rows = [];
+    let currentHeaders = null;
+    let filterParams = null;
+    let nextCursor = null;
+    let streaming = null;     // AbortController of the page being loaded
+    let rowHeight = 0;        // measured from the first rendered row
+    let renderQueued = false;
+    let selectedIds = new Set();
+
+    function filterQuery() {
+        const params = new URLSearchParams();
+
+        // Append Date and Time parameters
+        if (startDateInput && startDateInput.value) params.append('start_date', startDateInput.value);
+        if (startTimeInput && startTimeInput.value) params.append('start_time', startTimeInput.value);
+        if (endDateInput && endDateInput.value) params.append('end_date', endDateInput.value);
+        if (endTimeInput && endTimeInput.value) params.append('end_time', endTimeInput.value);
+        return params;
+    }
+
     async function fetchData() {
         const selectedData = dataSelect.value;
-        const startDate = startDateInput ? startDateInput.value : '';
-        const endDate = endDateInput ? endDateInput.value : '';
-        const startTime = startTimeInput ? startTimeInput.value : ''; // Added
-        const endTime = endTimeInput ? endTimeInput.value : '';     // Added
 
         if (!selectedData) {
             resultsDiv.innerHTML = '<p class="error">Please select a data source.</p>';
             return;
         }
 
-        const endpointMap = {
-            'sensor': '/api/v1/sensors',
-            'weather': '/api/v1/weather',
-            'combined': '/api/v1/combined'
-        };
-        
-        const endpoint = endpointMap[selectedData];
-        const params = new URLSearchParams();
-
-        // Append Date and Time parameters
-        if (startDate) params.append('start_date', startDate);
-        if (startTime) params.append('start_time', startTime); // Added
-        if (endDate) params.append('end_date', endDate);
-        if (endTime) params.append('end_time', endTime);     // Added
-        
-        const url = `${endpoint}?${params.toString()}`;
+        if (streaming) streaming.abort();
+        streaming = null;
+        rows = [];
+        currentHeaders = null;
+        nextCursor = null;
+        selectedIds = new Set();
+        updateActionMenu();
+        filterParams = filterQuery();
         resultsDiv.innerHTML = '<p class="loading info">Loading data...</p>';
-        
+
+        // Combined rows on a time grid instead of equal timestamps only: one JSON response
+        if (selectedData === 'combined' && alignSelect && alignSelect.value) {
+            const params = new URLSearchParams(filterParams);
+            params.append('align', alignSelect.value);
+            if (alignStepInput && alignStepInput.value) params.append('step', alignStepInput.value);
+            await fetchAligned(params);
+            return;
+        }
+
+        await loadPage();
+        if (!streaming && rows.length === 0 && !resultsDiv.querySelector('.error')) {
+            resultsDiv.innerHTML = '<p class="info">No data found for the selected criteria.</p>';
+        }
+    }
+
+    async function fetchAligned(params) {
         try {
-            const response = await fetch(url);
+            const response = await fetch(`/api/v1/combined?${params.toString()}`);
             if (response.status === 204) {
                 resultsDiv.innerHTML = '<p class="info">No data found for the selected criteria.</p>';
                 return;
@@ -67,20 +110,73 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            renderTable(data, resultsDiv);
-            
+            appendRows(data);
+
         } catch (e) {
             resultsDiv.innerHTML = `<p class="error">Network Error: ${e.message}</p>`;
         }
-        
     }
+
+    // Streams one page of rows, adding every chunk to the table as soon as it is parsed
+    async function loadPage() {
+        const controller = new AbortController();
+        streaming = controller;
+        const params = new URLSearchParams(filterParams);
+        params.append('limit', PAGE_ROWS);
+        if (nextCursor) params.append('cursor', nextCursor);
+
+        try {
+            const response = await fetch(`/api/v1/rows/${dataSelect.value}?${params.toString()}`,
+                                         { signal: controller.signal });
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || 'Failed to fetch data');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let trailer = null;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (streaming !== controller) return; // a new query was started meanwhile
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop(); // incomplete last line, finished by the next chunk
+                const batch = [];
+                for (const line of lines) {
+                    if (!line) continue;
+                    const item = JSON.parse(line);
+                    if (item.error) throw new Error(item.error);
+                    if ('next_cursor' in item) trailer = item;
+                    else batch.push(item);
+                }
+                if (batch.length) appendRows(batch);
+            }
+            if (!trailer) throw new Error('Incomplete response');
+            nextCursor = trailer.next_cursor;
+        } catch (e) {
+            if (e.name === 'AbortError' || streaming !== controller) return;
+            nextCursor = null;
+            if (rows.length === 0) {
+                resultsDiv.innerHTML = `<p class="error">API Error: ${e.message}</p>`;
+            } else {
+                setStatus(`Error while loading more rows: ${e.message}`);
+            }
+        }
+        if (streaming === controller) {
+            streaming = null;
+            scheduleRender();
+        }
+    }
+
     async function deleteSelected() {
-        const selectedCheckboxes = document.querySelectorAll('.row-checkbox:checked');
-        const selectedIds = Array.from(selectedCheckboxes).map(cb => cb.value);
+        const ids = Array.from(selectedIds);
         const dataSource = dataSelect.value;
 
         // Rättad jämförelse (===)
-        if (selectedIds.length === 0) {
+        if (ids.length === 0) {
             alert('No rows selected for deletion.');
             return;
         }
@@ -90,7 +186,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const response = await fetch('/api/v1/delete', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ ids: selectedIds, type: dataSource })
+                    body: JSON.stringify({ ids: ids, type: dataSource })
                 });
 
                 if (response.ok) {
@@ -105,17 +201,113 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Hides everything matching the current filters server-side (no id list is sent)
+    async function deleteRange() {
+        const dataSource = dataSelect.value;
+        const body = {
+            type: dataSource,
+            start_date: startDateInput ? startDateInput.value : '',
+            end_date: endDateInput ? endDateInput.value : '',
+            start_time: startTimeInput ? startTimeInput.value : '',
+            end_time: endTimeInput ? endTimeInput.value : ''
+        };
+
+        if (dataSource === 'combined') {
+            alert('Choose Sensor Data or Weather Data to delete a range.');
+            return;
+        }
+        if (!body.start_date && !body.end_date) {
+            alert('Set a start or end date in the filter first.');
+            return;
+        }
+        if (!confirm(`Delete ALL ${dataSource} rows between ${body.start_date || '...'} and ${body.end_date || '...'}?`)) {
+            return;
+        }
+
+        try {
+            const response = await fetch('/api/v1/delete/range', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+            const result = await response.json();
+
+            if (response.ok) {
+                alert(`${result.affected} rows deleted.`);
+                fetchData();
+            } else {
+                alert(`Delete failed: ${result.error}`);
+            }
+        } catch (e) {
+            alert("Network error: " + e.message);
+        }
+    }
+
+    // --- LIVE UPDATES ---
+    // New rows are pushed by the server (Server-Sent Events) and added on top of the table
+    let liveSource = null;
+
+    function toggleLive() {
+        if (liveSource) {
+            stopLive();
+            return;
+        }
+        const selectedData = dataSelect.value;
+        if (selectedData === 'combined') {
+            alert('Live updates are available for Sensor Data and Weather Data.');
+            return;
+        }
+
+        // Same filters as "Load Data", applied server-side to every pushed row
+        const params = new URLSearchParams({ types: selectedData });
+        if (startDateInput && startDateInput.value) params.append('start_date', startDateInput.value);
+        if (startTimeInput && startTimeInput.value) params.append('start_time', startTimeInput.value);
+        if (endDateInput && endDateInput.value) params.append('end_date', endDateInput.value);
+        if (endTimeInput && endTimeInput.value) params.append('end_time', endTimeInput.value);
+
+        liveSource = new EventSource(`/api/v1/events?${params.toString()}`);
+        liveSource.addEventListener(selectedData, (e) => prependRows(JSON.parse(e.data)));
+        // Rows were missed (slow connection or reconnect): reload the whole table
+        liveSource.addEventListener('resync', () => fetchData());
+        liveButton.textContent = 'Stop Live';
+        fetchData();
+    }
+
+    function stopLive() {
+        if (liveSource) {
+            liveSource.close();
+            liveSource = null;
+        }
+        if (liveButton) liveButton.textContent = 'Live';
+    }
+
+    function prependRows(newRows) {
+        const scroller = resultsDiv.querySelector('.table-container');
+        if (!scroller || !currentHeaders) {
+            fetchData(); // No table yet (e.g. "No data found"), load it normally
+            return;
+        }
+        // Rows arrive oldest first, so the newest ends up on top
+        newRows.forEach(row => rows.unshift(row));
+        // Someone reading further down keeps looking at the same rows
+        if (scroller.scrollTop > 0) scroller.scrollTop += newRows.length * rowHeight;
+        scheduleRender();
+    }
 
     // --- CHECKBOX & POP-UP LOGIC ---
     // We listen for changes globally within the document or results area
     document.addEventListener('change', (e) => {
+        // Selection is kept by id, rows scrolled out of view are not in the DOM
         if (e.target.id === 'select-all-rows') {
-            const checkboxes = document.querySelectorAll('.row-checkbox');
-            checkboxes.forEach(cb => cb.checked = e.target.checked);
+            selectedIds = new Set();
+            if (e.target.checked) rows.forEach(row => { const id = rowIdOf(row); if (id) selectedIds.add(id); });
+            renderVisible();
             updateActionMenu();
         }
         
         if (e.target.classList.contains('row-checkbox')) {
+            if (e.target.checked) selectedIds.add(e.target.value);
+            else selectedIds.delete(e.target.value);
             updateActionMenu();
         }
     });
@@ -134,14 +326,13 @@ toggleBtn.addEventListener('click', () => {
 });
 
     function updateActionMenu() {
-        const selected = document.querySelectorAll('.row-checkbox:checked');
         const container = document.getElementById('bulk-actions-container');
         const countSpan = document.getElementById('selected-count');
         
         if (container) {
-            if (selected.length > 0) {
+            if (selectedIds.size > 0) {
                 container.style.display = 'block';
-                if (countSpan) countSpan.textContent = selected.length;
+                if (countSpan) countSpan.textContent = selectedIds.size;
             } else {
                 container.style.display = 'none';
             }
@@ -149,16 +340,25 @@ toggleBtn.addEventListener('click', () => {
     }
 
     // --- TABLE RENDERING ---
-    function renderTable(data, targetElement) {
+    const escapeHtml = (value) => String(value ?? '').replace(/[&<>"']/g,
+        c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
+    function appendRows(batch) {
+        if (!currentHeaders) renderTable(batch[0], resultsDiv);
+        for (const row of batch) rows.push(row);
+        scheduleRender();
+    }
+
+    function renderTable(firstRow, targetElement) {
         targetElement.innerHTML = ''; 
 
         // 1. Define the order of data columns
         const mandatoryHeaders = ['date', 'time']; 
-        const allHeaders = Object.keys(data[0]).filter(h => h !== 'id');
+        const allHeaders = Object.keys(firstRow).filter(h => h !== 'id');
         const remainingHeaders = allHeaders.filter(header => !mandatoryHeaders.includes(header));
         const headers = [...mandatoryHeaders, ...remainingHeaders];
 
-        let tableHTML = '<div class="table-container"><table class="data-table"><thead><tr>';
+        let tableHTML = '<div class="table-container"><table class="data-table virtual-table"><thead><tr>';
         
         // HEADER: First column is the checkbox
         tableHTML += '<th class="checkbox-col"><input type="checkbox" id="select-all-rows"></th>';
@@ -166,31 +366,91 @@ toggleBtn.addEventListener('click', () => {
         // HEADER: Following columns are Date, Time, etc.
         headers.forEach(header => {
             const displayHeader = header.replace(/_/g, ' ').split(' ').map(word => word.charAt(0).toUpperCase() + word.slice(1)).join(' ');
-            tableHTML += `<th>${displayHeader}</th>`;
-        });
-        tableHTML += '</tr></thead><tbody>';
-
-        // BODY: Create rows
-        data.forEach(row => {
-            tableHTML += '<tr>';
-            
-            // CELL: First column MUST be the checkbox to match the header
-            const rowId = row.sensor_id || row.weather_id || row.id || ""; 
-            tableHTML += `<td class="checkbox-col"><input type="checkbox" class="row-checkbox" value="${rowId}"></td>`;
-
-            // CELL: Following columns
-            headers.forEach(header => {
-                const cellValue = row[header] !== undefined && row[header] !== null ? row[header] : 'N/A';
-                tableHTML += `<td>${cellValue}</td>`;
-            });
-
-            tableHTML += '</tr>';
+            tableHTML += `<th>${escapeHtml(displayHeader)}</th>`;
         });
 
-        tableHTML += '</tbody></table></div>';
+        // BODY: filled by renderVisible()
+        tableHTML += '</tr></thead><tbody></tbody></table></div><p class="table-status"></p>';
         targetElement.innerHTML = tableHTML;
+        currentHeaders = headers;
+        rowHeight = 0;
+
+        targetElement.querySelector('.table-container').addEventListener('scroll', scheduleRender);
         
         // Reset action menu on new render
         updateActionMenu();
     }
+
+    // At most one render per frame, however many chunks or scroll events come in
+    function scheduleRender() {
+        if (renderQueued) return;
+        renderQueued = true;
+        requestAnimationFrame(() => {
+            renderQueued = false;
+            renderVisible();
+        });
+    }
+
+    function renderVisible() {
+        const scroller = resultsDiv.querySelector('.table-container');
+        if (!scroller || !currentHeaders) return;
+        const tbody = scroller.querySelector('tbody');
+        const height = rowHeight || 40; // estimate until a row has been measured
+
+        // Start on an even row so the zebra striping doesn't flip while scrolling
+        let first = Math.max(0, Math.floor(scroller.scrollTop / height) - OVERSCAN);
+        first -= first % 2;
+        const last = Math.min(rows.length, first + Math.ceil(scroller.clientHeight / height) + 2 * OVERSCAN);
+
+        // Spacer rows stand in for everything above and below, so the scrollbar stays true
+        let html = `<tr class="spacer" style="height: ${first * height}px"></tr>`;
+        for (let i = first; i < last; i++) {
+            html += rowHTML(rows[i], currentHeaders);
+        }
+        html += `<tr class="spacer" style="height: ${(rows.length - last) * height}px"></tr>`;
+        tbody.innerHTML = html;
+
+        if (!rowHeight && last > first) {
+            rowHeight = tbody.rows[1].getBoundingClientRect().height || height;
+            if (rowHeight !== height) scheduleRender();
+        }
+
+        const selectAll = document.getElementById('select-all-rows');
+        if (selectAll) selectAll.checked = rows.length > 0 && selectedIds.size >= rows.length;
+
+        if (streaming) {
+            setStatus(`${rows.length} rows loaded, loading more...`);
+        } else if (nextCursor) {
+            setStatus(`${rows.length} rows loaded, scroll down for more`);
+            if (rows.length - last < PREFETCH) loadPage();
+        } else {
+            setStatus(`All ${rows.length} rows loaded`);
+        }
+    }
+
+    function setStatus(text) {
+        const status = resultsDiv.querySelector('.table-status');
+        if (status) status.textContent = text;
+    }
+
+    function rowIdOf(row) {
+        return String(row.sensor_id || row.weather_id || row.id || "");
+    }
+
+    function rowHTML(row, headers) {
+        let html = '<tr>';
+
+        // CELL: First column MUST be the checkbox to match the header
+        const rowId = rowIdOf(row);
+        const checked = rowId && selectedIds.has(rowId) ? ' checked' : '';
+        html += `<td class="checkbox-col"><input type="checkbox" class="row-checkbox" value="${escapeHtml(rowId)}"${checked}></td>`;
+
+        // CELL: Following columns
+        headers.forEach(header => {
+            const cellValue = row[header] !== undefined && row[header] !== null ? row[header] : 'N/A';
+            html += `<td>${escapeHtml(cellValue)}</td>`;
+        });
+
+        return html + '</tr>';
+    }
 });
\ No newline at end of file
@@ -0,0 +1,197 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const PAGE_SIZE = 50;
+    const startDateInput = document.getElementById('trash-start-date');
+    const endDateInput = document.getElementById('trash-end-date');
+    const filterButton = document.getElementById('trash-filter-btn');
+
+    // --- ROW MARKUP (same look as before, one builder per data type) ---
+    const escapeHtml = (value) => String(value ?? '').replace(/[&<>"']/g,
+        c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+
+    const timer = (item) => `
+        <span class="timer-display" data-deadline="${escapeHtml(item.delete_at)}" style="color: #ffca28; font-family: monospace; font-size: 1 em; margin: 0 20px; min-width: 150px; text-align: center;">
+            Läser in timer...
+        </span>`;
+
+    const rowBuilders = {
+        audio: (item) => `
+            <span style="white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">${escapeHtml(item.filename)}</span>
+            ${timer(item)}
+            <button data-id="${item.id}" class="insert-btn restore-btn" style="background: #28a745; width: 120px; padding: 8px 15px; flex-shrink: 0; margin-left: 20px;">Restore</button>`,
+        sensor: (item) => `
+            <span style="white-space: nowrap;">${escapeHtml(item.timestamp)} - Moisture: ${escapeHtml(item.moisture)}%</span>
+            ${timer(item)}
+            <button data-id="${item.sensor_id}" class="insert-btn restore-btn" style="background: #28a745; width: 120px; padding: 6px 10px; font-size: 0.85em; flex-shrink: 0;">Restore</button>`,
+        weather: (item) => `
+            <span style="white-space: nowrap;">${escapeHtml(item.timestamp)} - Temp: ${escapeHtml(item.out_temperature)}°C</span>
+            ${timer(item)}
+            <button data-id="${item.weather_id}" class="insert-btn restore-btn" style="background: #28a745; width: 120px; padding: 8px 15px; flex-shrink: 0; margin-left: 20px;">Restore</button>`
+    };
+
+    function filterParams() {
+        const params = new URLSearchParams();
+        if (startDateInput.value) params.append('start_date', startDateInput.value);
+        if (endDateInput.value) params.append('end_date', endDateInput.value);
+        return params;
+    }
+
+    // --- ONE SECTION PER DATA TYPE ---
+    const sections = Array.from(document.querySelectorAll('.trash-section')).map(el => ({
+        el,
+        type: el.dataset.type,
+        list: el.querySelector('.trash-list'),
+        count: el.querySelector('.trash-count'),
+        moreButton: el.querySelector('.trash-more-btn'),
+        restoreRangeButton: el.querySelector('.trash-restore-range-btn'),
+        offset: 0,
+        loading: false,
+        started: false
+    }));
+
+    async function loadPage(section) {
+        if (section.loading) return;
+        section.loading = true;
+        section.moreButton.disabled = true;
+
+        const params = filterParams();
+        params.append('limit', PAGE_SIZE);
+        params.append('offset', section.offset);
+
+        try {
+            const response = await fetch(`/api/v1/trash/${section.type}?${params.toString()}`);
+            const page = await response.json();
+            if (!response.ok) throw new Error(page.error || `Status: ${response.status}`);
+
+            if (section.offset === 0) section.list.innerHTML = '';
+            section.count.textContent = page.total;
+
+            page.items.forEach(item => {
+                const row = document.createElement('div');
+                row.className = 'trash-item';
+                row.style.cssText = 'display: flex; justify-content: space-between; align-items: center; padding: 15px 20px; border-bottom: 1px solid #444; gap: 130px; width: 100%; box-sizing: border-box;';
+                row.innerHTML = rowBuilders[section.type](item);
+                section.list.appendChild(row);
+            });
+            section.offset += page.items.length;
+
+            if (page.total === 0) {
+                section.list.innerHTML = `<p style="color: #888; padding-left: 10px;">${section.el.dataset.empty}</p>`;
+            }
+            section.moreButton.style.display = section.offset < page.total ? 'inline-block' : 'none';
+            section.restoreRangeButton.style.display =
+                page.total > 0 && (startDateInput.value || endDateInput.value) ? 'inline-block' : 'none';
+            updateTimers();
+        } catch (e) {
+            section.list.innerHTML = `<p style="color: #888; padding-left: 10px;">Error: ${escapeHtml(e.message)}</p>`;
+        } finally {
+            section.loading = false;
+            section.moreButton.disabled = false;
+        }
+    }
+
+    function reload(section) {
+        section.offset = 0;
+        loadPage(section);
+    }
+
+    // Sections only load once they scroll into view
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            const section = sections.find(s => s.el === entry.target);
+            if (entry.isIntersecting && section && !section.started) {
+                section.started = true;
+                loadPage(section);
+            }
+        });
+    });
+    sections.forEach(section => {
+        observer.observe(section.el);
+        section.moreButton.addEventListener('click', () => loadPage(section));
+        section.restoreRangeButton.addEventListener('click', () => restoreRange(section));
+        section.list.addEventListener('click', (e) => {
+            if (e.target.classList.contains('restore-btn')) {
+                restoreItems(section, [e.target.dataset.id]);
+            }
+        });
+    });
+
+    filterButton.addEventListener('click', () => {
+        sections.forEach(section => {
+            if (section.started) reload(section);
+        });
+    });
+
+    // --- RESTORE ---
+    async function restoreItems(section, ids) {
+        if (!confirm(`Restore these ${section.type} items?`)) return;
+
+        try {
+            const response = await fetch('/api/v1/restore', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ ids: ids, type: section.type })
+            });
+
+            if (response.ok) {
+                reload(section);
+            } else {
+                alert("Error restoring data.");
+            }
+        } catch (e) {
+            alert("Network error: " + e.message);
+        }
+    }
+
+    async function restoreRange(section) {
+        if (!confirm(`Restore ALL deleted ${section.type} items in the selected date range?`)) return;
+
+        const body = { type: section.type, start_date: startDateInput.value, end_date: endDateInput.value };
+        try {
+            const response = await fetch('/api/v1/restore/range', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+            const result = await response.json();
+
+            if (response.ok) {
+                alert(`${result.affected} items restored.`);
+                reload(section);
+            } else {
+                alert(`Error restoring data: ${result.error}`);
+            }
+        } catch (e) {
+            alert("Network error: " + e.message);
+        }
+    }
+
+    // --- COUNTDOWN TIMERS ---
+    function updateTimers() {
+        document.querySelectorAll('.timer-display').forEach(el => {
+            const deadlineStr = el.getAttribute('data-deadline');
+
+            // Om datum saknas
+            if (!deadlineStr || deadlineStr === "None" || deadlineStr === "null") {
+                el.innerHTML = "No delete date";
+                return;
+            }
+
+            const deadline = new Date(deadlineStr.replace(' ', 'T')).getTime();
+            const diff = deadline - new Date().getTime();
+
+            if (diff <= 0) {
+                el.innerHTML = "Will be deleted soon...";
+                return;
+            }
+
+            const days = Math.floor(diff / (1000 * 60 * 60 * 24));
+            const hours = Math.floor((diff % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
+            const minutes = Math.floor((diff % (1000 * 60 * 60)) / (1000 * 60));
+            const seconds = Math.floor((diff % (1000 * 60)) / 1000);
+
+            el.innerHTML = `${days}d ${hours}h ${minutes}m ${seconds}s left`;
+        });
+    }
+
+    setInterval(updateTimers, 1000);
+});
@@ -0,0 +1,235 @@
+# backend/storage.py
+"""
+Storage backends behind db.get_db_connection() / db_session().
+
+- MySQLBackend: PyMySQL against a MySQL server (DB_CONFIG). The default.
+- SQLiteBackend: an embedded SQLite file (SQLITE_PATH) in WAL mode, for single-board
+  deployments without a database server. The schema comes from
+  Database/sqlite_schema.sql and is applied on first connect.
+
+SQLite connections accept the SQL the rest of the app writes for MySQL: '%s'
+placeholders, NOW(), DATE_ADD(NOW(), INTERVAL n DAY) and '... FOR UPDATE' are translated
+once per distinct statement. Features that only exist on a MySQL server (partitions,
+information_schema, EXPLAIN, KILL QUERY, GET_LOCK) check 'backend.name' first.
+"""
+import fcntl
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from config import BASE_DIR, DB_BACKEND, DB_CONFIG, SQLITE_PATH
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(BASE_DIR), 'Database', 'sqlite_schema.sql')
+
+# Columns added to existing tables after the first schema: (table, column, definition)
+SQLITE_ADDED_COLUMNS = [
+    ('AUDIO_RECORDING', 'content_hash', 'TEXT NULL'),
+]
+
+# ======
+# MYSQL
+# ======
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def connect(self, dict_cursor=False, **options):
+        """'options' override DB_CONFIG, e.g. host and port of a read replica."""
+        import pymysql
+        from profiling import cursor_class  # tracing cursors when profiling is on
+        return pymysql.connect(**{**DB_CONFIG, **options}, cursorclass=cursor_class(dict_cursor))
+
+    def cancel(self, conn):
+        """Aborts the statement running on 'conn' with KILL QUERY from a second connection."""
+        killer = self.connect(host=conn.host, port=conn.port)  # same server, which may be a replica
+        try:
+            killer.cursor().execute("KILL QUERY %s", (conn.thread_id(),))
+        finally:
+            killer.close()
+
+    def try_lock(self, conn, name):
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+        return cursor.fetchone()[0] == 1
+
+    def unlock(self, conn, name):
+        conn.cursor().execute("SELECT RELEASE_LOCK(%s)", (name,))
+
+# =======
+# SQLITE
+# =======
+
+# MySQL-isms used by the app -> SQLite equivalents (datetimes are local-time text)
+_TRANSLATIONS = [
+    (re.compile(r"DATE_ADD\(\s*NOW\(\)\s*,\s*INTERVAL\s+(\d+)\s+DAY\s*\)", re.I), r"datetime('now', 'localtime', '+\1 days')"),
+    (re.compile(r"NOW\(\)", re.I), "datetime('now', 'localtime')"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), ""),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+]
+_translated = {}
+
+def _translate(query, has_args):
+    key = (query, has_args)
+    sql = _translated.get(key)
+    if sql is None:
+        sql = query
+        for pattern, replacement in _TRANSLATIONS:
+            sql = pattern.sub(replacement, sql)
+        if has_args:
+            # PyMySQL only interpolates (and un-escapes '%%') when arguments are given
+            sql = sql.replace('%s', '?').replace('%%', '%')
+        if len(_translated) > 2000:
+            _translated.clear()
+        _translated[key] = sql
+    return sql
+
+# Store datetimes the way MySQL prints them, so text comparisons keep working
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(' ', 'seconds'))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(Decimal, float)
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+class SQLiteCursor:
+    """The parts of the PyMySQL cursor API the app uses."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        if args is None:
+            self._cursor.execute(_translate(query, False))
+        else:
+            self._cursor.execute(_translate(query, True), tuple(args) if isinstance(args, list) else args)
+        return self._cursor.rowcount
+
+    def executemany(self, query, args):
+        self._cursor.executemany(_translate(query, True), args)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+class SQLiteConnection:
+    """The parts of the PyMySQL connection API the app uses."""
+
+    def __init__(self, raw):
+        self._conn = raw
+
+    def cursor(self):
+        return SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def interrupt(self):
+        self._conn.interrupt()
+
+class SQLiteBackend:
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._ready = False
+        self._lock = threading.Lock()
+        self._lock_files = {}
+
+    def _ensure_schema(self, raw):
+        with self._lock:
+            if self._ready:
+                return
+            # WAL: readers never block the writer and vice versa; the setting is persistent
+            raw.execute("PRAGMA journal_mode=WAL")
+            # Files created by an older schema get the columns added since (the script
+            # below only creates what is missing and may index the new columns)
+            for table, column, definition in SQLITE_ADDED_COLUMNS:
+                columns = [row[1] for row in raw.execute(f"PRAGMA table_info({table})")]
+                if columns and column not in columns:
+                    raw.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            with open(SQLITE_SCHEMA_FILE, encoding='utf-8') as f:
+                raw.executescript(f.read())
+            self._ready = True
+
+    def connect(self, dict_cursor=False):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        raw = sqlite3.connect(self.path, timeout=30, check_same_thread=False)  # pooled across threads
+        raw.execute("PRAGMA synchronous=NORMAL")  # durable at every WAL checkpoint, much faster commits
+        raw.execute("PRAGMA busy_timeout=30000")
+        if not self._ready:
+            self._ensure_schema(raw)
+        if dict_cursor:
+            raw.row_factory = _dict_row
+        return SQLiteConnection(raw)
+
+    def cancel(self, conn):
+        conn.interrupt()  # thread-safe, the running statement fails with 'interrupted'
+
+    def try_lock(self, conn, name):
+        """Advisory lock shared by all processes using the file (one lock file per name)."""
+        handle = open(f"{self.path}.{name}.lock", 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_files[name] = handle
+        return True
+
+    def unlock(self, conn, name):
+        handle = self._lock_files.pop(name, None)
+        if handle:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+# ================
+# ACTIVE BACKEND
+# ================
+
+BACKENDS = {'mysql': MySQLBackend, 'sqlite': SQLiteBackend}
+
+backend = BACKENDS[DB_BACKEND]()
+
+def set_backend(name, **options):
+    """Switches the backend at runtime (benchmarks, tools). Close pooled connections first."""
+    global backend
+    backend = BACKENDS[name](**options)
+    return backend
+
+def get_backend():
+    return backend
@@ -0,0 +1,53 @@
+# backend/tests/test_audio_features.py
+# Run from the Backend folder:  python -m pytest -q tests
+import os
+import struct
+import sys
+import tempfile
+import wave
+
+DATA_DIR = tempfile.mkdtemp()
+os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(DATA_DIR, 'weather.db'),
+                  AUDIO_STORE_DIR=os.path.join(DATA_DIR, 'store'),
+                  INGEST_SPOOL_DIR=os.path.join(DATA_DIR, 'spool'), PURGE_INTERVAL='0', HOT_WINDOW_HOURS='0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app import app
+from audio_features import decode_track, extract_recording_features, load_feature_tracks
+from audio_store import save_upload
+from db import insert_audio_data
+
+def _upload_wav(name, frames, rate, start):
+    path = os.path.join(DATA_DIR, name)
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(struct.pack(f'<{frames}h', *([1000] * frames)))
+    with open(path, 'rb') as f:
+        temp_path, content_hash, size = save_upload(f, name)
+    ok, audio_id = insert_audio_data({'start_timestamp': start, 'end_timestamp': start + frames // rate,
+                                      'filepath': name, 'content_hash': content_hash, 'ext': '.wav',
+                                      'size': size, 'source_path': temp_path})
+    assert ok, audio_id
+    return audio_id
+
+def test_empty_track_decodes_to_no_rows():
+    assert decode_track(b'', 0, 4).shape == (0, 4)
+
+def test_sub_second_recording_has_no_track():
+    start = 1704067200
+    short_id = _upload_wav('short.wav', 4000, 8000, start)
+    long_id = _upload_wav('long.wav', 16000, 8000, start + 10)
+
+    assert not extract_recording_features(short_id)
+    assert load_feature_tracks(short_id) == []
+    assert extract_recording_features(long_id)
+
+    client = app.test_client()
+    assert client.get(f'/api/v1/audio/features?audio_id={short_id}').status_code == 404
+    response = client.get('/api/v1/audio/features?start_date=2023-12-31&end_date=2024-01-02')
+    assert response.status_code == 200
+    assert {row['audio_id'] for row in response.get_json()['rows']} == {long_id}
+    assert np.isfinite([row['rms_db'] for row in response.get_json()['rows']]).all()
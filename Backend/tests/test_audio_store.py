@@ -0,0 +1,42 @@
+# backend/tests/test_audio_store.py
+# Run from the Backend folder:  python -m pytest -q tests
+import io
+import os
+import sys
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp()
+os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(DATA_DIR, 'weather.db'),
+                  AUDIO_STORE_DIR=os.path.join(DATA_DIR, 'store'),
+                  INGEST_SPOOL_DIR=os.path.join(DATA_DIR, 'spool'), PURGE_INTERVAL='0', HOT_WINDOW_HOURS='0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: F401  (creates the schema)
+import db
+from audio_store import blob_path, save_upload
+
+def _metadata(content, name, start):
+    temp_path, content_hash, size = save_upload(io.BytesIO(content), name)
+    return {'start_timestamp': start, 'end_timestamp': start + 60, 'filepath': name,
+            'content_hash': content_hash, 'ext': '.wav', 'size': size, 'source_path': temp_path}
+
+def test_failed_insert_leaves_no_stored_file(monkeypatch):
+    def fail(*args):
+        raise RuntimeError("summary failed")
+
+    metadata = _metadata(b'RIFF new content', 'failed.wav', 1704067200)
+    monkeypatch.setattr(db, 'summarize_recording', fail)
+    ok, message = db.insert_audio_data(metadata)
+    assert not ok and 'summary failed' in message
+    assert not os.path.exists(blob_path(metadata['content_hash'], '.wav'))
+
+def test_failed_insert_keeps_a_file_already_stored(monkeypatch):
+    stored = _metadata(b'RIFF shared content', 'first.wav', 1704070800)
+    assert db.insert_audio_data(stored)[0]
+
+    def fail(*args):
+        raise RuntimeError("summary failed")
+
+    monkeypatch.setattr(db, 'summarize_recording', fail)
+    assert not db.insert_audio_data(_metadata(b'RIFF shared content', 'second.wav', 1704074400))[0]
+    assert os.path.exists(blob_path(stored['content_hash'], '.wav'))
@@ -0,0 +1,39 @@
+# backend/tests/test_events.py
+# Run from the Backend folder:  python -m pytest -q tests
+import os
+import sys
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp()
+os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(DATA_DIR, 'weather.db'),
+                  AUDIO_STORE_DIR=os.path.join(DATA_DIR, 'store'),
+                  INGEST_SPOOL_DIR=os.path.join(DATA_DIR, 'spool'), PURGE_INTERVAL='0', HOT_WINDOW_HOURS='0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: F401  (creates the schema)
+from db import db_session
+from events import EventPublisher
+
+def _insert_sensor(sensor_id, timestamp):
+    with db_session() as conn:
+        conn.cursor().execute("INSERT INTO SENSOR_DATA (sensor_id, `timestamp`, moisture) VALUES (%s, %s, %s)",
+                              (sensor_id, timestamp, 40.0))
+        conn.commit()
+
+def _published_ids(publisher):
+    return [row['sensor_id'] for rows in publisher._fetch_new_rows('sensor') for row in rows]
+
+def test_rows_committed_below_the_last_id_are_published_once():
+    publisher = EventPublisher(poll_interval=3600)  # the test does the looking
+    subscription = publisher.subscribe(['sensor'])
+    try:
+        _insert_sensor(1010, '2024-01-01 00:10:00')
+        assert _published_ids(publisher) == [1010]
+
+        # A transaction that took its id earlier commits after 1010 was published
+        _insert_sensor(1005, '2024-01-01 00:05:00')
+        _insert_sensor(1011, '2024-01-01 00:11:00')
+        assert _published_ids(publisher) == [1005, 1011]
+        assert _published_ids(publisher) == []
+    finally:
+        publisher.unsubscribe(subscription)
@@ -0,0 +1,41 @@
+# backend/tests/test_hot_window.py
+# Run from the Backend folder:  python -m pytest -q tests
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+DATA_DIR = tempfile.mkdtemp()
+os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(DATA_DIR, 'weather.db'),
+                  AUDIO_STORE_DIR=os.path.join(DATA_DIR, 'store'),
+                  INGEST_SPOOL_DIR=os.path.join(DATA_DIR, 'spool'), PURGE_INTERVAL='0', HOT_WINDOW_HOURS='0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: F401  (creates the schema)
+from cache import bump_data_version
+from db import db_session
+from hot_window import HotWindow
+
+def _insert_sensor(sensor_id, minutes_ago):
+    timestamp = (datetime.now() - timedelta(minutes=minutes_ago)).strftime('%Y-%m-%d %H:%M:%S')
+    with db_session() as conn:
+        conn.cursor().execute("INSERT INTO SENSOR_DATA (sensor_id, `timestamp`, moisture) VALUES (%s, %s, %s)",
+                              (sensor_id, timestamp, 40.0))
+        conn.commit()
+    bump_data_version('SENSOR_DATA', appended=True)
+
+def test_rows_committed_below_the_last_id_are_caught_up_once():
+    window = HotWindow('SENSOR_DATA', 'sensor_id', [('moisture', 'Moisture', 'float')], hours=72,
+                       max_bytes=1024 * 1024)
+    since = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')  # inside the window
+    _insert_sensor(2010, 10)
+    window.reload()
+    assert [row['sensor_id'] for row in window.query(since)] == [2010]
+
+    # A transaction that took its id earlier commits after 2010 was read
+    _insert_sensor(2005, 5)
+    _insert_sensor(2011, 1)
+    assert [row['sensor_id'] for row in window.query(since)] == [2011, 2005, 2010]
+
+    _insert_sensor(2012, 0)
+    assert [row['sensor_id'] for row in window.query(since)] == [2012, 2011, 2005, 2010]
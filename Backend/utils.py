@@ -15,6 +15,13 @@ def format_timestamp(unix_ts):
         'time':         dt.strftime('%H:%M:%S')           
     }
 
+# Helper to ensure time is HH:MM:SS ('10:00' becomes 10:00:00 as a start, 10:00:59 as an end)
+def fix_time(t, default):
+    if not t or not t.strip(): return default
+    t = t.strip().rstrip(':') # Remove any trailing colons
+    if len(t) == 5: return f"{t}:00" if default == "00:00:00" else f"{t}:59"
+    return t
+
 def timestamp_filter(start_date, end_date, start_time, end_time, timestamp_col='`timestamp`' ):
     """
     Centralized logic to build SQL conditions and parameters for date/time filtering.
@@ -22,13 +29,6 @@ def timestamp_filter(start_date, end_date, start_time, end_time, timestamp_col='
     conditions = []
     params = []
 
-    # Helper to ensure time is HH:MM:SS
-    def fix_time(t, default):
-        if not t or not t.strip(): return default
-        t = t.strip().rstrip(':') # Remove any trailing colons
-        if len(t) == 5: return f"{t}:00" if default == "00:00:00" else f"{t}:59"
-        return t
-
     # 1. Start Filter
     if start_date:
         full_start = f"{start_date} {fix_time(start_time, '00:00:00')}"
@@ -0,0 +1,4 @@
+# backend/wsgi.py
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# app.py already builds the app with create_app() at import time.
+from app import app
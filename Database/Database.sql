@@ -12,15 +12,31 @@ CREATE TABLE AUDIO_RECORDING (
     date DATE,
     start_time DATETIME NOT NULL,
     end_time DATETIME NOT NULL,
-    file_path VARCHAR(255) NOT NULL UNIQUE, -- New code: file_path must be UNIQUE so we can 'REPLACE' if the file is re-uploaded
+    file_path VARCHAR(255) NOT NULL UNIQUE, -- Logical name (the uploaded filename); UNIQUE so a re-upload replaces the row
+    content_hash CHAR(64) NULL, -- SHA-256 of the file in the audio store (AUDIO_BLOB), see Backend/audio_store.py
     is_deleted TINYINT(1) DEFAULT 0, -- Order of operations
-    delete_at DATETIME DEFAULT NULL -- Timer for 14 days
+    delete_at DATETIME DEFAULT NULL, -- Timer for 14 days
+    INDEX idx_audio_trash (is_deleted, delete_at), -- Trash page and purge
+    INDEX idx_audio_listing (is_deleted, start_time), -- Paginated audio list (file_path is indexed by UNIQUE)
+    INDEX idx_audio_content (content_hash)
+);
+
+-- Stored audio files, one per distinct content (objects/ab/cd/<content_hash><ext>).
+-- ref_count = recordings using the file; changed in the same transaction as those rows.
+CREATE TABLE AUDIO_BLOB (
+    content_hash CHAR(64) PRIMARY KEY,
+    ext VARCHAR(10) NOT NULL,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Weather table
+-- Partitioned by month on timestamp (see Backend/partitions.py). MySQL needs the partition
+-- column in every unique key, so the primary key is (weather_id, timestamp).
 CREATE TABLE WEATHER_DATA (
-    weather_id INT AUTO_INCREMENT PRIMARY KEY,
-    timestamp DATETIME NOT NULL UNIQUE, -- New: idtenifies a duplicate row.
+    weather_id INT AUTO_INCREMENT,
+    timestamp DATETIME NOT NULL,
     date DATE,
     time TIME,
     in_temperature DOUBLE,
@@ -32,39 +48,115 @@ CREATE TABLE WEATHER_DATA (
     daily_rain DOUBLE,
     rain_rate DOUBLE,
     is_deleted TINYINT(1) DEFAULT 0, -- Order of operations
-    delete_at DATETIME DEFAULT NULL -- Timer for 14 days
+    delete_at DATETIME DEFAULT NULL, -- Timer for 14 days
+    PRIMARY KEY (weather_id, timestamp),
+    UNIQUE KEY uq_weather_timestamp (timestamp), -- New: idtenifies a duplicate row.
+    INDEX idx_weather_trash (is_deleted, delete_at) -- Trash page and purge
+)
+PARTITION BY RANGE (TO_DAYS(timestamp)) (
+    -- Monthly partitions are added by 'python partitions.py maintain'
+    PARTITION p_start VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 
 CREATE TABLE SENSOR_DATA (
-    sensor_id INT AUTO_INCREMENT PRIMARY KEY,
-    timestamp DATETIME NOT NULL UNIQUE, -- Uniquie Contraint
+    sensor_id INT AUTO_INCREMENT,
+    timestamp DATETIME NOT NULL,
     date DATE,
     time TIME,
     moisture DOUBLE,
     is_deleted TINYINT(1) DEFAULT 0, -- Order of operations
-    delete_at DATETIME DEFAULT NULL -- Timer for 14 days
+    delete_at DATETIME DEFAULT NULL, -- Timer for 14 days
+    PRIMARY KEY (sensor_id, timestamp),
+    UNIQUE KEY uq_sensor_timestamp (timestamp), -- Uniquie Contraint
+    INDEX idx_sensor_trash (is_deleted, delete_at) -- Trash page and purge
+)
+PARTITION BY RANGE (TO_DAYS(timestamp)) (
+    PARTITION p_start VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 
+-- Partitioned tables cannot take part in foreign keys, so the links below are kept
+-- consistent by the application (sync_all_data, partition drops and the purge).
 CREATE TABLE ALL_DATA (
     all_data_id INT AUTO_INCREMENT PRIMARY KEY,
     timestamp DATETIME NOT NULL UNIQUE, -- -- NEW: UNIQUE here too
     -- Changed to NULL to allow sensor data to be inserted without weather data
     weather_data_id INT NULL, 
-    CONSTRAINT fk_weather
-        FOREIGN KEY (weather_data_id)
-        REFERENCES WEATHER_DATA(weather_id), -- -- NEW: Allows replacement without error
     -- Changed to NULL to allow weather data to be inserted without sensor data
     sensor_data_id INT NULL,
-    CONSTRAINT fk_sensor
-        FOREIGN KEY (sensor_data_id)
-        REFERENCES SENSOR_DATA(sensor_id)
-        ON DELETE SET NULL
+    INDEX idx_all_data_weather (weather_data_id),
+    INDEX idx_all_data_sensor (sensor_data_id)
+);
+
+-- Weather and sensor conditions during each recording (min/max/avg per metric, number of
+-- readings and coverage). Written when a recording is uploaded and updated in the same
+-- transaction as every write to the measurements it overlaps (see db.py), so recordings
+-- can be searched by conditions through the indexes below (/api/v1/audio/search).
+CREATE TABLE AUDIO_ENV_SUMMARY (
+    audio_id INT PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    duration INT NOT NULL, -- seconds; the longest recording bounds the overlap lookup
+    sensor_samples INT NOT NULL DEFAULT 0,
+    sensor_coverage DOUBLE NOT NULL DEFAULT 0, -- share of the recording's minutes with a reading
+    weather_samples INT NOT NULL DEFAULT 0,
+    weather_coverage DOUBLE NOT NULL DEFAULT 0,
+    moisture_min DOUBLE, moisture_max DOUBLE, moisture_avg DOUBLE,
+    in_temperature_min DOUBLE, in_temperature_max DOUBLE, in_temperature_avg DOUBLE,
+    out_temperature_min DOUBLE, out_temperature_max DOUBLE, out_temperature_avg DOUBLE,
+    in_humidity_min DOUBLE, in_humidity_max DOUBLE, in_humidity_avg DOUBLE,
+    out_humidity_min DOUBLE, out_humidity_max DOUBLE, out_humidity_avg DOUBLE,
+    wind_speed_min DOUBLE, wind_speed_max DOUBLE, wind_speed_avg DOUBLE,
+    daily_rain_min DOUBLE, daily_rain_max DOUBLE, daily_rain_avg DOUBLE,
+    rain_rate_min DOUBLE, rain_rate_max DOUBLE, rain_rate_avg DOUBLE,
+    INDEX idx_summary_start (start_time, end_time),
+    INDEX idx_summary_duration (duration),
+    INDEX idx_summary_moisture_max (moisture_max),
+    INDEX idx_summary_moisture_avg (moisture_avg),
+    INDEX idx_summary_in_temperature_max (in_temperature_max),
+    INDEX idx_summary_in_temperature_avg (in_temperature_avg),
+    INDEX idx_summary_out_temperature_max (out_temperature_max),
+    INDEX idx_summary_out_temperature_avg (out_temperature_avg),
+    INDEX idx_summary_in_humidity_max (in_humidity_max),
+    INDEX idx_summary_in_humidity_avg (in_humidity_avg),
+    INDEX idx_summary_out_humidity_max (out_humidity_max),
+    INDEX idx_summary_out_humidity_avg (out_humidity_avg),
+    INDEX idx_summary_wind_speed_max (wind_speed_max),
+    INDEX idx_summary_wind_speed_avg (wind_speed_avg),
+    INDEX idx_summary_daily_rain_max (daily_rain_max),
+    INDEX idx_summary_daily_rain_avg (daily_rain_avg),
+    INDEX idx_summary_rain_rate_max (rain_rate_max),
+    INDEX idx_summary_rain_rate_avg (rain_rate_avg)
 );
 
-ALTER TABLE ALL_DATA DROP FOREIGN KEY fk_weather;
-ALTER TABLE ALL_DATA ADD CONSTRAINT fk_weather 
-    FOREIGN KEY (weather_data_id) REFERENCES WEATHER_DATA(weather_id) 
-    ON DELETE CASCADE;
+-- Per-second audio features of a recording (Backend/audio_features.py): 'data' holds
+-- float16 rows (rms_db, peak_db, one energy per band) for start_time, start_time + 1s, ...
+CREATE TABLE AUDIO_FEATURES (
+    audio_id INT PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL, -- start_time + seconds
+    seconds INT NOT NULL,
+    sample_rate INT NOT NULL,
+    bands VARCHAR(255) NOT NULL, -- band edges in Hz, e.g. '0,250,1000,4000'
+    data MEDIUMBLOB NOT NULL,
+    INDEX idx_features_time (start_time, end_time)
+);
+
+-- Hourly histogram sketch of one measurement column (Backend/sketches.py): exact count,
+-- min, max and sum plus the non-empty bins of a fixed-bin histogram ('counts': uint16 bin
+-- numbers, then their uint32 counts). Rebuilt with every write to the measurements.
+CREATE TABLE MEASUREMENT_SKETCH (
+    series VARCHAR(32) NOT NULL, -- column, e.g. 'out_temperature'
+    bucket DATETIME NOT NULL, -- start of the hour
+    samples INT NOT NULL,
+    min_value DOUBLE NOT NULL,
+    max_value DOUBLE NOT NULL,
+    sum_value DOUBLE NOT NULL,
+    bins VARCHAR(64) NOT NULL, -- 'lowest,highest,width' the histogram was made with
+    counts BLOB NOT NULL,
+    PRIMARY KEY (series, bucket)
+);
 
 -- This creates a shortcut to see all deleted entries
 CREATE VIEW DELETED_WEATHER AS
@@ -112,27 +204,8 @@ FROM AUDIO_RECORDING
 WHERE is_deleted = 0 
 ORDER BY start_time DESC;
 
-DELIMITER //
-CREATE PROCEDURE DELETE_EXPIRED_DATA()
-BEGIN
-
-    DELETE FROM audio_recording
-    WHERE is_deleted = 1 
-    AND delete_at <= NOW();
-
-    DELETE FROM weather_data
-    WHERE is_deleted = 1 
-    AND delete_at <= NOW();
-
-    DELETE FROM sensor_data
-    WHERE is_deleted = 1 
-    AND delete_at <= NOW();
-END //
-DELIMITER ;
-DROP EVENT cleanup_crew
-
-CREATE EVENT cleanup_crew
-ON SCHEDULE EVERY 1 HOUR
-STARTS (CURRENT_DATE + INTERVAL HOUR(NOW()) + 1 HOUR)
-DO
-    CALL DELETE_EXPIRED_DATA();
\ No newline at end of file
+-- Expired soft deleted rows are purged by Backend/purge.py (chunked, keeps ALL_DATA
+-- consistent and removes the audio files). On an existing database, remove the old
+-- hourly event so the two don't race:
+DROP EVENT IF EXISTS cleanup_crew;
+DROP PROCEDURE IF EXISTS DELETE_EXPIRED_DATA;
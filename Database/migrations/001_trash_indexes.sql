@@ -0,0 +1,7 @@
+-- Indexes for the paginated trash page (and the purge worker) on existing databases.
+-- Fresh databases created from Database.sql already have them.
+USE WEATHER_DB;
+
+CREATE INDEX idx_audio_trash ON AUDIO_RECORDING (is_deleted, delete_at);
+CREATE INDEX idx_weather_trash ON WEATHER_DATA (is_deleted, delete_at);
+CREATE INDEX idx_sensor_trash ON SENSOR_DATA (is_deleted, delete_at);
@@ -0,0 +1,6 @@
+-- Index for the paginated audio list (/api/v1/audio) on existing databases.
+-- file_path already has an index through its UNIQUE constraint, which serves the
+-- filename prefix search.
+USE WEATHER_DB;
+
+CREATE INDEX idx_audio_listing ON AUDIO_RECORDING (is_deleted, start_time);
@@ -0,0 +1,40 @@
+-- Per-recording environmental summaries (/api/v1/audio/search) on existing databases.
+-- Existing recordings are summarized when the app starts (db.summarize_missing_recordings).
+USE WEATHER_DB;
+
+CREATE TABLE AUDIO_ENV_SUMMARY (
+    audio_id INT PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    duration INT NOT NULL, -- seconds; the longest recording bounds the overlap lookup
+    sensor_samples INT NOT NULL DEFAULT 0,
+    sensor_coverage DOUBLE NOT NULL DEFAULT 0, -- share of the recording's minutes with a reading
+    weather_samples INT NOT NULL DEFAULT 0,
+    weather_coverage DOUBLE NOT NULL DEFAULT 0,
+    moisture_min DOUBLE, moisture_max DOUBLE, moisture_avg DOUBLE,
+    in_temperature_min DOUBLE, in_temperature_max DOUBLE, in_temperature_avg DOUBLE,
+    out_temperature_min DOUBLE, out_temperature_max DOUBLE, out_temperature_avg DOUBLE,
+    in_humidity_min DOUBLE, in_humidity_max DOUBLE, in_humidity_avg DOUBLE,
+    out_humidity_min DOUBLE, out_humidity_max DOUBLE, out_humidity_avg DOUBLE,
+    wind_speed_min DOUBLE, wind_speed_max DOUBLE, wind_speed_avg DOUBLE,
+    daily_rain_min DOUBLE, daily_rain_max DOUBLE, daily_rain_avg DOUBLE,
+    rain_rate_min DOUBLE, rain_rate_max DOUBLE, rain_rate_avg DOUBLE,
+    INDEX idx_summary_start (start_time, end_time),
+    INDEX idx_summary_duration (duration),
+    INDEX idx_summary_moisture_max (moisture_max),
+    INDEX idx_summary_moisture_avg (moisture_avg),
+    INDEX idx_summary_in_temperature_max (in_temperature_max),
+    INDEX idx_summary_in_temperature_avg (in_temperature_avg),
+    INDEX idx_summary_out_temperature_max (out_temperature_max),
+    INDEX idx_summary_out_temperature_avg (out_temperature_avg),
+    INDEX idx_summary_in_humidity_max (in_humidity_max),
+    INDEX idx_summary_in_humidity_avg (in_humidity_avg),
+    INDEX idx_summary_out_humidity_max (out_humidity_max),
+    INDEX idx_summary_out_humidity_avg (out_humidity_avg),
+    INDEX idx_summary_wind_speed_max (wind_speed_max),
+    INDEX idx_summary_wind_speed_avg (wind_speed_avg),
+    INDEX idx_summary_daily_rain_max (daily_rain_max),
+    INDEX idx_summary_daily_rain_avg (daily_rain_avg),
+    INDEX idx_summary_rain_rate_max (rain_rate_max),
+    INDEX idx_summary_rain_rate_avg (rain_rate_avg)
+);
@@ -0,0 +1,15 @@
+-- Content-addressed audio storage (Backend/audio_store.py) on existing databases.
+-- Afterwards move the existing files into the store: python audio_store.py migrate
+USE WEATHER_DB;
+
+ALTER TABLE AUDIO_RECORDING
+    ADD COLUMN content_hash CHAR(64) NULL AFTER file_path,
+    ADD INDEX idx_audio_content (content_hash);
+
+CREATE TABLE AUDIO_BLOB (
+    content_hash CHAR(64) PRIMARY KEY,
+    ext VARCHAR(10) NOT NULL,
+    size BIGINT NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,16 @@
+-- Per-second audio features (/api/v1/audio/features) on existing databases.
+-- Afterwards analyse the existing recordings: python audio_features.py backfill
+USE WEATHER_DB;
+
+-- Per-second audio features of a recording (Backend/audio_features.py): 'data' holds
+-- float16 rows (rms_db, peak_db, one energy per band) for start_time, start_time + 1s, ...
+CREATE TABLE AUDIO_FEATURES (
+    audio_id INT PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL, -- start_time + seconds
+    seconds INT NOT NULL,
+    sample_rate INT NOT NULL,
+    bands VARCHAR(255) NOT NULL, -- band edges in Hz, e.g. '0,250,1000,4000'
+    data MEDIUMBLOB NOT NULL,
+    INDEX idx_features_time (start_time, end_time)
+);
@@ -0,0 +1,18 @@
+-- Hourly histogram sketches (/api/v1/statistics) on existing databases.
+-- Afterwards sketch the existing readings: python sketches.py backfill
+USE WEATHER_DB;
+
+-- Hourly histogram sketch of one measurement column (Backend/sketches.py): exact count,
+-- min, max and sum plus the non-empty bins of a fixed-bin histogram ('counts': uint16 bin
+-- numbers, then their uint32 counts). Rebuilt with every write to the measurements.
+CREATE TABLE MEASUREMENT_SKETCH (
+    series VARCHAR(32) NOT NULL, -- column, e.g. 'out_temperature'
+    bucket DATETIME NOT NULL, -- start of the hour
+    samples INT NOT NULL,
+    min_value DOUBLE NOT NULL,
+    max_value DOUBLE NOT NULL,
+    sum_value DOUBLE NOT NULL,
+    bins VARCHAR(64) NOT NULL, -- 'lowest,highest,width' the histogram was made with
+    counts BLOB NOT NULL,
+    PRIMARY KEY (series, bucket)
+);
@@ -0,0 +1,26 @@
+#!/bin/bash
+# Runs once when the db-replica container is initialised (docker-compose.replica.yml):
+# copies the primary 'db' and starts replicating from it.
+set -e
+
+until mysqladmin ping -h db -uroot -p"$MYSQL_ROOT_PASSWORD" --silent; do
+    echo "Waiting for the primary..."
+    sleep 2
+done
+
+# The dump carries the primary's GTID set, which needs an empty one here
+mysql -uroot -p"$MYSQL_ROOT_PASSWORD" -e "RESET MASTER"
+mysqldump -h db -uroot -p"$MYSQL_ROOT_PASSWORD" --databases "$MYSQL_DATABASE" \
+    --single-transaction --set-gtid-purged=ON --routines --triggers --events \
+    | mysql -uroot -p"$MYSQL_ROOT_PASSWORD"
+
+mysql -uroot -p"$MYSQL_ROOT_PASSWORD" <<SQL
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'db',
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = '$MYSQL_ROOT_PASSWORD',
+    SOURCE_AUTO_POSITION = 1,
+    SOURCE_CONNECT_RETRY = 5,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;
+SQL
@@ -0,0 +1,140 @@
+-- Embedded (SQLite) version of Database.sql, used when DB_BACKEND=sqlite.
+-- Applied automatically by Backend/storage.py on first connect; safe to run again.
+-- Same tables, columns and indexes as the MySQL schema, without the partitioning
+-- (a single file has nothing to prune). Datetimes are stored as 'YYYY-MM-DD HH:MM:SS' text,
+-- which sorts and compares like the MySQL DATETIME columns.
+
+CREATE TABLE IF NOT EXISTS AUDIO_RECORDING (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    file_path TEXT NOT NULL UNIQUE, -- logical name; UNIQUE so a re-upload replaces the row
+    content_hash TEXT NULL, -- file in the audio store (AUDIO_BLOB)
+    is_deleted INTEGER DEFAULT 0,
+    delete_at TEXT DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audio_trash ON AUDIO_RECORDING (is_deleted, delete_at);
+CREATE INDEX IF NOT EXISTS idx_audio_listing ON AUDIO_RECORDING (is_deleted, start_time);
+CREATE INDEX IF NOT EXISTS idx_audio_content ON AUDIO_RECORDING (content_hash);
+
+CREATE TABLE IF NOT EXISTS AUDIO_BLOB (
+    content_hash TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS WEATHER_DATA (
+    weather_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    date TEXT,
+    time TEXT,
+    in_temperature REAL,
+    out_temperature REAL,
+    in_humidity INTEGER,
+    out_humidity INTEGER,
+    wind_speed REAL,
+    wind_direction TEXT,
+    daily_rain REAL,
+    rain_rate REAL,
+    is_deleted INTEGER DEFAULT 0,
+    delete_at TEXT DEFAULT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_weather_timestamp ON WEATHER_DATA (timestamp);
+CREATE INDEX IF NOT EXISTS idx_weather_trash ON WEATHER_DATA (is_deleted, delete_at);
+
+CREATE TABLE IF NOT EXISTS SENSOR_DATA (
+    sensor_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    date TEXT,
+    time TEXT,
+    moisture REAL,
+    is_deleted INTEGER DEFAULT 0,
+    delete_at TEXT DEFAULT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sensor_timestamp ON SENSOR_DATA (timestamp);
+CREATE INDEX IF NOT EXISTS idx_sensor_trash ON SENSOR_DATA (is_deleted, delete_at);
+
+-- Links are kept consistent by the application, as in the MySQL schema
+CREATE TABLE IF NOT EXISTS ALL_DATA (
+    all_data_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL UNIQUE,
+    weather_data_id INTEGER NULL,
+    sensor_data_id INTEGER NULL
+);
+CREATE INDEX IF NOT EXISTS idx_all_data_weather ON ALL_DATA (weather_data_id);
+CREATE INDEX IF NOT EXISTS idx_all_data_sensor ON ALL_DATA (sensor_data_id);
+
+-- Conditions during each recording, see Database.sql
+CREATE TABLE IF NOT EXISTS AUDIO_ENV_SUMMARY (
+    audio_id INTEGER PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    duration INTEGER NOT NULL, -- seconds; the longest recording bounds the overlap lookup
+    sensor_samples INTEGER NOT NULL DEFAULT 0,
+    sensor_coverage REAL NOT NULL DEFAULT 0, -- share of the recording's minutes with a reading
+    weather_samples INTEGER NOT NULL DEFAULT 0,
+    weather_coverage REAL NOT NULL DEFAULT 0,
+    moisture_min REAL, moisture_max REAL, moisture_avg REAL,
+    in_temperature_min REAL, in_temperature_max REAL, in_temperature_avg REAL,
+    out_temperature_min REAL, out_temperature_max REAL, out_temperature_avg REAL,
+    in_humidity_min REAL, in_humidity_max REAL, in_humidity_avg REAL,
+    out_humidity_min REAL, out_humidity_max REAL, out_humidity_avg REAL,
+    wind_speed_min REAL, wind_speed_max REAL, wind_speed_avg REAL,
+    daily_rain_min REAL, daily_rain_max REAL, daily_rain_avg REAL,
+    rain_rate_min REAL, rain_rate_max REAL, rain_rate_avg REAL
+);
+CREATE INDEX IF NOT EXISTS idx_summary_start ON AUDIO_ENV_SUMMARY (start_time, end_time);
+CREATE INDEX IF NOT EXISTS idx_summary_duration ON AUDIO_ENV_SUMMARY (duration);
+CREATE INDEX IF NOT EXISTS idx_summary_moisture_max ON AUDIO_ENV_SUMMARY (moisture_max);
+CREATE INDEX IF NOT EXISTS idx_summary_moisture_avg ON AUDIO_ENV_SUMMARY (moisture_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_in_temperature_max ON AUDIO_ENV_SUMMARY (in_temperature_max);
+CREATE INDEX IF NOT EXISTS idx_summary_in_temperature_avg ON AUDIO_ENV_SUMMARY (in_temperature_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_out_temperature_max ON AUDIO_ENV_SUMMARY (out_temperature_max);
+CREATE INDEX IF NOT EXISTS idx_summary_out_temperature_avg ON AUDIO_ENV_SUMMARY (out_temperature_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_in_humidity_max ON AUDIO_ENV_SUMMARY (in_humidity_max);
+CREATE INDEX IF NOT EXISTS idx_summary_in_humidity_avg ON AUDIO_ENV_SUMMARY (in_humidity_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_out_humidity_max ON AUDIO_ENV_SUMMARY (out_humidity_max);
+CREATE INDEX IF NOT EXISTS idx_summary_out_humidity_avg ON AUDIO_ENV_SUMMARY (out_humidity_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_wind_speed_max ON AUDIO_ENV_SUMMARY (wind_speed_max);
+CREATE INDEX IF NOT EXISTS idx_summary_wind_speed_avg ON AUDIO_ENV_SUMMARY (wind_speed_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_daily_rain_max ON AUDIO_ENV_SUMMARY (daily_rain_max);
+CREATE INDEX IF NOT EXISTS idx_summary_daily_rain_avg ON AUDIO_ENV_SUMMARY (daily_rain_avg);
+CREATE INDEX IF NOT EXISTS idx_summary_rain_rate_max ON AUDIO_ENV_SUMMARY (rain_rate_max);
+CREATE INDEX IF NOT EXISTS idx_summary_rain_rate_avg ON AUDIO_ENV_SUMMARY (rain_rate_avg);
+
+-- Per-second audio features of a recording (Backend/audio_features.py)
+CREATE TABLE IF NOT EXISTS AUDIO_FEATURES (
+    audio_id INTEGER PRIMARY KEY, -- AUDIO_RECORDING.id
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    bands TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_features_time ON AUDIO_FEATURES (start_time, end_time);
+
+-- Hourly histogram sketch of one measurement column (Backend/sketches.py)
+CREATE TABLE IF NOT EXISTS MEASUREMENT_SKETCH (
+    series TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    min_value REAL NOT NULL,
+    max_value REAL NOT NULL,
+    sum_value REAL NOT NULL,
+    bins TEXT NOT NULL,
+    counts BLOB NOT NULL,
+    PRIMARY KEY (series, bucket)
+);
+
+CREATE VIEW IF NOT EXISTS DELETED_WEATHER AS
+SELECT * FROM WEATHER_DATA WHERE is_deleted = 1;
+
+CREATE VIEW IF NOT EXISTS DELETED_SENSOR AS
+SELECT * FROM SENSOR_DATA WHERE is_deleted = 1;
+
+CREATE VIEW IF NOT EXISTS DELETED_AUDIO AS
+SELECT * FROM AUDIO_RECORDING WHERE is_deleted = 1;
@@ -0,0 +1,358 @@
+"""
+Fast, non-interactive mock data generator for scale testing.
+
+Rows are generated in NumPy blocks and formatted to CSV without a per-row Python loop:
+every column is rendered into a fixed-width byte matrix and padding bytes are dropped with
+a mask, which reaches millions of rows per second. Output uses the same headers and ';'
+delimiter as mock_sensor_data.py / mock_weather_data.py, so the files can be uploaded as
+they are. A name ending in .gz is gzipped, '-' writes to stdout.
+
+Examples:
+    python generate_mock_data.py sensor --rows 100000000 -o sensor.csv.gz
+    python generate_mock_data.py weather --start 2025-01-01 --end 2025-12-31 --interval 60 \\
+        --gap-rate 0.5 --duplicate-rate 0.001 --out-of-order-rate 0.001 -o weather.csv
+    python generate_mock_data.py audio --start 2025-03-03 --count 24 --duration 600 -o Backend/audio_files
+
+Realistic defects (all off by default):
+    --jitter            +/- seconds added to every timestamp
+    --gap-rate          outages per day, lasting --gap-minutes on average (exponential)
+    --duplicate-rate    fraction of rows sent twice
+    --out-of-order-rate fraction of rows swapped with a row up to --out-of-order-window later
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+
+SENSOR_HEADERS = ['moisture', 'timestamp']
+WEATHER_HEADERS = [
+    'timestamp', 'in_temperature', 'out_temperature', 'in_humidity',
+    'out_humidity', 'wind_speed', 'wind_direction', 'daily_rain', 'rain_rate'
+]
+WIND_DIRECTIONS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+WIND_WEIGHTS = [0.10, 0.06, 0.05, 0.07, 0.12, 0.25, 0.22, 0.13]  # prevailing south-west
+
+DAY = 86400
+ZERO, SEP, NEWLINE, DOT, MINUS = (ord(c) for c in '0;\n.-')
+
+# ====================
+# VECTORIZED CSV TEXT
+# ====================
+# A column is a pair (chars, keep): a (rows, width) uint8 matrix of ASCII bytes and a mask
+# of the bytes that belong to the text. Joining all columns side by side and taking
+# chars[keep] yields the CSV block in row-major order.
+
+def _digits(values, width):
+    """Non-negative integers as zero padded ASCII digits."""
+    values = values.astype(np.int64)  # copy, divided in place below
+    chars = np.empty((len(values), width), np.uint8)
+    for i in range(width - 1, -1, -1):
+        chars[:, i] = values % 10 + ZERO
+        values //= 10
+    return chars
+
+def int_column(values, width, negative=None):
+    """Integers without leading zeros, '-' prefixed where 'negative' is set."""
+    chars = _digits(np.abs(values), width)
+    keep = np.ones(chars.shape, bool)
+    # leading zeros go, the last digit always stays
+    keep[:, :-1] = ~np.logical_and.accumulate(chars[:, :-1] == ZERO, axis=1)
+    if negative is None:
+        return chars, keep
+    sign = np.full((len(values), 1), MINUS, np.uint8)
+    return np.hstack([sign, chars]), np.hstack([negative[:, None], keep])
+
+def fixed_column(values, int_width, decimals):
+    """Floats with exactly 'decimals' decimals, e.g. 21.05 or -3.40."""
+    scaled = np.rint(values * 10 ** decimals).astype(np.int64)
+    magnitude = np.abs(scaled)
+    int_chars, int_keep = int_column(magnitude // 10 ** decimals, int_width, scaled < 0)
+    frac = _digits(magnitude % 10 ** decimals, decimals)
+    dot = np.full((len(values), 1), DOT, np.uint8)
+    return (np.hstack([int_chars, dot, frac]),
+            np.hstack([int_keep, np.ones((len(values), decimals + 1), bool)]))
+
+def choice_column(indices, labels):
+    """Text labels picked by index, e.g. wind directions."""
+    width = max(len(label) for label in labels)
+    table = np.zeros((len(labels), width), np.uint8)
+    table_keep = np.zeros((len(labels), width), bool)
+    for i, label in enumerate(labels):
+        table[i, :len(label)] = np.frombuffer(label.encode('ascii'), np.uint8)
+        table_keep[i, :len(label)] = True
+    return table[indices], table_keep[indices]
+
+def csv_block(columns):
+    """Joins columns with ';' and ends every row with a newline. Returns bytes."""
+    rows = len(columns[0][0])
+    sep = (np.full((rows, 1), SEP, np.uint8), np.ones((rows, 1), bool))
+    end = (np.full((rows, 1), NEWLINE, np.uint8), np.ones((rows, 1), bool))
+    parts = []
+    for i, column in enumerate(columns):
+        parts.append(column)
+        parts.append(end if i == len(columns) - 1 else sep)
+    chars = np.hstack([p[0] for p in parts])
+    keep = np.hstack([p[1] for p in parts])
+    return chars[keep].tobytes()
+
+# ==========
+# TIMELINE
+# ==========
+
+class Timeline:
+    """Regular timestamps from 'start' every 'interval' seconds, minus random outages."""
+
+    def __init__(self, rng, start, rows, interval, gap_rate, gap_minutes):
+        self.start = start
+        self.rows = rows
+        self.interval = interval
+        span_days = rows * interval / DAY
+        count = rng.poisson(span_days * gap_rate) if gap_rate > 0 else 0
+        starts = np.sort(start + rng.random(count) * rows * interval)
+        ends = starts + rng.exponential(gap_minutes * 60, count)
+        self.gap_starts = starts
+        self.gap_ends = np.maximum.accumulate(ends) if count else ends  # overlapping gaps merge
+
+    def block(self, offset, size):
+        ts = self.start + (offset + np.arange(size, dtype=np.int64)) * self.interval
+        if len(self.gap_starts):
+            index = np.searchsorted(self.gap_starts, ts, side='right') - 1
+            in_gap = (index >= 0) & (ts < self.gap_ends[np.maximum(index, 0)])
+            ts = ts[~in_gap]
+        return ts
+
+def apply_defects(rng, ts, columns, args):
+    """Jitter, duplicates and out-of-order rows on one block. Returns (ts, columns)."""
+    if args.jitter:
+        ts = ts + rng.integers(-args.jitter, args.jitter + 1, len(ts))
+    order = np.arange(len(ts))
+    if args.duplicate_rate:
+        order = np.repeat(order, 1 + (rng.random(len(order)) < args.duplicate_rate))
+    if args.out_of_order_rate and len(order) > 1:
+        i = np.flatnonzero(rng.random(len(order)) < args.out_of_order_rate)
+        j = np.minimum(i + rng.integers(1, args.out_of_order_window + 1, len(i)), len(order) - 1)
+        order[i], order[j] = order[j], order[i]
+    return ts[order], [c[order] for c in columns]
+
+# ===========
+# GENERATORS
+# ===========
+
+def _local_phase(ts, period, offset_seconds):
+    return 2 * np.pi * ((ts + offset_seconds) % period) / period
+
+class SensorModel:
+    """Soil moisture: a bounded random walk, continuous across blocks."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.level = rng.uniform(30, 60)
+
+    def block(self, ts):
+        walk = self.level + np.cumsum(self.rng.normal(0, 0.15, len(ts)))
+        moisture = np.clip(walk, 5.0, 95.0)
+        if len(ts):
+            self.level = moisture[-1]
+        return [moisture]
+
+    @staticmethod
+    def columns(ts, values):
+        (moisture,) = values
+        return [fixed_column(moisture, 2, 2), int_column(ts, 10)]
+
+class WeatherModel:
+    """Seasonal and daily temperature cycles, humidity following temperature, wet days with rain."""
+
+    def __init__(self, rng, utc_offset, interval):
+        self.rng = rng
+        self.utc_offset = utc_offset
+        self.interval = interval
+        self.noise = 0.0
+        self.rain_day = None
+        self.rain_total = 0.0
+
+    def block(self, ts):
+        rng, n = self.rng, len(ts)
+        day_phase = _local_phase(ts, DAY, self.utc_offset)
+        year_phase = 2 * np.pi * (ts / DAY % 365.25) / 365.25
+        noise = np.clip(self.noise + np.cumsum(rng.normal(0, 0.05, n)), -4, 4)
+        if n:
+            self.noise = noise[-1]
+
+        # Coldest mid January, daily peak around 15:00
+        out_temp = 6 - 10 * np.cos(year_phase - 0.25) + 5 * np.sin(day_phase - 2.36) + noise
+        in_temp = 21 + 0.15 * (out_temp - 10) + rng.normal(0, 0.3, n)
+        out_humidity = np.clip(np.rint(78 - 1.8 * (out_temp - 8) + rng.normal(0, 5, n)), 15, 100)
+        in_humidity = np.clip(np.rint(45 + rng.normal(0, 3, n)), 30, 65)
+
+        wind_speed = rng.gamma(2.0, 1.8, n)
+        wind_direction = rng.choice(len(WIND_DIRECTIONS), n, p=WIND_WEIGHTS)
+
+        # About 30% wet days (decided per calendar day), showers within them
+        day = (ts + self.utc_offset) // DAY
+        wet = (day * 2654435761 % 1000) < 300
+        rain_rate = np.where(wet & (rng.random(n) < 0.35), rng.gamma(0.7, 2.0, n), 0.0)
+        daily_rain = self._daily_totals(day, rain_rate * self.interval / 3600)
+
+        return [in_temp, out_temp, in_humidity, out_humidity, wind_speed, wind_direction, daily_rain, rain_rate]
+
+    def _daily_totals(self, day, amount):
+        """Running rain total that restarts at local midnight, carried between blocks."""
+        if not len(day):
+            return amount
+        total = np.cumsum(amount)
+        new_day = np.r_[day[0] != self.rain_day, day[1:] != day[:-1]]
+        base = np.where(new_day, total - amount, np.nan)
+        if day[0] == self.rain_day:
+            base[0] = total[0] - amount[0] - self.rain_total  # continue yesterday's block
+        base = _forward_fill(base)
+        daily = total - base
+        self.rain_day, self.rain_total = day[-1], daily[-1]
+        return daily
+
+    @staticmethod
+    def columns(ts, values):
+        in_temp, out_temp, in_hum, out_hum, wind, direction, daily_rain, rain_rate = values
+        return [
+            int_column(ts, 10),
+            fixed_column(in_temp, 2, 2), fixed_column(out_temp, 2, 2),
+            int_column(in_hum, 3), int_column(out_hum, 3),
+            fixed_column(wind, 3, 2), choice_column(direction, WIND_DIRECTIONS),
+            fixed_column(daily_rain, 3, 2), fixed_column(rain_rate, 3, 2),
+        ]
+
+def _forward_fill(values):
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    return values[index]
+
+# ========
+# OUTPUT
+# ========
+
+def open_output(path, compresslevel):
+    if path == '-':
+        return sys.stdout.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wb', compresslevel=compresslevel)
+    return open(path, 'wb')
+
+def parse_time(text):
+    return int(datetime.fromisoformat(text).timestamp())
+
+def generate_rows(args, kind):
+    rng = np.random.default_rng(args.seed)
+    interval = args.interval
+    if args.end:
+        start = parse_time(args.start) if args.start else parse_time(args.end) - DAY
+        rows = (parse_time(args.end) - start) // interval + 1
+    else:
+        rows = args.rows
+        start = parse_time(args.start) if args.start else int(time.time()) - rows * interval
+    if rows <= 0:
+        sys.exit("Nothing to generate: the time range is empty.")
+
+    utc_offset = datetime.fromtimestamp(start).astimezone().utcoffset().total_seconds()
+    timeline = Timeline(rng, start, rows, interval, args.gap_rate, args.gap_minutes)
+    if kind == 'sensor':
+        model, headers = SensorModel(rng), SENSOR_HEADERS
+    else:
+        model, headers = WeatherModel(rng, utc_offset, interval), WEATHER_HEADERS
+
+    written = 0
+    started = time.perf_counter()
+    out = open_output(args.output, args.compresslevel)
+    try:
+        out.write((';'.join(headers) + '\n').encode('ascii'))
+        for offset in range(0, rows, args.block_size):
+            ts = timeline.block(offset, min(args.block_size, rows - offset))
+            values = model.block(ts)
+            ts, values = apply_defects(rng, ts, values, args)
+            if len(ts):
+                out.write(csv_block(model.columns(ts, values)))
+            written += len(ts)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    seconds = time.perf_counter() - started
+    print(f"{kind}: {written} rows from {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S} "
+          f"in {seconds:.2f}s ({written / seconds / 1e6:.2f}M rows/s) -> {args.output}", file=sys.stderr)
+
+# ======
+# AUDIO
+# ======
+
+def write_wav(path, rng, seconds, sample_rate, chunk=1 << 20):
+    """16-bit mono: background noise plus short chirps, written chunk by chunk."""
+    total = int(seconds * sample_rate)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for first in range(0, total, chunk):
+            t = (first + np.arange(min(chunk, total - first))) / sample_rate
+            signal = rng.normal(0, 0.05, len(t))
+            chirping = np.sin(2 * np.pi * 0.2 * t) > 0.8  # a chirp every five seconds
+            signal += chirping * 0.3 * np.sin(2 * np.pi * (2000 + 800 * np.sin(2 * np.pi * 3 * t)) * t)
+            wav.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+
+def generate_audio(args):
+    rng = np.random.default_rng(args.seed)
+    start = parse_time(args.start) if args.start else int(time.time()) - args.count * args.interval
+    os.makedirs(args.output, exist_ok=True)
+    for i in range(args.count):
+        begin = datetime.fromtimestamp(start + i * args.interval)
+        # Same naming as the recorder, extract_audio_metadata reads the start time from it
+        path = os.path.join(args.output, f"{args.prefix}_{begin:%Y%m%d_%H%M%S}.wav")
+        write_wav(path, rng, args.duration, args.sample_rate)
+        print(path, file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate mock sensor / weather CSVs and WAV recordings.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    sub = parser.add_subparsers(dest='kind', required=True)
+
+    for kind in ('sensor', 'weather'):
+        p = sub.add_parser(kind, help=f"{kind} CSV")
+        p.add_argument('-o', '--output', default=f"mock_{kind}_data.csv", help="file, *.gz for gzip, '-' for stdout")
+        p.add_argument('--rows', type=int, default=1000000, help="rows before defects (ignored with --end)")
+        p.add_argument('--start', help="first timestamp, YYYY-MM-DD[ HH:MM:SS] local time (default: rows back from now)")
+        p.add_argument('--end', help="last timestamp; rows follow from start, end and interval")
+        p.add_argument('--interval', type=int, default=60, help="seconds between readings")
+        p.add_argument('--jitter', type=int, default=0)
+        p.add_argument('--gap-rate', type=float, default=0.0)
+        p.add_argument('--gap-minutes', type=float, default=30.0)
+        p.add_argument('--duplicate-rate', type=float, default=0.0)
+        p.add_argument('--out-of-order-rate', type=float, default=0.0)
+        p.add_argument('--out-of-order-window', type=int, default=5)
+        p.add_argument('--block-size', type=int, default=1000000)
+        p.add_argument('--compresslevel', type=int, default=1, help="gzip level, 1 is fastest")
+        p.add_argument('--seed', type=int, default=0)
+
+    p = sub.add_parser('audio', help="WAV recordings named recording_YYYYMMDD_HHMMSS.wav")
+    p.add_argument('-o', '--output', default='audio_files', help="directory")
+    p.add_argument('--start', help="first recording start (default: count * interval back from now)")
+    p.add_argument('--count', type=int, default=10)
+    p.add_argument('--interval', type=int, default=3600, help="seconds between recording starts")
+    p.add_argument('--duration', type=float, default=600, help="seconds per recording")
+    p.add_argument('--sample-rate', type=int, default=16000)
+    p.add_argument('--prefix', default='recording')
+    p.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    if args.kind == 'audio':
+        generate_audio(args)
+    else:
+        generate_rows(args, args.kind)
+
+
+if __name__ == "__main__":
+    main()